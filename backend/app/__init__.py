@@ -13,7 +13,9 @@ from .controllers.config_controller import config_bp
 from .controllers.parking_controller import parking_bp
 from .controllers.stm_controller import stm_bp
 from .controllers.rating_controller import rating_bp
+from .controllers.matching_controller import matching_bp
 from .utils.errors import register_error_handlers
+from .commands import register_commands
 
 
 def create_app() -> Flask:
@@ -21,13 +23,22 @@ def create_app() -> Flask:
     app.config.from_object(get_config())
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Keep the SQLite FTS5 ride search tables out of `flask db migrate`, and
+    # build them whenever db.create_all() creates ride_posts
+    from .models import RidePost
+    from .services.ride_search import exclude_from_migrations, install_ddl_listener
+    migrate.init_app(app, db, include_object=exclude_from_migrations)
+    install_ddl_listener(RidePost.__table__)
     jwt.init_app(app)
     bcrypt.init_app(app)
     limiter.init_app(app)
 
     allowed_origin = app.config.get("FRONTEND_ORIGIN", "http://localhost:5173")
-    cors.init_app(app, resources={r"/api/*": {"origins": allowed_origin}})
+    cors.init_app(app, resources={
+        # EventSource sends the stream-token cookie (withCredentials)
+        r"/api/analytics/stream.*": {"origins": allowed_origin, "supports_credentials": True},
+        r"/api/*": {"origins": allowed_origin},
+    })
 
     # ── Rate limits ────────────────────────────────────────────────────────────
     ai_limit      = app.config.get("RATELIMIT_AI_CHAT",    "30 per minute")
@@ -55,13 +66,16 @@ def create_app() -> Flask:
     app.register_blueprint(parking_bp,    url_prefix="/api/parking")
     app.register_blueprint(stm_bp,        url_prefix="/api/stm")
     app.register_blueprint(rating_bp,     url_prefix="/api/ratings")
+    app.register_blueprint(matching_bp,   url_prefix="/api/matching")
 
     # Apply auth rate limit to login/register
     limiter.limit(auth_limit)(login)
     limiter.limit(auth_limit)(register)
 
     register_error_handlers(app)
+    register_commands(app)
     _setup_event_bus()
+    _start_background_workers(app)
 
     @app.get("/api/health")
     def health():
@@ -72,6 +86,42 @@ def create_app() -> Flask:
 
 def _setup_event_bus():
     from .services.event_bus import EventBus, DBAnalyticsObserver, LoggingAnalyticsObserver
+    from .services.ride_index import RideSpatialIndex, RideIndexObserver
     EventBus.clear()
     EventBus.subscribe(DBAnalyticsObserver())
     EventBus.subscribe(LoggingAnalyticsObserver())
+    from .services.analytics_rollup import RollupObserver
+    EventBus.subscribe(RollupObserver())
+    from .services.latency_stats import LatencyObserver
+    EventBus.subscribe(LatencyObserver())
+    from .services.live_stream import LiveStreamObserver
+    EventBus.subscribe(LiveStreamObserver())
+    RideSpatialIndex.invalidate()
+    EventBus.subscribe(RideIndexObserver())
+
+
+def _start_background_workers(app: Flask):
+    import os
+    if app.config.get("TESTING"):
+        return
+    # Under the debug reloader, only the serving child runs them (the parent just watches files)
+    if app.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return
+    if app.config.get("LIFECYCLE_SWEEPER_ENABLED"):
+        from .services.lifecycle_sweeper import LifecycleSweeper
+        LifecycleSweeper.start(app, interval=app.config.get("LIFECYCLE_SWEEP_INTERVAL_SEC", 60))
+    if app.config.get("NOTIFICATION_DISPATCHER_ENABLED"):
+        from .services.notifications import OutboxDispatcher
+        OutboxDispatcher.start(app, interval=app.config.get("NOTIFICATION_POLL_SEC", 5))
+    if app.config.get("LATENCY_FLUSH_ENABLED"):
+        from .services.latency_stats import LatencyStats
+        LatencyStats.start(app, interval=app.config.get("LATENCY_FLUSH_SEC", 60))
+    if app.config.get("EVENT_BUS_ASYNC"):
+        from .services.event_bus import EventBus
+        EventBus.start_async(
+            app,
+            queue_size=app.config.get("EVENT_BUS_QUEUE_SIZE", 10000),
+            batch_size=app.config.get("EVENT_BUS_BATCH_SIZE", 200),
+            flush_ms=app.config.get("EVENT_BUS_FLUSH_MS", 250),
+            put_timeout_ms=app.config.get("EVENT_BUS_PUT_TIMEOUT_MS", 50),
+        )
@@ -0,0 +1,137 @@
+"""
+Flask CLI maintenance commands.
+
+Usage (from backend/ directory):
+    flask --app run.py rides backfill-coords
+    flask --app run.py rides build-search-index
+    flask --app run.py rides reconcile-counters
+    flask --app run.py rides sweep
+    flask --app run.py rides backfill-transitions
+    flask --app run.py notifications drain
+    flask --app run.py analytics rebuild-rollups
+    flask --app run.py analytics compact-events
+"""
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+
+from .extensions import db
+
+rides_cli = AppGroup("rides", help="Carpool ride maintenance commands.")
+notifications_cli = AppGroup("notifications", help="Email/push outbox commands.")
+analytics_cli = AppGroup("analytics", help="Admin analytics maintenance commands.")
+
+
+@rides_cli.command("backfill-coords")
+@click.option("--batch-size", default=100, show_default=True,
+              help="Rides geocoded per commit.")
+@click.option("--all", "refresh_all", is_flag=True,
+              help="Re-geocode every ride, not only rows missing coordinates.")
+def backfill_coords(batch_size: int, refresh_all: bool):
+    """Resolve and store departure/destination coordinates on existing rides."""
+    from .models import RidePost
+
+    q = RidePost.query
+    if not refresh_all:
+        q = q.filter(db.or_(RidePost.departure_lat.is_(None),
+                            RidePost.destination_lat.is_(None)))
+
+    resolved = unresolved = 0
+    last_id = 0
+    while True:
+        # Keyset over id so rows that still fail to geocode are not revisited
+        batch = (q.filter(RidePost.id > last_id)
+                 .order_by(RidePost.id.asc())
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        for ride in batch:
+            if ride.resolve_coordinates():
+                resolved += 1
+            else:
+                unresolved += 1
+                click.echo(f"  ! ride {ride.id}: could not geocode "
+                           f"'{ride.departure}' → '{ride.destination}'")
+        last_id = batch[-1].id
+        db.session.commit()
+
+    click.echo(f"Backfill complete: {resolved} resolved, {unresolved} unresolved.")
+
+
+@rides_cli.command("build-search-index")
+def build_search_index_cmd():
+    """Create (if needed) and repopulate the departure/destination text index."""
+    from .services.ride_search import build_search_index
+
+    with db.engine.begin() as conn:
+        click.echo(build_search_index(conn))
+
+
+@rides_cli.command("reconcile-counters")
+def reconcile_counters():
+    """Recompute requests/pending/accepted counters on every ride from its bookings."""
+    from .models.ride_post import reconcile_booking_counters
+
+    fixed = reconcile_booking_counters()
+    db.session.commit()
+    click.echo(f"Reconciled booking counters: {fixed} ride(s) corrected.")
+
+
+@rides_cli.command("sweep")
+def sweep():
+    """Expire stale PENDING requests and complete past rides (one pass)."""
+    from .services.lifecycle_sweeper import LifecycleSweeper
+
+    result = LifecycleSweeper.run_once()
+    click.echo(f"Sweep complete: {result['expired_requests']} request(s) expired, "
+               f"{result['completed_rides']} ride(s) completed.")
+
+
+@rides_cli.command("backfill-transitions")
+def backfill_transitions():
+    """Log an approximate status history for bookings that predate booking_transitions."""
+    from .services.booking_lifecycle import backfill
+
+    n = backfill()
+    click.echo(f"Backfill complete: {n} booking(s) given a transition history.")
+
+
+@notifications_cli.command("drain")
+@click.option("--batch-size", default=500, show_default=True,
+              help="Notifications claimed per batch.")
+def drain_notifications(batch_size: int):
+    """Deliver every due email/push notification in the outbox."""
+    from .services.notifications import OutboxDispatcher
+
+    sent = OutboxDispatcher.drain_all(batch_size)
+    click.echo(f"Outbox drained: {sent} notification(s) processed.")
+
+
+@analytics_cli.command("rebuild-rollups")
+def rebuild_rollups():
+    """Recompute the hourly/daily analytics rollups from the event log."""
+    from .services.analytics_rollup import rebuild
+
+    written = rebuild()
+    click.echo(f"Rollups rebuilt: {written} bucket(s) written.")
+
+
+@analytics_cli.command("compact-events")
+@click.option("--months", type=int, default=None,
+              help="Calendar months to keep (default: ANALYTICS_RETENTION_MONTHS).")
+def compact_events(months: int | None):
+    """Archive analytics events older than the retention window and drop them."""
+    from .services.event_archive import compact, ensure_partitions
+
+    ensure_partitions()
+    result = compact(months=months)
+    click.echo(f"Compaction complete: {result['archived']} event(s) archived "
+               f"from {len(result['months'])} month(s).")
+
+
+def register_commands(app: Flask):
+    app.cli.add_command(rides_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(analytics_cli)
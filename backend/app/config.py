@@ -13,11 +13,59 @@ class BaseConfig:
     JWT_ACCESS_TOKEN_EXPIRES  = timedelta(minutes=15)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
 
+    # Tokens come in the Authorization header.  The only cookie is the admin
+    # live stream's short-lived, stream-only token (EventSource cannot set
+    # headers), sent by the browser to that path alone
+    JWT_TOKEN_LOCATION      = ["headers", "cookies"]
+    JWT_ACCESS_COOKIE_PATH  = "/api/analytics/stream"
+    JWT_ACCESS_CSRF_COOKIE_PATH = "/api/analytics/stream"
+    JWT_COOKIE_CSRF_PROTECT = True   # cookie-authenticated writes need X-CSRF-TOKEN
+    JWT_COOKIE_SAMESITE     = os.getenv("JWT_COOKIE_SAMESITE", "Strict")
+    JWT_COOKIE_SECURE       = os.getenv("JWT_COOKIE_SECURE", "0") == "1"
+    ANALYTICS_STREAM_TOKEN_EXPIRES = timedelta(minutes=10)
+
     SQLALCHEMY_DATABASE_URI      = os.getenv("DATABASE_URL", "sqlite:///app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")
 
+    # Fail list requests whose serializers would lazy-load a relationship (N+1 guard)
+    ORM_RAISE_ON_LAZY_LOAD = False
+
+    # Background expiry of stale requests / completion of past rides
+    # (services/lifecycle_sweeper.py). Enable on one worker only.
+    LIFECYCLE_SWEEPER_ENABLED  = os.getenv("LIFECYCLE_SWEEPER_ENABLED", "1") == "1"
+    LIFECYCLE_SWEEP_INTERVAL_SEC = int(os.getenv("LIFECYCLE_SWEEP_INTERVAL_SEC", "60"))
+
+    # Email/push delivery from the notification_outbox table
+    # (services/notifications.py). Safe to run on every worker.
+    NOTIFICATION_DISPATCHER_ENABLED = os.getenv("NOTIFICATION_DISPATCHER_ENABLED", "1") == "1"
+    NOTIFICATION_POLL_SEC = float(os.getenv("NOTIFICATION_POLL_SEC", "5"))
+    # Notifications to someone contacted within this many seconds wait and merge
+    # into one digest (0 = send each one as soon as it is due)
+    NOTIFICATION_COALESCE_SEC = int(os.getenv("NOTIFICATION_COALESCE_SEC", "300"))
+
+    # Analytics EventBus (services/event_bus.py): async = bounded queue + a
+    # writer thread that bulk-inserts events in batches
+    EVENT_BUS_ASYNC         = os.getenv("EVENT_BUS_ASYNC", "0") == "1"
+    EVENT_BUS_QUEUE_SIZE    = int(os.getenv("EVENT_BUS_QUEUE_SIZE", "10000"))
+    EVENT_BUS_BATCH_SIZE    = int(os.getenv("EVENT_BUS_BATCH_SIZE", "200"))
+    EVENT_BUS_FLUSH_MS      = int(os.getenv("EVENT_BUS_FLUSH_MS", "250"))
+    EVENT_BUS_PUT_TIMEOUT_MS = int(os.getenv("EVENT_BUS_PUT_TIMEOUT_MS", "50"))
+
+    # Open /api/analytics/stream responses per process; each holds a worker thread
+    ANALYTICS_STREAM_MAX_LISTENERS = int(os.getenv("ANALYTICS_STREAM_MAX_LISTENERS", "20"))
+
+    # Booking latency digests (services/latency_stats.py) are folded into
+    # latency_sketches by a per-process thread this often. Safe on every worker.
+    LATENCY_FLUSH_ENABLED = os.getenv("LATENCY_FLUSH_ENABLED", "1") == "1"
+    LATENCY_FLUSH_SEC = float(os.getenv("LATENCY_FLUSH_SEC", "60"))
+
+    # analytics_events keeps this many calendar months; older months are
+    # archived as gzip NDJSON by `flask analytics compact-events`
+    ANALYTICS_RETENTION_MONTHS = int(os.getenv("ANALYTICS_RETENTION_MONTHS", "6"))
+    ANALYTICS_ARCHIVE_DIR      = os.getenv("ANALYTICS_ARCHIVE_DIR", "")  # default: instance/analytics_archive
+
     ADMIN_EMAIL    = os.getenv("ADMIN_EMAIL",    "admin@urbix.ai")
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin")
 
@@ -35,6 +83,7 @@ class BaseConfig:
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
+    ORM_RAISE_ON_LAZY_LOAD = True
     # Looser limits in dev so you can iterate freely
     RATELIMIT_AI_CHAT   = "120 per minute"
     RATELIMIT_GEOCODING = "240 per minute"
@@ -43,6 +92,11 @@ class DevelopmentConfig(BaseConfig):
 
 class TestingConfig(BaseConfig):
     TESTING = True
+    ORM_RAISE_ON_LAZY_LOAD = True
+    LIFECYCLE_SWEEPER_ENABLED = False
+    NOTIFICATION_DISPATCHER_ENABLED = False
+    LATENCY_FLUSH_ENABLED = False
+    EVENT_BUS_ASYNC = False
     SQLALCHEMY_DATABASE_URI = "sqlite:///test.db"
     # Disable limits in tests
     RATELIMIT_AI_CHAT   = "10000 per minute"
@@ -52,6 +106,7 @@ class TestingConfig(BaseConfig):
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+    JWT_COOKIE_SECURE = os.getenv("JWT_COOKIE_SECURE", "1") == "1"
 
 
 def get_config():
@@ -10,13 +10,14 @@ import os
 import logging
 import traceback
 import requests
-from datetime import datetime
 
 from flask import Blueprint, request
+from sqlalchemy.orm import joinedload
 from ..utils.responses import ok, fail
-from ..utils.geocoding import geocode as _geocode, haversine_km as _haversine_km
-from ..models import RidePost, CarpoolBooking
+from ..utils.geocoding import geocode as _geocode
+from ..models import RidePost
 from ..services.stm_service import is_configured as stm_configured
+from ..services.ride_index import RideSpatialIndex
 
 ai_bp = Blueprint("ai", __name__)
 logger = logging.getLogger(__name__)
@@ -144,72 +145,63 @@ def _find_nearby_rides(
     # to silently disappear even when the user would want to see them.
     exclude_id = int(exclude_user_id) if exclude_user_id is not None else None
 
-    rides = RidePost.query.filter(
-        RidePost.status == "OPEN",
-        RidePost.departure_datetime > datetime.utcnow(),
-    ).order_by(RidePost.departure_datetime.asc()).limit(100).all()
+    if not origin_coords or not dest_coords:
+        return []
 
-    results = []
-
-    for ride in rides:
+    # Radius lookup via the in-memory spatial index — only the best hits are loaded from the DB.
+    candidates = [
+        c for c in RideSpatialIndex.route_candidates(origin_coords, dest_coords, origin_radius, dest_radius)
         # FIX: use the real model field creator_user_id (not the non-existent creator_id)
-        if exclude_id is not None and ride.creator_user_id == exclude_id:
-            continue
+        if exclude_id is None or c[0].creator_user_id != exclude_id
+    ]
+    candidates.sort(key=lambda c: c[1] + c[2])
+    candidates = candidates[:5]
+    if not candidates:
+        return []
+    rides = {r.id: r for r in RidePost.query
+             .options(joinedload(RidePost.creator))
+             .filter(RidePost.id.in_([c[0].id for c in candidates]))}
 
-        ride_dep_coords  = _geocode(ride.departure)
-        ride_dest_coords = _geocode(ride.destination)
-        if not ride_dep_coords or not ride_dest_coords:
-            continue
+    results = []
 
-        gap_to_pickup = (
-            _haversine_km(origin_coords[0], origin_coords[1],
-                          ride_dep_coords[0], ride_dep_coords[1])
-            if origin_coords else 999
-        )
-        gap_from_dropoff = (
-            _haversine_km(ride_dest_coords[0], ride_dest_coords[1],
-                          dest_coords[0], dest_coords[1])
-            if dest_coords else 999
-        )
+    for entry, gap_to_pickup, gap_from_dropoff in candidates:
+        ride = rides.get(entry.id)
+        if ride is None:
+            continue
 
-        if gap_to_pickup <= origin_radius and gap_from_dropoff <= dest_radius:
-            accepted = CarpoolBooking.query.filter_by(
-                ride_post_id=ride.id, status="ACCEPTED"
-            ).count()
-
-            # FIX: renamed from `prefs` to `ride_pref_tags` — avoids shadowing
-            # the outer user_prefs/cp variables in the same function scope
-            ride_pref_tags = []
-            if ride.allow_smoking: ride_pref_tags.append("smoking OK")
-            if ride.allow_pets:    ride_pref_tags.append("pets OK")
-            if ride.music_ok:      ride_pref_tags.append("music OK")
-            if ride.chatty:        ride_pref_tags.append("chatty")
-
-            # Check if ride preferences conflict with user preferences
-            cp = user_prefs.get("carpoolPreferences", {})
-            pref_warnings = []
-            if not cp.get("allowSmoking", False) and ride.allow_smoking:
-                pref_warnings.append("ride allows smoking (your preference: no smoking)")
-            if not cp.get("musicOk", True) and ride.music_ok:
-                pref_warnings.append("ride has music (your preference: no music)")
-            if cp.get("allowPets", False) and not ride.allow_pets:
-                pref_warnings.append("ride doesn't allow pets (your preference: pets OK)")
-
-            results.append({
-                "id":                  ride.id,
-                "departure":           ride.departure,
-                "destination":         ride.destination,
-                "datetime":            ride.departure_datetime.strftime("%Y-%m-%d %H:%M"),
-                "seats":               ride.seats_available,
-                "driver":              ride.creator.full_name if ride.creator else "Unknown",
-                "passengers":          accepted,
-                "preferences":         ", ".join(ride_pref_tags) if ride_pref_tags else "no specific preferences",
-                "pref_warnings":       pref_warnings,
-                "gap_to_pickup_km":    round(gap_to_pickup, 2),
-                "gap_from_dropoff_km": round(gap_from_dropoff, 2),
-                "pickup_connector":    _suggest_connector(gap_to_pickup),
-                "dropoff_connector":   _suggest_connector(gap_from_dropoff),
-            })
+        # FIX: renamed from `prefs` to `ride_pref_tags` — avoids shadowing
+        # the outer user_prefs/cp variables in the same function scope
+        ride_pref_tags = []
+        if ride.allow_smoking: ride_pref_tags.append("smoking OK")
+        if ride.allow_pets:    ride_pref_tags.append("pets OK")
+        if ride.music_ok:      ride_pref_tags.append("music OK")
+        if ride.chatty:        ride_pref_tags.append("chatty")
+
+        # Check if ride preferences conflict with user preferences
+        cp = user_prefs.get("carpoolPreferences", {})
+        pref_warnings = []
+        if not cp.get("allowSmoking", False) and ride.allow_smoking:
+            pref_warnings.append("ride allows smoking (your preference: no smoking)")
+        if not cp.get("musicOk", True) and ride.music_ok:
+            pref_warnings.append("ride has music (your preference: no music)")
+        if cp.get("allowPets", False) and not ride.allow_pets:
+            pref_warnings.append("ride doesn't allow pets (your preference: pets OK)")
+
+        results.append({
+            "id":                  ride.id,
+            "departure":           ride.departure,
+            "destination":         ride.destination,
+            "datetime":            ride.departure_datetime.strftime("%Y-%m-%d %H:%M"),
+            "seats":               ride.seats_available,
+            "driver":              ride.creator.full_name if ride.creator else "Unknown",
+            "passengers":          ride.accepted_count,
+            "preferences":         ", ".join(ride_pref_tags) if ride_pref_tags else "no specific preferences",
+            "pref_warnings":       pref_warnings,
+            "gap_to_pickup_km":    round(gap_to_pickup, 2),
+            "gap_from_dropoff_km": round(gap_from_dropoff, 2),
+            "pickup_connector":    _suggest_connector(gap_to_pickup),
+            "dropoff_connector":   _suggest_connector(gap_from_dropoff),
+        })
 
     results.sort(key=lambda r: r["gap_to_pickup_km"] + r["gap_from_dropoff_km"])
     return results[:5]
@@ -10,18 +10,21 @@ This satisfies Sprint 3:
 """
 
 from datetime import datetime, timedelta
-from collections import defaultdict
 
-from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from flask_jwt_extended import (
+    create_access_token, get_jwt, get_jwt_identity, jwt_required, set_access_cookies,
+)
 
-from ..extensions import db
-from ..models import User, RidePost, CarpoolBooking
+from ..extensions import jwt
 from ..models.analytics_event import AnalyticsEvent
+from ..services import analytics_rollup as rollups
 from ..utils.responses import ok, fail
 
 analytics_bp = Blueprint("analytics", __name__)
 
+MAX_SERIES_DAYS = 365
+
 
 def _require_admin():
     """Return (None, error_response) or (claims, None)."""
@@ -42,42 +45,8 @@ def get_summary():
     if err:
         return err
 
-    total_users     = User.query.count()
-    total_rides     = RidePost.query.count()
-    open_rides      = RidePost.query.filter_by(status="OPEN").count()
-    full_rides      = RidePost.query.filter_by(status="FULL").count()
-
-    total_bookings  = CarpoolBooking.query.count()
-    accepted        = CarpoolBooking.query.filter_by(status="ACCEPTED").count()
-    pending         = CarpoolBooking.query.filter_by(status="PENDING").count()
-    rejected        = CarpoolBooking.query.filter_by(status="REJECTED").count()
-    cancelled       = CarpoolBooking.query.filter_by(status="CANCELLED").count()
-
-    # Rides created in the last 7 days
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    rides_this_week = RidePost.query.filter(RidePost.created_at >= week_ago).count()
-    users_this_week = User.query.filter(User.created_at >= week_ago).count()
-
-    return ok({
-        "users": {
-            "total": total_users,
-            "this_week": users_this_week,
-        },
-        "rides": {
-            "total": total_rides,
-            "open": open_rides,
-            "full": full_rides,
-            "this_week": rides_this_week,
-        },
-        "bookings": {
-            "total": total_bookings,
-            "accepted": accepted,
-            "pending": pending,
-            "rejected": rejected,
-            "cancelled": cancelled,
-            "acceptance_rate": round(accepted / total_bookings * 100, 1) if total_bookings else 0,
-        },
-    })
+    # A few aggregate queries, cached until the next committed event
+    return ok(rollups.kpi_summary())
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -91,13 +60,8 @@ def get_events():
     if err:
         return err
 
-    # Count by event_type
-    rows = (
-        db.session.query(AnalyticsEvent.event_type, db.func.count(AnalyticsEvent.id))
-        .group_by(AnalyticsEvent.event_type)
-        .all()
-    )
-    by_type = {row[0]: row[1] for row in rows}
+    # Count by event_type (daily rollups)
+    by_type = {t: n for t, n in rollups.totals("events").items() if n}
 
     # Total events
     total = sum(by_type.values())
@@ -120,6 +84,7 @@ def get_events():
 # ──────────────────────────────────────────────────────────────────────────────
 # GET /api/analytics/rides/daily?days=7
 #   Returns daily ride creation counts for the last N days (sparkline data).
+#   Same data as /series?metric=rides&bucket=day, in the legacy shape.
 # ──────────────────────────────────────────────────────────────────────────────
 @analytics_bp.get("/rides/daily")
 @jwt_required()
@@ -130,31 +95,81 @@ def get_daily_rides():
 
     try:
         days = int(request.args.get("days", 7))
-        days = max(1, min(days, 90))
+        days = max(1, min(days, MAX_SERIES_DAYS))
     except ValueError:
         return fail("days must be a positive integer", 400)
 
-    since = datetime.utcnow() - timedelta(days=days)
+    result = [{"date": day.strftime("%Y-%m-%d"), "rides": n}
+              for day, n in rollups.filled_series("rides", "day", days)]
+    return ok(result)
 
-    rides = (
-        RidePost.query
-        .filter(RidePost.created_at >= since)
-        .all()
-    )
 
-    # Aggregate by date string YYYY-MM-DD
-    counts: dict[str, int] = defaultdict(int)
-    for ride in rides:
-        day_key = ride.created_at.strftime("%Y-%m-%d")
-        counts[day_key] += 1
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/series?metric=rides&bucket=day&days=30
+#   Zero-filled time series of rides | bookings | users | trips | events,
+#   bucketed by hour | day | week, for up to a year (read from the rollups).
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/series")
+@jwt_required()
+def get_series():
+    _, err = _require_admin()
+    if err:
+        return err
 
-    # Build ordered list for every day in the range
-    result = []
-    for i in range(days):
-        day = (datetime.utcnow() - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d")
-        result.append({"date": day, "rides": counts.get(day, 0)})
+    metric = request.args.get("metric", "rides")
+    if metric not in rollups.SERIES_METRICS:
+        return fail(f"metric must be one of: {', '.join(rollups.SERIES_METRICS)}", 400)
+    bucket = request.args.get("bucket", "day")
+    if bucket not in rollups.SERIES_BUCKETS:
+        return fail(f"bucket must be one of: {', '.join(rollups.SERIES_BUCKETS)}", 400)
+    try:
+        days = int(request.args.get("days", 30))
+        days = max(1, min(days, MAX_SERIES_DAYS))
+    except ValueError:
+        return fail("days must be a positive integer", 400)
 
-    return ok(result)
+    points = rollups.filled_series(metric, bucket, days)
+    return ok({
+        "metric": metric,
+        "bucket": bucket,
+        "days": days,
+        "points": [{"start": start.isoformat(), "value": n} for start, n in points],
+    })
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/export?table=events&since=2026-01-01&format=ndjson
+#   Streams a full table (events | rides | bookings | trips) as NDJSON or CSV.
+#   Rows are fetched in chunks while the response is sent (constant memory).
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/export")
+@jwt_required()
+def export_table():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    from ..services.analytics_export import FORMATS, TABLES, export_lines
+
+    table = request.args.get("table", "events")
+    if table not in TABLES:
+        return fail(f"table must be one of: {', '.join(TABLES)}", 400)
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return fail(f"format must be one of: {', '.join(FORMATS)}", 400)
+    since = None
+    if request.args.get("since"):
+        try:
+            since = datetime.fromisoformat(request.args["since"])
+        except ValueError:
+            return fail("since must be an ISO date or datetime", 400)
+
+    filename = f"urbix-{table}-{datetime.utcnow():%Y%m%d%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(export_lines(table, since, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -168,16 +183,145 @@ def get_booking_status_dist():
     if err:
         return err
 
-    rows = (
-        db.session.query(CarpoolBooking.status, db.func.count(CarpoolBooking.id))
-        .group_by(CarpoolBooking.status)
-        .all()
-    )
+    data = [{"status": status, "count": count}
+            for status, count in sorted(rollups.booking_status_totals().items())
+            if count]
+    return ok(data)
+
+
+def _window_days(default: int = 30):
+    """Parse ?days= into a [since, now) window, or return an error response."""
+    try:
+        days = int(request.args.get("days", default))
+        days = max(1, min(days, MAX_SERIES_DAYS))
+    except ValueError:
+        return None, fail("days must be a positive integer", 400)
+    now = datetime.utcnow()
+    return (now - timedelta(days=days), now), None
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/bookings/durations?from=PENDING&to=ACCEPTED&days=30
+#   Time from a booking entering one status to entering another (e.g. driver
+#   response time), for transitions in the last N days.
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/bookings/durations")
+@jwt_required()
+def get_booking_durations():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    from ..services.booking_lifecycle import durations
+
+    from_status = request.args.get("from", "PENDING").upper()
+    to_status = request.args.get("to", "ACCEPTED").upper()
+    statuses = ("PENDING", "ACCEPTED", "REJECTED", "CANCELLED")
+    if from_status not in statuses or to_status not in statuses:
+        return fail(f"from/to must be one of: {', '.join(statuses)}", 400)
+    window, err = _window_days()
+    if err:
+        return err
+
+    return ok(durations(from_status, to_status, *window))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/bookings/funnel?days=30
+#   What became of the ride requests made in the last N days.
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/bookings/funnel")
+@jwt_required()
+def get_booking_funnel():
+    _, err = _require_admin()
+    if err:
+        return err
 
-    data = [{"status": row[0], "count": row[1]} for row in rows]
+    from ..services.booking_lifecycle import funnel
+
+    window, err = _window_days()
+    if err:
+        return err
+
+    return ok(funnel(*window))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/latency?driver_id=12
+#   p50/p90/p99 driver response time and request → decision latency, from
+#   persisted t-digest sketches (constant time, whatever the booking count).
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/latency")
+@jwt_required()
+def get_latency():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    from ..services.latency_stats import LatencyStats
+
+    data = {
+        "driver_response": LatencyStats.summary("driver_response"),
+        "booking_latency": LatencyStats.summary("booking_latency"),
+    }
+    driver_id = request.args.get("driver_id")
+    if driver_id:
+        if not driver_id.isdigit():
+            return fail("driver_id must be an integer", 400)
+        data["driver"] = {
+            "driver_id": int(driver_id),
+            **LatencyStats.summary("driver_response", f"driver:{driver_id}"),
+        }
     return ok(data)
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/heatmap?kind=ride&end=origin&precision=5&from=&to=
+#   Demand per geohash tile from the hourly tile counters (no raw-row scans).
+#   from/to are ISO dates or datetimes; default the last 7 days.
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/heatmap")
+@jwt_required()
+def get_heatmap():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    kind = request.args.get("kind", "ride")
+    if kind not in rollups.HEATMAP_KINDS:
+        return fail(f"kind must be one of: {', '.join(rollups.HEATMAP_KINDS)}", 400)
+    end = request.args.get("end", "origin")
+    if end not in rollups.HEATMAP_ENDS:
+        return fail(f"end must be one of: {', '.join(rollups.HEATMAP_ENDS)}", 400)
+    try:
+        precision = int(request.args.get("precision", 5))
+    except ValueError:
+        return fail("precision must be an integer", 400)
+    if not 1 <= precision <= rollups.TILE_PRECISION:
+        return fail(f"precision must be between 1 and {rollups.TILE_PRECISION}", 400)
+    try:
+        until = (datetime.fromisoformat(request.args["to"]) if request.args.get("to")
+                 else rollups.bucket_start(datetime.utcnow(), "hour") + timedelta(hours=1))
+        since = (datetime.fromisoformat(request.args["from"]) if request.args.get("from")
+                 else until - timedelta(days=7))
+    except ValueError:
+        return fail("from/to must be ISO dates or datetimes", 400)
+    if since >= until:
+        return fail("from must be before to", 400)
+    if until - since > timedelta(days=MAX_SERIES_DAYS):
+        return fail(f"range must be at most {MAX_SERIES_DAYS} days", 400)
+
+    tiles = rollups.heatmap(kind, end, precision, since, until)
+    return ok({
+        "kind": kind,
+        "end": end,
+        "precision": precision,
+        "from": since.isoformat(),
+        "to": until.isoformat(),
+        "tiles": tiles,
+    })
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # GET /api/analytics/mobility/services
 #   High-level info on all mobility services via the Factory pattern.
@@ -190,19 +334,79 @@ def get_mobility_services():
         return err
 
     from ..services.mobility_factory import MobilityServiceFactory
-    services = MobilityServiceFactory.create_all()
-    data = []
-    for svc in services:
-        try:
-            info = svc.get_info()
-            info["available"] = svc.is_available()
-            data.append(info)
-        except Exception as exc:
-            data.append({
-                "service_type": svc.service_type,
-                "display_name": svc.display_name,
-                "available": False,
-                "error": str(exc),
-            })
+    # Probed in parallel with per-service deadlines, cached for a short TTL
+    return ok(MobilityServiceFactory.probe_all())
 
-    return ok(data)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/event-bus
+#   EventBus delivery counters (mode, queue depth, dropped events).
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/event-bus")
+@jwt_required()
+def get_event_bus_stats():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    from ..services.event_bus import EventBus
+    from ..services.live_stream import LiveFeed
+    return ok({**EventBus.stats(), "live_stream": LiveFeed.stats()})
+
+
+STREAM_SCOPE = "analytics_stream"
+
+
+@jwt.token_verification_loader
+def _stream_tokens_only_on_the_stream(jwt_header, jwt_data):
+    """A stream token (see /stream-token) authenticates the live stream and nothing else."""
+    return (jwt_data.get("scope") != STREAM_SCOPE
+            or request.endpoint == "analytics.live_stream")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# POST /api/analytics/stream-token
+#   EventSource cannot set headers, so the dashboard first trades its access
+#   token for a short-lived, stream-only one, set as an httponly cookie that
+#   the browser sends to /stream alone (JWT_ACCESS_COOKIE_PATH).
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.post("/stream-token")
+@jwt_required()
+def issue_stream_token():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    expires = current_app.config["ANALYTICS_STREAM_TOKEN_EXPIRES"]
+    token = create_access_token(identity=get_jwt_identity(), expires_delta=expires,
+                                additional_claims={"role": "admin", "scope": STREAM_SCOPE})
+    resp, status = ok({"expires_in": int(expires.total_seconds())})
+    set_access_cookies(resp, token, max_age=int(expires.total_seconds()))
+    return resp, status
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /api/analytics/stream
+#   Server-Sent Events: each new event and the counter deltas it causes.
+#   Authenticated by the /stream-token cookie (or an Authorization header).
+#   All open streams share one EventBus subscription (services/live_stream.py).
+# ──────────────────────────────────────────────────────────────────────────────
+@analytics_bp.get("/stream")
+@jwt_required()
+def live_stream():
+    _, err = _require_admin()
+    if err:
+        return err
+
+    from ..services.live_stream import LiveFeed, stream
+
+    if not LiveFeed._listen(1, current_app.config["ANALYTICS_STREAM_MAX_LISTENERS"]):
+        return fail("Too many open live streams", 503)
+    # No stream_with_context: the generator never touches the DB or the request
+    resp = Response(
+        stream(request.headers.get("Last-Event-ID")),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    resp.call_on_close(lambda: LiveFeed._listen(-1))
+    return resp
@@ -8,8 +8,8 @@ from flask_jwt_extended import (
 from ..extensions import db, bcrypt
 from ..models import User, UserPreferences
 from ..utils.responses import ok, fail
-from ..utils.emailer import send_email
 from ..services.event_bus import EventBus
+from ..services.notifications import queue_email
 
 auth_bp = Blueprint("auth", __name__)
 logger  = logging.getLogger(__name__)
@@ -46,15 +46,11 @@ def register():
     prefs = UserPreferences(user=user)
     db.session.add(user)
     db.session.add(prefs)
-    db.session.commit()
-
+    db.session.flush()
     EventBus.publish("user_registered", user_id=user.id, metadata={"email": email})
-
-    # Send verification email (best-effort — don't block registration on failure)
-    try:
-        _send_verification_email(user.email, user.full_name, verif_token)
-    except Exception as exc:
-        logger.warning("Verification email failed for %s: %s", email, exc)
+    # Outbox row commits with the account; delivery never blocks registration
+    _queue_verification_email(user, verif_token)
+    db.session.commit()
 
     access, refresh = _make_tokens(user.id)
     return ok({
@@ -144,14 +140,9 @@ def resend_verification():
 
     token = secrets.token_urlsafe(32)
     user.verification_token = token
+    _queue_verification_email(user, token)
     db.session.commit()
 
-    try:
-        _send_verification_email(user.email, user.full_name, token)
-    except Exception as exc:
-        logger.warning("Resend verification failed: %s", exc)
-        return fail("Failed to send email. Please try again later.", 500)
-
     return ok({"sent": True})
 
 
@@ -196,7 +187,9 @@ def admin_login():
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _send_verification_email(to_email: str, name: str, token: str) -> None:
+def _queue_verification_email(user: User, token: str) -> None:
+    """Add the verification email to the outbox in the current session. The caller commits."""
+    name = user.full_name
     frontend = "http://localhost:5173"
     verify_url = f"{frontend}/#/verify-email/{token}"
     body = (
@@ -220,4 +213,4 @@ def _send_verification_email(to_email: str, name: str, token: str) -> None:
         If you didn't create an UrbiX account, you can ignore this email.
       </p>
     </div>"""
-    send_email(to_email, "Verify your UrbiX email address", body, html=html)
+    queue_email(user.email, "Verify your UrbiX email address", body, html=html, user_id=user.id)
@@ -0,0 +1,92 @@
+"""
+Matching Controller
+===================
+Ranks open carpool rides for a passenger using the vectorised
+MatchingService (pickup gap, drop-off gap, departure time, preference
+conflicts and driver rating).
+
+POST /api/matching/rides
+    { originLat, originLng, destinationLat, destinationLng,
+      date, time, seats, radiusKm, limit, preferences? }
+"""
+
+from datetime import datetime
+
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
+
+from ..models import User, RidePost
+from ..services.matching_service import MatchingService, preferences_from_user
+from ..utils.geocoding import point_from_payload
+from ..utils.responses import ok, fail
+from ..utils.eager import serializer_options
+
+matching_bp = Blueprint("matching", __name__)
+
+MAX_RESULTS = 50
+
+
+@matching_bp.post("/rides")
+@jwt_required(optional=True)
+def match_rides():
+    data = request.get_json(silent=True) or {}
+
+    origin      = point_from_payload(data, "origin")
+    destination = point_from_payload(data, "destination")
+    if origin is None and destination is None:
+        return fail("originLat/originLng or destinationLat/destinationLng is required", 400)
+
+    departure = None
+    date = (data.get("date") or "").strip()
+    time = (data.get("time") or "").strip()
+    if date and time:
+        try:
+            departure = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            return fail("Invalid date/time format", 400)
+
+    try:
+        seats = int(data.get("seats", 1))
+        limit = max(1, min(int(data.get("limit", 20)), MAX_RESULTS))
+        radius = data.get("radiusKm", data.get("radius_km"))
+        radius = float(radius) if radius is not None else None
+    except (TypeError, ValueError):
+        return fail("seats, limit and radiusKm must be numbers", 400)
+
+    # Logged-in passengers are matched on their saved preferences and never
+    # see their own rides; explicit preferences in the body take precedence.
+    identity = get_jwt_identity()
+    user = User.query.get(int(identity)) if identity else None
+    cp = data.get("preferences")
+    if isinstance(cp, dict):
+        preferences = {
+            "allow_smoking": bool(cp.get("allowSmoking", False)),
+            "allow_pets":    bool(cp.get("allowPets", False)),
+            "music_ok":      bool(cp.get("musicOk", True)),
+            "chatty":        bool(cp.get("chatty", True)),
+        }
+    else:
+        preferences = preferences_from_user(user) if user else None
+
+    matches = MatchingService.rank(
+        origin=origin,
+        destination=destination,
+        departure=departure,
+        preferences=preferences,
+        seats=seats,
+        exclude_user_id=user.id if user else None,
+        max_pickup_km=radius,
+        max_dropoff_km=radius,
+        limit=limit,
+    )
+    if not matches:
+        return ok([])
+
+    rides = {r.id: r for r in RidePost.query
+             .options(*serializer_options(joinedload(RidePost.creator)))
+             .filter(RidePost.id.in_([m["ride_id"] for m in matches]))}
+    matches = [m for m in matches if m["ride_id"] in rides]
+    for m in matches:
+        m["ride"] = rides[m["ride_id"]].to_dict()
+    return ok(matches)
@@ -1,14 +1,22 @@
 import logging
 logger = logging.getLogger(__name__)
+from collections import Counter
 from datetime import datetime, timedelta
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from ..extensions import db
-from ..models import User, RidePost, CarpoolBooking
-from ..utils.responses import ok, fail
-from ..utils.emailer import send_email
-from ..utils.email_templates import urbix_email_html
+from ..models import User, RidePost, CarpoolBooking, BookingTransition
+from ..utils.responses import ok, ok_page, fail
+from ..utils.pagination import keyset_page, CursorError
+from ..utils.eager import serializer_options
+from ..utils.email_templates import urbix_email_html, ride_rows
 from ..services.event_bus import EventBus
+from ..services.lifecycle_sweeper import queue_expired_notice
+from ..services.notifications import queue_email
+from ..services.ride_index import RideSpatialIndex
+from ..services.ride_search import filter_rides
+from ..services.matching_service import MatchingService, preferences_from_user
 from ..services.push_service import (
     notify_booking_approved, notify_booking_rejected,
     notify_booking_cancelled, notify_new_request,
@@ -16,12 +24,10 @@ from ..services.push_service import (
 from ..models.trip import Trip
 from ..services.co2_service import CO2Calculator
 from ..services.cost_service import CostCalculator
-from ..utils.geocoding import distance_between
+from ..utils.geocoding import distance_between, point_from_payload
 
 ride_bp = Blueprint("rides", __name__)
 
-AUTO_REJECT_AFTER = timedelta(hours=24)
-
 
 def parse_departure_datetime(date_str: str, time_str: str) -> datetime:
     return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
@@ -36,64 +42,17 @@ def _current_user():
     return User.query.get(user_id)
 
 
-def _ride_rows(ride: RidePost, *, seats: int | None = None, status: str | None = None):
-    rows = [
-        ("Route", f"{ride.departure} → {ride.destination}"),
-        ("Departure", ride.departure_datetime.isoformat()),
-        ("Seats available", str(ride.seats_available)),
-    ]
-    if seats is not None:
-        rows.append(("Seats requested", str(seats)))
-    if status is not None:
-        rows.append(("Status", status))
-    return rows
-
-
-def auto_reject_expired_requests():
-    """Reject PENDING requests older than 24h (called on-demand)."""
-    cutoff = _now() - AUTO_REJECT_AFTER
-    expired = CarpoolBooking.query.filter(
-        CarpoolBooking.status == "PENDING",
-        CarpoolBooking.created_at < cutoff,
-    ).all()
-
-    if not expired:
-        return
-
-    for b in expired:
-        b.status = "REJECTED"
-        b.status_updated_at = _now()
-
-        passenger = b.passenger
-        ride = b.ride_post
-
-        # Email passenger (lux HTML + text fallback)
-        try:
-            text = (
-                f"Your request for {ride.departure} → {ride.destination} at "
-                f"{ride.departure_datetime.isoformat()} was auto-rejected because "
-                f"the driver didn’t respond within 24 hours."
-            )
-            html = urbix_email_html(
-                title="Request auto-rejected",
-                subtitle="The driver did not respond within 24 hours.",
-                badge="EXPIRED",
-                rows=_ride_rows(ride, seats=b.seats_requested,
-                                status="Rejected"),
-                cta_text="Open My Rides",
-                cta_url="",
-                footer_note="UrbiX • This is an automated update",
-            )
-            send_email(
-                passenger.email,
-                "UrbiX: Ride request auto-rejected (no response)",
-                text,
-                html=html,
-            )
-        except Exception as e:
-            logger.warning("[EMAIL] send failed: %s", e)
-
-    db.session.commit()
+def _materialize_expiry(booking: CarpoolBooking) -> None:
+    """
+    Write out a lapsed PENDING → REJECTED before the booking is mutated, in
+    the caller's transaction.  Call it only once the user may act on the
+    booking: it queues the passenger's notice and publishes the event.
+    """
+    if booking.materialize_expiry():
+        queue_expired_notice(booking)
+        EventBus.publish("booking_expired", user_id=booking.passenger_user_id,
+                         metadata={"ride_id": booking.ride_post_id, "booking_id": booking.id,
+                                   "waited_sec": booking.waited_sec()})
 
 
 # --------------------------
@@ -101,22 +60,21 @@ def auto_reject_expired_requests():
 # --------------------------
 @ride_bp.get("")
 def list_rides():
-    auto_reject_expired_requests()
-
     departure = (request.args.get("departure") or "").strip()
     destination = (request.args.get("destination") or "").strip()
     date = (request.args.get("date") or "").strip()  # YYYY-MM-DD
 
-    q = RidePost.query
-
-    if departure:
-        q = q.filter(RidePost.departure.ilike(f"%{departure}%"))
-    if destination:
-        q = q.filter(RidePost.destination.ilike(f"%{destination}%"))
+    # Indexed, accent-insensitive text match (FTS5 on SQLite, trigram on Postgres)
+    q = filter_rides(RidePost.query, departure=departure, destination=destination)
+    q = q.options(*serializer_options(joinedload(RidePost.creator)))
     if date:
         try:
-            day = datetime.strptime(date, "%Y-%m-%d").date()
-            q = q.filter(db.func.date(RidePost.departure_datetime) == day)
+            # Half-open [day, day + 1) range so the (status, departure_datetime) index is usable
+            day_start = datetime.strptime(date, "%Y-%m-%d")
+            q = q.filter(
+                RidePost.departure_datetime >= day_start,
+                RidePost.departure_datetime < day_start + timedelta(days=1),
+            )
         except ValueError:
             return fail("Invalid date format. Use YYYY-MM-DD.", 400)
 
@@ -132,8 +90,47 @@ def list_rides():
     if request.args.get("all_statuses") != "1":
         q = q.filter(RidePost.status == "OPEN")
 
-    rides = q.order_by(RidePost.departure_datetime.asc()).limit(50).all()
-    return ok([r.to_dict() for r in rides])
+    try:
+        rides, next_cursor = keyset_page(q, RidePost.departure_datetime, RidePost.id)
+    except CursorError as exc:
+        return fail(str(exc), 400)
+    return ok_page([r.to_dict() for r in rides], next_cursor)
+
+
+# --------------------------
+# Rides near a point (public)
+# --------------------------
+@ride_bp.get("/nearby")
+def nearby_rides():
+    # Radius lookup served from the in-memory spatial index (pickup or drop-off point)
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        radius_km = float(request.args.get("radius_km", 2.0))
+    except (KeyError, TypeError, ValueError):
+        return fail("lat, lng and radius_km must be numbers", 400)
+    if not (0 < radius_km <= 50):
+        return fail("radius_km must be between 0 and 50", 400)
+
+    end = request.args.get("end", "pickup")
+    if end not in ("pickup", "dropoff"):
+        return fail("end must be 'pickup' or 'dropoff'", 400)
+
+    hits = RideSpatialIndex.nearby(lat, lng, radius_km, end=end)[:50]
+    if not hits:
+        return ok([])
+
+    distances = {r.id: dist for r, dist in hits}
+    rides = (RidePost.query
+             .options(*serializer_options(joinedload(RidePost.creator)))
+             .filter(RidePost.id.in_(distances))
+             .all())
+    out = []
+    for ride in sorted(rides, key=lambda r: distances[r.id]):
+        d = ride.to_dict()
+        d["distance_km"] = round(distances[ride.id], 3)
+        out.append(d)
+    return ok(out)
 
 
 # --------------------------
@@ -154,8 +151,6 @@ def get_ride(ride_id: int):
 @ride_bp.post("")
 @jwt_required()
 def create_ride_offer():
-    auto_reject_expired_requests()
-
     user = _current_user()
     if not user:
         return fail("User not found", 404)
@@ -230,10 +225,18 @@ def create_ride_offer():
         meetup_lat=meetup_lat,
         meetup_lng=meetup_lng,
     )
+    # Resolve coordinates once at write time so matching never geocodes
+    ride.resolve_coordinates()
 
     db.session.add(ride)
+    # Flush for ride.id, then publish so the analytics row commits with the ride
+    db.session.flush()
+    EventBus.publish("ride_created", user_id=user.id, metadata={
+        "ride_id": ride.id, "departure": ride.departure, "destination": ride.destination,
+        "departure_geohash": ride.departure_geohash,
+        "destination_geohash": ride.destination_geohash,
+    })
     db.session.commit()
-    EventBus.publish("ride_created", user_id=user.id, metadata={"ride_id": ride.id, "departure": ride.departure, "destination": ride.destination})
     return ok(ride.to_dict(), 201)
 
 
@@ -243,8 +246,6 @@ def create_ride_offer():
 @ride_bp.put("/<int:ride_id>")
 @jwt_required()
 def update_ride(ride_id: int):
-    auto_reject_expired_requests()
-
     user = _current_user()
     if not user:
         return fail("User not found", 404)
@@ -258,10 +259,16 @@ def update_ride(ride_id: int):
 
     data = request.get_json(silent=True) or {}
 
+    old_departure, old_destination = ride.departure, ride.destination
     if "departure" in data:
         ride.departure = (data["departure"] or "").strip()
     if "destination" in data:
         ride.destination = (data["destination"] or "").strip()
+    if ride.departure != old_departure or ride.destination != old_destination:
+        ride.resolve_coordinates(
+            departure=ride.departure != old_departure,
+            destination=ride.destination != old_destination,
+        )
 
     # allow either (date,time) or departure_datetime ISO (we currently handle date/time)
     if "date" in data and "time" in data:
@@ -296,6 +303,7 @@ def update_ride(ride_id: int):
     elif ride.status == "FULL":
         ride.status = "OPEN"
 
+    EventBus.publish("ride_updated", user_id=user.id, metadata={"ride_id": ride.id})
     db.session.commit()
     return ok(ride.to_dict())
 
@@ -306,8 +314,6 @@ def update_ride(ride_id: int):
 @ride_bp.delete("/<int:ride_id>")
 @jwt_required()
 def delete_ride(ride_id: int):
-    auto_reject_expired_requests()
-
     user = _current_user()
     if not user:
         return fail("User not found", 404)
@@ -319,35 +325,40 @@ def delete_ride(ride_id: int):
     if ride.creator_user_id != user.id:
         return fail("Not allowed", 403)
 
-    # Optional: notify all pending/accepted passengers
-    bookings = CarpoolBooking.query.filter_by(ride_post_id=ride.id).all()
+    # Notify all pending/accepted passengers — outbox rows commit with the delete
+    bookings = (CarpoolBooking.query
+                .options(joinedload(CarpoolBooking.passenger))
+                .filter_by(ride_post_id=ride.id)
+                .all())
     for b in bookings:
-        if b.status in ("PENDING", "ACCEPTED"):
-            try:
-                text = (
-                    f"The ride {ride.departure} → {ride.destination} at "
-                    f"{ride.departure_datetime.isoformat()} was cancelled by the driver."
-                )
-                html = urbix_email_html(
-                    title="Ride cancelled",
-                    subtitle="The driver cancelled this ride offer.",
-                    badge="CANCELLED",
-                    rows=_ride_rows(
-                        ride, seats=b.seats_requested, status="Cancelled"),
-                    cta_text="Open My Rides",
-                    cta_url="",
-                    footer_note="UrbiX • We’ll help you find another ride soon",
-                )
-                send_email(
-                    b.passenger.email,
-                    "UrbiX: Ride cancelled",
-                    text,
-                    html=html,
-                )
-            except Exception as e:
-                logger.warning("[EMAIL] send failed: %s", e)
+        if b.effective_status in ("PENDING", "ACCEPTED"):
+            text = (
+                f"The ride {ride.departure} → {ride.destination} at "
+                f"{ride.departure_datetime.isoformat()} was cancelled by the driver."
+            )
+            html = urbix_email_html(
+                title="Ride cancelled",
+                subtitle="The driver cancelled this ride offer.",
+                badge="CANCELLED",
+                rows=ride_rows(
+                    ride, seats=b.seats_requested, status="Cancelled"),
+                cta_text="Open My Rides",
+                cta_url="",
+                footer_note="UrbiX • We’ll help you find another ride soon",
+            )
+            queue_email(
+                b.passenger.email,
+                "UrbiX: Ride cancelled",
+                text,
+                html=html,
+                user_id=b.passenger_user_id,
+            )
 
+    ride_id = ride.id
+    removed = Counter(b.status for b in bookings)
     db.session.delete(ride)
+    EventBus.publish("ride_deleted", user_id=user.id,
+                     metadata={"ride_id": ride_id, "bookings": dict(removed)})
     db.session.commit()
     return ok({"deleted": True})
 
@@ -358,8 +369,6 @@ def delete_ride(ride_id: int):
 @ride_bp.post("/<int:ride_id>/request")
 @jwt_required()
 def request_ride(ride_id: int):
-    auto_reject_expired_requests()
-
     passenger = _current_user()
     if not passenger:
         return fail("User not found", 404)
@@ -385,7 +394,7 @@ def request_ride(ride_id: int):
             "REJECTED":  "Your previous request for this ride was rejected.",
             "CANCELLED": "You previously cancelled your request for this ride.",
         }
-        return fail(msg_map.get(existing.status, "You already requested this ride."), 409)
+        return fail(msg_map.get(existing.effective_status, "You already requested this ride."), 409)
 
     data = request.get_json(silent=True) or {}
 
@@ -408,49 +417,63 @@ def request_ride(ride_id: int):
     if seats_requested > ride.seats_available:
         return fail("Not enough seats available", 400)
 
+    # Score how well this ride fits the passenger; origin/destination are optional
+    # (the AI planner sends them, the plain listing does not).
+    try:
+        matched_score = MatchingService.score_ride(
+            ride,
+            origin=point_from_payload(data, "origin"),
+            destination=point_from_payload(data, "destination"),
+            preferences=preferences_from_user(passenger),
+        )
+    except Exception as exc:
+        logger.warning("Match scoring failed: %s", exc)
+        matched_score = None
+
     booking = CarpoolBooking(
         ride_post=ride,
         passenger=passenger,
         seats_requested=seats_requested,
         status="PENDING",
         status_updated_at=_now(),
+        matched_score=matched_score,
     )
+    ride.count_request()
+    ride.count_booking("PENDING", seats_requested)
     db.session.add(booking)
-    db.session.commit()
-    EventBus.publish("booking_created", user_id=passenger.id, metadata={"booking_id": booking.id, "ride_id": ride.id})
 
-    # Push notification to driver
-    try:
-        if ride.creator and ride.creator.fcm_token:
-            notify_new_request(ride.creator.fcm_token, ride.departure, ride.destination, passenger.full_name)
-    except Exception as _exc:
-        logger.warning("Push (new request) failed: %s", _exc)
+    # Notify the driver — outbox rows commit together with the booking
+    if ride.creator and ride.creator.fcm_token:
+        notify_new_request(ride.creator.fcm_token, ride.departure, ride.destination,
+                           passenger.full_name, user_id=ride.creator_user_id)
+    text = (
+        f"A user requested your ride {ride.departure} → {ride.destination} "
+        f"at {ride.departure_datetime.isoformat()}.\n\n"
+        f"Seats requested: {seats_requested}\n"
+        f"Open UrbiX → My Rides to approve/reject."
+    )
+    html = urbix_email_html(
+        title="New ride request",
+        subtitle="Someone requested a seat on your ride. Review it in My Rides.",
+        badge="ACTION NEEDED",
+        rows=ride_rows(ride, seats=seats_requested, status="Pending"),
+        cta_text="Review requests",
+        cta_url="#",  # To be replaced by our real url.
+        footer_note="UrbiX • Quick approvals get faster matches",
+    )
+    queue_email(
+        ride.creator.email,
+        "UrbiX: New ride request",
+        text,
+        html=html,
+        user_id=ride.creator_user_id,
+    )
 
-    # Email driver about the request
-    try:
-        text = (
-            f"A user requested your ride {ride.departure} → {ride.destination} "
-            f"at {ride.departure_datetime.isoformat()}.\n\n"
-            f"Seats requested: {seats_requested}\n"
-            f"Open UrbiX → My Rides to approve/reject."
-        )
-        html = urbix_email_html(
-            title="New ride request",
-            subtitle="Someone requested a seat on your ride. Review it in My Rides.",
-            badge="ACTION NEEDED",
-            rows=_ride_rows(ride, seats=seats_requested, status="Pending"),
-            cta_text="Review requests",
-            cta_url="#",  # To be replaced by our real url.
-            footer_note="UrbiX • Quick approvals get faster matches",
-        )
-        send_email(
-            ride.creator.email,
-            "UrbiX: New ride request",
-            text,
-            html=html,
-        )
-    except Exception as e:
-        logger.warning("[EMAIL] send failed: %s", e)
+    db.session.flush()
+    BookingTransition.record(booking, None, "PENDING", booking.created_at,
+                             actor_user_id=passenger.id)
+    EventBus.publish("booking_created", user_id=passenger.id, metadata={"booking_id": booking.id, "ride_id": ride.id})
+    db.session.commit()
 
     return ok(booking.to_dict(), 201)
 
@@ -461,8 +484,6 @@ def request_ride(ride_id: int):
 @ride_bp.get("/<int:ride_id>/requests")
 @jwt_required()
 def list_requests_for_ride(ride_id: int):
-    auto_reject_expired_requests()
-
     user = _current_user()
     if not user:
         return fail("User not found", 404)
@@ -474,10 +495,16 @@ def list_requests_for_ride(ride_id: int):
     if ride.creator_user_id != user.id:
         return fail("Not allowed", 403)
 
-    bookings = CarpoolBooking.query.filter_by(ride_post_id=ride.id).order_by(
-        CarpoolBooking.created_at.desc()
-    ).all()
-    return ok([b.to_dict() for b in bookings])
+    try:
+        bookings, next_cursor = keyset_page(
+            CarpoolBooking.query.filter_by(ride_post_id=ride.id)
+            .options(*serializer_options(joinedload(CarpoolBooking.passenger))),
+            CarpoolBooking.created_at, CarpoolBooking.id,
+            descending=True, default_limit=None,
+        )
+    except CursorError as exc:
+        return fail(str(exc), 400)
+    return ok_page([b.to_dict() for b in bookings], next_cursor)
 
 
 # --------------------------
@@ -486,8 +513,6 @@ def list_requests_for_ride(ride_id: int):
 @ride_bp.post("/requests/<int:booking_id>/approve")
 @jwt_required()
 def approve_request(booking_id: int):
-    auto_reject_expired_requests()
-
     driver = _current_user()
     if not driver:
         return fail("User not found", 404)
@@ -500,38 +525,56 @@ def approve_request(booking_id: int):
     if ride.creator_user_id != driver.id:
         return fail("Not allowed", 403)
 
+    _materialize_expiry(booking)
     if booking.status != "PENDING":
+        db.session.commit()  # keeps an expiry written just above
         return fail("Request is not pending", 400)
 
     if booking.seats_requested > ride.seats_available:
         return fail("Not enough seats available", 400)
 
     # approve + decrement seats
-    booking.status = "ACCEPTED"
-    booking.status_updated_at = _now()
+    booking.set_status("ACCEPTED", _now(), actor_user_id=driver.id)
     ride.seats_available -= booking.seats_requested
     if ride.seats_available <= 0:
         ride.seats_available = 0
         ride.status = "FULL"
 
-    db.session.commit()
-    EventBus.publish("booking_approved", user_id=driver.id, metadata={"booking_id": booking.id, "ride_id": ride.id})
+    # Notify the passenger — outbox rows commit together with the approval
+    if booking.passenger and booking.passenger.fcm_token:
+        notify_booking_approved(booking.passenger.fcm_token, ride.departure, ride.destination,
+                                user_id=booking.passenger_user_id)
+    text = (
+        f"Your request was approved for {ride.departure} → {ride.destination} "
+        f"at {ride.departure_datetime.isoformat()}."
+    )
+    html = urbix_email_html(
+        title="Request approved",
+        subtitle="You're in — the driver approved your request.",
+        badge="APPROVED",
+        rows=ride_rows(ride, seats=booking.seats_requested,
+                       status="Accepted"),
+        cta_text="Open My Rides",
+        cta_url="",
+        footer_note="UrbiX • Have a great ride",
+    )
+    queue_email(
+        booking.passenger.email,
+        "UrbiX: Ride request approved",
+        text,
+        html=html,
+        user_id=booking.passenger_user_id,
+    )
 
-    # Push notification to passenger
-    try:
-        if booking.passenger and booking.passenger.fcm_token:
-            notify_booking_approved(booking.passenger.fcm_token, ride.departure, ride.destination)
-    except Exception as _exc:
-        logger.warning("Push (approved) failed: %s", _exc)
+    EventBus.publish("booking_approved", user_id=driver.id, metadata={"booking_id": booking.id, "ride_id": ride.id, "waited_sec": booking.waited_sec()})
+    db.session.commit()
 
     # Auto-log trip for both driver and passenger with real distance
     try:
-        dist_km = distance_between(ride.departure, ride.destination)
+        dist_km = ride.route_distance_km() or distance_between(ride.departure, ride.destination)
         if dist_km and dist_km > 0:
             # Estimate occupants = accepted bookings + driver
-            occupants = CarpoolBooking.query.filter_by(
-                ride_post_id=ride.id, status="ACCEPTED"
-            ).count() + 1  # +1 for driver
+            occupants = ride.accepted_count + 1  # +1 for driver
 
             # Log for passenger
             passenger_trip = Trip(
@@ -540,6 +583,8 @@ def approve_request(booking_id: int):
                 distance_km=dist_km,
                 note=f"{ride.departure} → {ride.destination}",
                 booking_id=booking.id,
+                origin_geohash=ride.departure_geohash,
+                destination_geohash=ride.destination_geohash,
             )
             # Log for driver
             driver_trip = Trip(
@@ -547,47 +592,29 @@ def approve_request(booking_id: int):
                 mode="carpool",
                 distance_km=dist_km,
                 note=f"{ride.departure} → {ride.destination} (driver)",
+                origin_geohash=ride.departure_geohash,
+                destination_geohash=ride.destination_geohash,
             )
             db.session.add(passenger_trip)
             db.session.add(driver_trip)
+            db.session.flush()
+            for trip in (passenger_trip, driver_trip):
+                EventBus.publish("trip_logged", user_id=trip.user_id, metadata={
+                    "trip_id": trip.id, "mode": trip.mode, "distance_km": trip.distance_km,
+                    "origin_geohash": trip.origin_geohash,
+                    "destination_geohash": trip.destination_geohash,
+                })
             db.session.commit()
             logger.info("Auto-logged carpool trip: %.1f km for users %s and %s", dist_km, booking.passenger_user_id, driver.id)
     except Exception as exc:
         logger.warning("Auto trip logging failed: %s", exc)
 
-    # Email passenger
-    try:
-        text = (
-            f"Your request was approved for {ride.departure} → {ride.destination} "
-            f"at {ride.departure_datetime.isoformat()}."
-        )
-        html = urbix_email_html(
-            title="Request approved",
-            subtitle="You're in — the driver approved your request.",
-            badge="APPROVED",
-            rows=_ride_rows(ride, seats=booking.seats_requested,
-                            status="Accepted"),
-            cta_text="Open My Rides",
-            cta_url="",
-            footer_note="UrbiX • Have a great ride",
-        )
-        send_email(
-            booking.passenger.email,
-            "UrbiX: Ride request approved",
-            text,
-            html=html,
-        )
-    except Exception as e:
-        logger.warning("[EMAIL] send failed: %s", e)
-
     return ok({"booking": booking.to_dict(), "ride": ride.to_dict()})
 
 
 @ride_bp.post("/requests/<int:booking_id>/reject")
 @jwt_required()
 def reject_request(booking_id: int):
-    auto_reject_expired_requests()
-
     driver = _current_user()
     if not driver:
         return fail("User not found", 404)
@@ -600,44 +627,42 @@ def reject_request(booking_id: int):
     if ride.creator_user_id != driver.id:
         return fail("Not allowed", 403)
 
+    _materialize_expiry(booking)
     if booking.status != "PENDING":
+        db.session.commit()  # keeps an expiry written just above
         return fail("Request is not pending", 400)
 
-    booking.status = "REJECTED"
-    booking.status_updated_at = _now()
-    db.session.commit()
-    EventBus.publish("booking_rejected", user_id=driver.id, metadata={"booking_id": booking.id, "ride_id": ride.id})
+    booking.set_status("REJECTED", _now(), actor_user_id=driver.id)
 
-    # Push notification to passenger
-    try:
-        if booking.passenger and booking.passenger.fcm_token:
-            notify_booking_rejected(booking.passenger.fcm_token, ride.departure, ride.destination)
-    except Exception as _exc:
-        logger.warning("Push (rejected) failed: %s", _exc)
+    # Notify the passenger — outbox rows commit together with the rejection
+    if booking.passenger and booking.passenger.fcm_token:
+        notify_booking_rejected(booking.passenger.fcm_token, ride.departure, ride.destination,
+                                user_id=booking.passenger_user_id)
+    text = (
+        f"Your request was rejected for {ride.departure} → {ride.destination} "
+        f"at {ride.departure_datetime.isoformat()}."
+    )
+    html = urbix_email_html(
+        title="Request rejected",
+        subtitle="The driver wasn’t able to accept this request.",
+        badge="REJECTED",
+        rows=ride_rows(ride, seats=booking.seats_requested,
+                       status="Rejected"),
+        cta_text="Browse rides",
+        cta_url="",
+        footer_note="UrbiX • You’ll find another match",
+    )
+    queue_email(
+        booking.passenger.email,
+        "UrbiX: Ride request rejected",
+        text,
+        html=html,
+        user_id=booking.passenger_user_id,
+    )
+
+    EventBus.publish("booking_rejected", user_id=driver.id, metadata={"booking_id": booking.id, "ride_id": ride.id, "waited_sec": booking.waited_sec()})
+    db.session.commit()
 
-    try:
-        text = (
-            f"Your request was rejected for {ride.departure} → {ride.destination} "
-            f"at {ride.departure_datetime.isoformat()}."
-        )
-        html = urbix_email_html(
-            title="Request rejected",
-            subtitle="The driver wasn’t able to accept this request.",
-            badge="REJECTED",
-            rows=_ride_rows(ride, seats=booking.seats_requested,
-                            status="Rejected"),
-            cta_text="Browse rides",
-            cta_url="",
-            footer_note="UrbiX • You’ll find another match",
-        )
-        send_email(
-            booking.passenger.email,
-            "UrbiX: Ride request rejected",
-            text,
-            html=html,
-        )
-    except Exception as e:
-        logger.warning("[EMAIL] send failed: %s", e)
 
     return ok(booking.to_dict())
 
@@ -648,25 +673,25 @@ def reject_request(booking_id: int):
 @ride_bp.get("/bookings/me")
 @jwt_required()
 def my_bookings():
-    auto_reject_expired_requests()
-
     passenger = _current_user()
     if not passenger:
         return fail("User not found", 404)
 
-    bookings = (
-        CarpoolBooking.query.filter_by(passenger_user_id=passenger.id)
-        .order_by(CarpoolBooking.created_at.desc())
-        .all()
-    )
-    return ok([b.to_dict() for b in bookings])
+    try:
+        bookings, next_cursor = keyset_page(
+            CarpoolBooking.query.filter_by(passenger_user_id=passenger.id)
+            .options(*serializer_options(joinedload(CarpoolBooking.passenger))),
+            CarpoolBooking.created_at, CarpoolBooking.id,
+            descending=True, default_limit=None,
+        )
+    except CursorError as exc:
+        return fail(str(exc), 400)
+    return ok_page([b.to_dict() for b in bookings], next_cursor)
 
 
 @ride_bp.delete("/requests/<int:booking_id>")
 @jwt_required()
 def cancel_request(booking_id: int):
-    auto_reject_expired_requests()
-
     passenger = _current_user()
     if not passenger:
         return fail("User not found", 404)
@@ -678,45 +703,49 @@ def cancel_request(booking_id: int):
     if booking.passenger_user_id != passenger.id:
         return fail("Not allowed", 403)
 
+    _materialize_expiry(booking)
     if booking.status not in ("PENDING", "ACCEPTED"):
+        db.session.commit()  # keeps an expiry written just above
         return fail("Cannot cancel this request", 400)
 
     ride = booking.ride_post
 
+    from_status = booking.status
     # If it was accepted, return seats back
     if booking.status == "ACCEPTED":
         ride.seats_available += booking.seats_requested
         if ride.seats_available > 0 and ride.status == "FULL":
             ride.status = "OPEN"
 
-    booking.status = "CANCELLED"
-    booking.status_updated_at = _now()
-    db.session.commit()
+    booking.set_status("CANCELLED", _now(), actor_user_id=passenger.id)
 
-    # Optional: email driver
-    try:
-        text = (
-            f"A passenger cancelled their request for your ride "
-            f"{ride.departure} → {ride.destination} at {ride.departure_datetime.isoformat()}."
-        )
-        html = urbix_email_html(
-            title="Request cancelled",
-            subtitle="A passenger cancelled their ride request.",
-            badge="CANCELLED",
-            rows=_ride_rows(ride, seats=booking.seats_requested,
-                            status="Cancelled"),
-            cta_text="Open My Rides",
-            cta_url="",
-            footer_note="UrbiX • Seats are now available again",
-        )
-        send_email(
-            ride.creator.email,
-            "UrbiX: Ride request cancelled",
-            text,
-            html=html,
-        )
-    except Exception as e:
-        logger.warning("[EMAIL] send failed: %s", e)
+    # Notify the driver — outbox row commits together with the cancellation
+    text = (
+        f"A passenger cancelled their request for your ride "
+        f"{ride.departure} → {ride.destination} at {ride.departure_datetime.isoformat()}."
+    )
+    html = urbix_email_html(
+        title="Request cancelled",
+        subtitle="A passenger cancelled their ride request.",
+        badge="CANCELLED",
+        rows=ride_rows(ride, seats=booking.seats_requested,
+                       status="Cancelled"),
+        cta_text="Open My Rides",
+        cta_url="",
+        footer_note="UrbiX • Seats are now available again",
+    )
+    queue_email(
+        ride.creator.email,
+        "UrbiX: Ride request cancelled",
+        text,
+        html=html,
+        user_id=ride.creator_user_id,
+    )
+
+    EventBus.publish("booking_cancelled", user_id=passenger.id,
+                     metadata={"booking_id": booking.id, "ride_id": ride.id,
+                               "from_status": from_status})
+    db.session.commit()
 
     return ok({"cancelled": True, "booking": booking.to_dict(), "ride": ride.to_dict()})
 
@@ -727,39 +756,43 @@ def cancel_request(booking_id: int):
 @ride_bp.get("/mine/offered")
 @jwt_required()
 def my_offered_rides():
-    auto_reject_expired_requests()
-
     user = _current_user()
     if not user:
         return fail("User not found", 404)
 
-    rides = RidePost.query.filter_by(creator_user_id=user.id).order_by(
-        RidePost.departure_datetime.desc()
-    ).all()
-
-    # BUG 2: include request count so UI can show it without expanding
-    out = []
-    for r in rides:
-        d = r.to_dict()
-        d["requests_count"] = CarpoolBooking.query.filter_by(
-            ride_post_id=r.id).count()
-        out.append(d)
+    try:
+        rides, next_cursor = keyset_page(
+            RidePost.query.filter_by(creator_user_id=user.id)
+            .options(*serializer_options(joinedload(RidePost.creator))),
+            RidePost.departure_datetime, RidePost.id,
+            descending=True, default_limit=None,
+        )
+    except CursorError as exc:
+        return fail(str(exc), 400)
 
-    return ok(out)
+    # BUG 2: requests_count (maintained on the ride) lets the UI show it without expanding
+    return ok_page([r.to_dict() for r in rides], next_cursor)
 
 
 @ride_bp.get("/mine/requested")
 @jwt_required()
 def my_requested_rides():
-    auto_reject_expired_requests()
-
     user = _current_user()
     if not user:
         return fail("User not found", 404)
 
-    bookings = CarpoolBooking.query.filter_by(passenger_user_id=user.id).order_by(
-        CarpoolBooking.created_at.desc()
-    ).all()
+    try:
+        bookings, next_cursor = keyset_page(
+            CarpoolBooking.query.filter_by(passenger_user_id=user.id)
+            .options(*serializer_options(
+                joinedload(CarpoolBooking.passenger),
+                joinedload(CarpoolBooking.ride_post).joinedload(RidePost.creator),
+            )),
+            CarpoolBooking.created_at, CarpoolBooking.id,
+            descending=True, default_limit=None,
+        )
+    except CursorError as exc:
+        return fail(str(exc), 400)
 
     data = []
     for b in bookings:
@@ -769,4 +802,4 @@ def my_requested_rides():
             "ride": ride.to_dict(),
         })
 
-    return ok(data)
+    return ok_page(data, next_cursor)
@@ -4,8 +4,9 @@ Trip Controller
 Allows authenticated users to manually log trips they actually took.
 This feeds the real CO2 / cost dashboard (Issue 14).
 
-POST /api/trips/log        — log a trip
-GET  /api/trips/mine       — get my trip history
+POST /api/trips/log        — log a trip (optional originLat/originLng,
+                             destinationLat/destinationLng for the heatmap)
+GET  /api/trips/mine       — get my trip history (?limit=&after=<cursor>)
 GET  /api/trips/my-stats   — get real aggregated CO2 / cost stats
 """
 
@@ -18,7 +19,10 @@ from ..models.trip import Trip
 from ..services.co2_service import CO2Calculator
 from ..services.cost_service import CostCalculator
 from ..services.event_bus import EventBus
-from ..utils.responses import ok, fail
+from ..utils import geohash
+from ..utils.geocoding import point_from_payload
+from ..utils.responses import ok, ok_page, fail
+from ..utils.pagination import keyset_page, CursorError
 
 trip_bp = Blueprint("trips", __name__)
 
@@ -55,11 +59,16 @@ def log_trip():
     co2_kg    = CO2Calculator.calculate(mode, distance_km, occupants=occupants)
     cost_cad  = CostCalculator.calculate(mode, distance_km, occupants=occupants)
 
+    origin = point_from_payload(data, "origin")
+    destination = point_from_payload(data, "destination")
+
     trip = Trip(
         user_id=user_id,
         mode=mode,
         distance_km=distance_km,
         note=note,
+        origin_geohash=geohash.encode(*origin) if origin else None,
+        destination_geohash=geohash.encode(*destination) if destination else None,
     )
     db.session.add(trip)
     # FIX: flush first so trip.id is populated, then publish the analytics event
@@ -69,7 +78,9 @@ def log_trip():
     db.session.flush()
 
     EventBus.publish("trip_logged", user_id=user_id, metadata={
-        "trip_id": trip.id, "mode": mode, "distance_km": distance_km
+        "trip_id": trip.id, "mode": mode, "distance_km": distance_km,
+        "origin_geohash": trip.origin_geohash,
+        "destination_geohash": trip.destination_geohash,
     })
     db.session.commit()
 
@@ -87,14 +98,15 @@ def log_trip():
 @jwt_required()
 def my_trips():
     user_id = int(get_jwt_identity())
-    trips = (
-        Trip.query
-        .filter_by(user_id=user_id)
-        .order_by(Trip.created_at.desc())
-        .limit(100)
-        .all()
-    )
-    return ok([t.to_dict() for t in trips])
+    try:
+        trips, next_cursor = keyset_page(
+            Trip.query.filter_by(user_id=user_id),
+            Trip.created_at, Trip.id,
+            descending=True, default_limit=100,
+        )
+    except CursorError as exc:
+        return fail(str(exc), 400)
+    return ok_page([t.to_dict() for t in trips], next_cursor)
 
 
 # ── DELETE /api/trips/<id> ────────────────────────────────────────────────────
@@ -109,6 +121,12 @@ def delete_trip(trip_id: int):
     if trip.user_id != user_id:
         return fail("Not allowed", 403)
     db.session.delete(trip)
+    # Lets the analytics rollups take the trip back out of its mode and tiles
+    EventBus.publish("trip_deleted", user_id=user_id, metadata={
+        "trip_id": trip.id, "mode": trip.mode,
+        "origin_geohash": trip.origin_geohash,
+        "destination_geohash": trip.destination_geohash,
+    })
     db.session.commit()
     return ok({"deleted": True, "trip_id": trip_id})
 
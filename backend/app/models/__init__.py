@@ -2,9 +2,13 @@ from .user import User
 from .preferences import UserPreferences
 from .ride_post import RidePost
 from .booking import CarpoolBooking
+from .booking_transition import BookingTransition
 from .analytics_event import AnalyticsEvent
+from .analytics_rollup import AnalyticsRollup
+from .latency_sketch import LatencySketch
 from .trip import Trip
 from .ride_rating import RideRating
+from .notification import NotificationOutbox
 
-__all__ = ["User", "UserPreferences", "RidePost", "CarpoolBooking",
-           "AnalyticsEvent", "Trip", "RideRating"]
+__all__ = ["User", "UserPreferences", "RidePost", "CarpoolBooking", "BookingTransition",
+           "AnalyticsEvent", "AnalyticsRollup", "LatencySketch", "Trip", "RideRating", "NotificationOutbox"]
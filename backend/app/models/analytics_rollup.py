@@ -0,0 +1,42 @@
+"""
+AnalyticsRollup model — precomputed hourly/daily counters for the admin dashboard.
+Maintained incrementally from EventBus events (see services/analytics_rollup.py).
+"""
+from ..extensions import db
+
+
+class AnalyticsRollup(db.Model):
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        # One counter per bucket; also the upsert conflict target and the
+        # range scan for (granularity, metric, bucket_start) reads
+        db.UniqueConstraint("granularity", "metric", "bucket_start", "dimension",
+                            name="uq_analytics_rollups_bucket"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # "hour" | "day"
+    granularity = db.Column(db.String(4), nullable=False)
+
+    # e.g. "events", "rides_created", "rides_deleted", "bookings_status",
+    #       "users_registered", "trips"
+    metric = db.Column(db.String(40), nullable=False)
+
+    # Start of the hour/day (UTC)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+
+    # Breakdown key — event type, booking status, trip mode; "" when none
+    dimension = db.Column(db.String(60), nullable=False, default="", server_default="")
+
+    # Net change in the bucket (negative for bookings leaving a status)
+    value = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    def to_dict(self) -> dict:
+        return {
+            "granularity": self.granularity,
+            "metric": self.metric,
+            "bucket_start": self.bucket_start.isoformat(),
+            "dimension": self.dimension,
+            "value": self.value,
+        }
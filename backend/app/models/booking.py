@@ -1,9 +1,29 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case
+from sqlalchemy.ext.hybrid import hybrid_property
+
 from ..extensions import db
 
+# A PENDING request the driver has not answered within this window is rejected
+AUTO_REJECT_AFTER = timedelta(hours=24)
+
+
+def _default_expires_at(context):
+    created = context.get_current_parameters().get("created_at") or datetime.utcnow()
+    return created + AUTO_REJECT_AFTER
+
 
 class CarpoolBooking(db.Model):
     __tablename__ = "carpool_bookings"
+    __table_args__ = (
+        # Auto-reject sweep: WHERE status = 'PENDING' AND created_at < cutoff
+        db.Index("ix_carpool_bookings_status_created", "status", "created_at"),
+        # Per-ride lookups, e.g. accepted passengers of a ride (also serves ride_post_id alone)
+        db.Index("ix_carpool_bookings_ride_status", "ride_post_id", "status"),
+        # Keyset pages of a passenger's bookings, newest first
+        db.Index("ix_carpool_bookings_passenger_created", "passenger_user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -11,13 +31,11 @@ class CarpoolBooking(db.Model):
         db.Integer,
         db.ForeignKey("ride_posts.id"),
         nullable=False,
-        index=True,
     )
     passenger_user_id = db.Column(
         db.Integer,
         db.ForeignKey("users.id"),
         nullable=False,
-        index=True,
     )
 
     seats_requested = db.Column(db.Integer, default=1, nullable=False)
@@ -33,16 +51,71 @@ class CarpoolBooking(db.Model):
     created_at = db.Column(
         db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # created_at + AUTO_REJECT_AFTER; NULL only on rows that predate the column
+    expires_at = db.Column(db.DateTime, default=_default_expires_at, nullable=True)
+
     ride_post = db.relationship("RidePost", back_populates="bookings")
     passenger = db.relationship("User", back_populates="bookings")
 
+    def is_expired(self, now: datetime | None = None) -> bool:
+        """A PENDING request past its expiry — reads as REJECTED even before it is written."""
+        return (
+            self.status == "PENDING"
+            and self.expires_at is not None
+            and self.expires_at <= (now or datetime.utcnow())
+        )
+
+    @hybrid_property
+    def effective_status(self) -> str:
+        """Status as readers should see it: PENDING past expiry is REJECTED."""
+        return "REJECTED" if self.is_expired() else self.status
+
+    @effective_status.expression
+    def effective_status(cls):
+        return case(
+            (and_(cls.status == "PENDING", cls.expires_at <= datetime.utcnow()), "REJECTED"),
+            else_=cls.status,
+        )
+
+    def materialize_expiry(self, now: datetime | None = None) -> bool:
+        """
+        Write an expired PENDING request as REJECTED (at its expiry time).
+        Call before mutating a booking; returns True if the row changed.
+        """
+        if not self.is_expired(now):
+            return False
+        self.set_status("REJECTED", self.expires_at)
+        return True
+
+    def set_status(self, new_status: str, at: datetime | None = None,
+                   actor_user_id: int | None = None) -> None:
+        """
+        Move to `new_status`, keeping the ride's booking counters in step and
+        appending the change to booking_transitions.
+        """
+        from .booking_transition import BookingTransition
+
+        ride = self.ride_post
+        old_status = self.status
+        ride.count_booking(old_status, self.seats_requested, sign=-1)
+        self.status = new_status
+        self.status_updated_at = at or datetime.utcnow()
+        ride.count_booking(new_status, self.seats_requested, sign=1)
+        BookingTransition.record(self, old_status, new_status, self.status_updated_at,
+                                 actor_user_id=actor_user_id)
+
+    def waited_sec(self) -> float:
+        """Seconds from the request to its last status change (the decision)."""
+        return round((self.status_updated_at - self.created_at).total_seconds(), 1)
+
     def to_dict(self):
         return {
             "id": self.id,
             "ride_post_id": self.ride_post_id,
             "passenger": self.passenger.to_safe_dict() if self.passenger else None,
             "seats_requested": self.seats_requested,
-            "status": self.status,
+            "status": self.effective_status,
             "matched_score": self.matched_score,
             "created_at": self.created_at.isoformat(),
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
         }
@@ -0,0 +1,58 @@
+"""
+BookingTransition model — append-only log of booking status changes.
+One row per change, written in the same transaction as the change itself
+(see CarpoolBooking.set_status); read by services/booking_lifecycle.py.
+"""
+from datetime import datetime
+from ..extensions import db
+
+
+class BookingTransition(db.Model):
+    __tablename__ = "booking_transitions"
+    __table_args__ = (
+        # A booking's history in order; joins from one transition to the next
+        db.Index("ix_booking_transitions_booking_at", "booking_id", "at"),
+        # Range scans: "approvals in the last 30 days"
+        db.Index("ix_booking_transitions_to_at", "to_status", "at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # No foreign keys: the log outlives bookings deleted with their ride
+    booking_id = db.Column(db.Integer, nullable=False)
+    ride_post_id = db.Column(db.Integer, nullable=False)
+
+    # NULL for the request being created
+    from_status = db.Column(db.String(30), nullable=True)
+    to_status = db.Column(db.String(30), nullable=False)
+
+    # Who caused it — NULL for automatic changes (expiry)
+    actor_user_id = db.Column(db.Integer, nullable=True)
+
+    at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @classmethod
+    def record(cls, booking, from_status: str | None, to_status: str,
+               at: datetime | None = None, actor_user_id: int | None = None) -> "BookingTransition":
+        """Add a transition for `booking` (which must have an id) to the session."""
+        row = cls(
+            booking_id=booking.id,
+            ride_post_id=booking.ride_post_id,
+            from_status=from_status,
+            to_status=to_status,
+            actor_user_id=actor_user_id,
+            at=at or datetime.utcnow(),
+        )
+        db.session.add(row)
+        return row
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "booking_id": self.booking_id,
+            "ride_post_id": self.ride_post_id,
+            "from_status": self.from_status,
+            "to_status": self.to_status,
+            "actor_user_id": self.actor_user_id,
+            "at": self.at.isoformat(),
+        }
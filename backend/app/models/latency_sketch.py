@@ -0,0 +1,33 @@
+"""
+LatencySketch model — persisted t-digest per (metric, scope).
+Maintained by services/latency_stats.py from EventBus booking events.
+"""
+import json
+from datetime import datetime
+from ..extensions import db
+
+
+class LatencySketch(db.Model):
+    __tablename__ = "latency_sketches"
+    __table_args__ = (
+        db.UniqueConstraint("metric", "scope", name="uq_latency_sketches_metric_scope"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # "driver_response" | "booking_latency"
+    metric = db.Column(db.String(40), nullable=False)
+
+    # "all", or "driver:<user id>"
+    scope = db.Column(db.String(40), nullable=False)
+
+    # JSON — TDigest.to_dict()
+    digest = db.Column(db.Text, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def get_digest(self) -> dict:
+        try:
+            return json.loads(self.digest)
+        except (ValueError, TypeError):
+            return {}
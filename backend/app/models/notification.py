@@ -0,0 +1,75 @@
+"""
+NotificationOutbox model — email/push notifications waiting to be delivered.
+Rows are added in the same transaction as the booking/ride change that
+causes them and drained by services/notifications.py.
+"""
+import json
+from datetime import datetime
+from ..extensions import db
+
+
+class NotificationOutbox(db.Model):
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Dispatcher claim: WHERE status = 'PENDING' AND available_at <= now
+        db.Index("ix_notification_outbox_status_available", "status", "available_at"),
+        # Coalescing: last notification sent to a recipient
+        db.Index("ix_notification_outbox_recipient_sent", "channel", "recipient", "sent_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # "email" | "push"
+    channel = db.Column(db.String(10), nullable=False)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    # Email address or FCM token, captured when the notification is queued
+    recipient = db.Column(db.String(512), nullable=False)
+
+    # Email subject / push title
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    # JSON blob — push data payload
+    payload = db.Column(db.Text, nullable=True)
+
+    # PENDING/SENDING/SENT/FAILED/SKIPPED
+    status = db.Column(db.String(12), default="PENDING", nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+
+    # Not delivered before this time (retry backoff)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Set by the dispatcher that claimed the row (status SENDING)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # ── helpers ──────────────────────────────────────────────────────────
+    def get_payload(self) -> dict:
+        if not self.payload:
+            return {}
+        try:
+            return json.loads(self.payload)
+        except (ValueError, TypeError):
+            return {}
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "channel": self.channel,
+            "user_id": self.user_id,
+            "subject": self.subject,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "available_at": self.available_at.isoformat(),
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+            "created_at": self.created_at.isoformat(),
+        }
@@ -1,9 +1,21 @@
 from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.sql import ClauseElement
+
 from ..extensions import db
+from ..utils import geohash
+from ..utils.geocoding import geocode, haversine_km
 
 
 class RidePost(db.Model):
     __tablename__ = "ride_posts"
+    __table_args__ = (
+        # Listing / matching hot path: WHERE status = ? AND departure_datetime >= ? ORDER BY departure_datetime
+        db.Index("ix_ride_posts_status_departure", "status", "departure_datetime"),
+        # Keyset pages of a driver's offered rides
+        db.Index("ix_ride_posts_creator_departure", "creator_user_id", "departure_datetime"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -11,7 +23,6 @@ class RidePost(db.Model):
         db.Integer,
         db.ForeignKey("users.id"),
         nullable=False,
-        index=True,
     )
 
     departure    = db.Column(db.String(255), nullable=False)
@@ -24,15 +35,33 @@ class RidePost(db.Model):
     meetup_lat  = db.Column(db.Float, nullable=True)
     meetup_lng  = db.Column(db.Float, nullable=True)
 
+    # Resolved coordinates of departure/destination, filled at write time so
+    # matching never has to geocode. NULL = not resolved (yet).
+    departure_lat   = db.Column(db.Float, nullable=True)
+    departure_lng   = db.Column(db.Float, nullable=True)
+    destination_lat = db.Column(db.Float, nullable=True)
+    destination_lng = db.Column(db.Float, nullable=True)
+    departure_geohash   = db.Column(db.String(12), nullable=True, index=True)
+    destination_geohash = db.Column(db.String(12), nullable=True, index=True)
+
     # Issue 8: driver's ride preferences (stored on the ride offer)
     allow_smoking = db.Column(db.Boolean, default=False, nullable=False)
     allow_pets    = db.Column(db.Boolean, default=False, nullable=False)
     music_ok      = db.Column(db.Boolean, default=True,  nullable=False)
     chatty        = db.Column(db.Boolean, default=True,  nullable=False)
 
+    # Booking counters, maintained in the same transaction as every booking
+    # status change (see CarpoolBooking.set_status) as `col = col + n` in the
+    # UPDATE, so concurrent changes never overwrite each other;
+    # `flask rides reconcile-counters` recomputes them from carpool_bookings.
+    requests_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    pending_count  = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    accepted_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    accepted_seats = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     # OPEN/FULL/CANCELLED/COMPLETED
     status = db.Column(db.String(30), nullable=False, default="OPEN")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     creator  = db.relationship("User", back_populates="ride_posts")
     bookings = db.relationship(
@@ -41,6 +70,70 @@ class RidePost(db.Model):
         cascade="all,delete-orphan",
     )
 
+    # ── coordinates ──────────────────────────────────────────────────────
+    @property
+    def departure_coords(self) -> tuple[float, float] | None:
+        if self.departure_lat is None or self.departure_lng is None:
+            return None
+        return self.departure_lat, self.departure_lng
+
+    @property
+    def destination_coords(self) -> tuple[float, float] | None:
+        if self.destination_lat is None or self.destination_lng is None:
+            return None
+        return self.destination_lat, self.destination_lng
+
+    def resolve_coordinates(self, *, departure: bool = True, destination: bool = True) -> bool:
+        """
+        Geocode departure and/or destination and store lat/lng + geohash on the row.
+        Hits the network (landmarks → Google → Nominatim), so only call this on
+        write paths or from the backfill command. Returns True if both ends are resolved.
+        """
+        if departure:
+            coords = geocode(self.departure) if self.departure else None
+            self.departure_lat, self.departure_lng = coords or (None, None)
+            self.departure_geohash = geohash.encode(*coords) if coords else None
+        if destination:
+            coords = geocode(self.destination) if self.destination else None
+            self.destination_lat, self.destination_lng = coords or (None, None)
+            self.destination_geohash = geohash.encode(*coords) if coords else None
+        return self.departure_coords is not None and self.destination_coords is not None
+
+    def route_distance_km(self) -> float | None:
+        """Estimated road distance (straight line × 1.3) from stored coordinates."""
+        a, b = self.departure_coords, self.destination_coords
+        if a is None or b is None:
+            return None
+        return round(haversine_km(a[0], a[1], b[0], b[1]) * 1.3, 2)
+
+    # ── booking counters ─────────────────────────────────────────────────
+    def count_request(self) -> None:
+        """One more booking request on this ride."""
+        self._add_to_counter("requests_count", 1)
+
+    def count_booking(self, status: str, seats: int, sign: int = 1) -> None:
+        """Add (sign=1) or remove (sign=-1) one booking in `status` from the counters."""
+        if status == "PENDING":
+            self._add_to_counter("pending_count", sign)
+        elif status == "ACCEPTED":
+            self._add_to_counter("accepted_count", sign)
+            self._add_to_counter("accepted_seats", sign * seats)
+
+    def _add_to_counter(self, column: str, delta: int) -> None:
+        """
+        Queue ``column = column + delta`` for the next flush.  The value is
+        expired after the flush and re-read from the row on access.
+        """
+        if not delta:
+            return
+        if not inspect(self).persistent:  # not inserted yet: plain arithmetic
+            setattr(self, column, (getattr(self, column) or 0) + delta)
+            return
+        # Stack onto a change made earlier in this unit of work
+        queued = self.__dict__.get(column)
+        base = queued if isinstance(queued, ClauseElement) else getattr(RidePost, column)
+        setattr(self, column, base + delta)
+
     def to_dict(self):
         return {
             "id":                self.id,
@@ -49,10 +142,18 @@ class RidePost(db.Model):
             "departure_datetime": self.departure_datetime.isoformat(),
             "seats_available":   self.seats_available,
             "status":            self.status,
+            "requests_count":    self.requests_count,
+            "pending_count":     self.pending_count,
+            "accepted_count":    self.accepted_count,
             "creator":           self.creator.to_safe_dict() if self.creator else None,
             # meetup point
             "meetup_lat":        self.meetup_lat,
             "meetup_lng":        self.meetup_lng,
+            # resolved route endpoints
+            "departure_lat":     self.departure_lat,
+            "departure_lng":     self.departure_lng,
+            "destination_lat":   self.destination_lat,
+            "destination_lng":   self.destination_lng,
             # ride preferences
             "ridePreferences": {
                 "allowSmoking": self.allow_smoking,
@@ -61,3 +162,48 @@ class RidePost(db.Model):
                 "chatty":       self.chatty,
             },
         }
+
+
+def reconcile_booking_counters(batch_size: int = 500) -> int:
+    """
+    Recompute every ride's booking counters from carpool_bookings.
+    Returns the number of rides whose stored counters were wrong. Caller commits.
+    """
+    from .booking import CarpoolBooking
+
+    rows = (
+        db.session.query(
+            CarpoolBooking.ride_post_id, CarpoolBooking.status,
+            db.func.count(CarpoolBooking.id), db.func.sum(CarpoolBooking.seats_requested),
+        )
+        .group_by(CarpoolBooking.ride_post_id, CarpoolBooking.status)
+        .all()
+    )
+    actual: dict[int, dict[str, int]] = {}
+    for ride_id, status, n, seats in rows:
+        c = actual.setdefault(ride_id, {"requests_count": 0, "pending_count": 0,
+                                        "accepted_count": 0, "accepted_seats": 0})
+        c["requests_count"] += n
+        if status == "PENDING":
+            c["pending_count"] = n
+        elif status == "ACCEPTED":
+            c["accepted_count"] = n
+            c["accepted_seats"] = int(seats or 0)
+
+    zero = {"requests_count": 0, "pending_count": 0, "accepted_count": 0, "accepted_seats": 0}
+    fixed = 0
+    last_id = 0
+    while True:
+        batch = (RidePost.query.filter(RidePost.id > last_id)
+                 .order_by(RidePost.id.asc()).limit(batch_size).all())
+        if not batch:
+            break
+        for ride in batch:
+            want = actual.get(ride.id, zero)
+            if any(getattr(ride, k) != v for k, v in want.items()):
+                for k, v in want.items():
+                    setattr(ride, k, v)
+                fixed += 1
+        last_id = batch[-1].id
+        db.session.flush()
+    return fixed
@@ -4,6 +4,10 @@ from ..extensions import db
 
 class Trip(db.Model):
     __tablename__ = "trips"
+    __table_args__ = (
+        # Keyset pages of a user's trip history, newest first
+        db.Index("ix_trips_user_created", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -11,7 +15,6 @@ class Trip(db.Model):
         db.Integer,
         db.ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     # "carpool", "transit", "bike", "walking", "car"
@@ -22,6 +25,10 @@ class Trip(db.Model):
     # Optional: human-readable note e.g. "Rode from McGill to Plateau"
     note = db.Column(db.String(255), nullable=True)
 
+    # Geohash cells of the start/end points, when known (demand heatmap)
+    origin_geohash      = db.Column(db.String(12), nullable=True)
+    destination_geohash = db.Column(db.String(12), nullable=True)
+
     # If this trip came from a confirmed carpool booking, link it
     booking_id = db.Column(
         db.Integer,
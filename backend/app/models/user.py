@@ -10,14 +10,14 @@ class User(db.Model):
     email         = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     phone         = db.Column(db.String(30), nullable=True)
-    created_at    = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at    = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     # Email verification
     is_verified         = db.Column(db.Boolean, default=False, nullable=False)
     verification_token  = db.Column(db.String(64), nullable=True, unique=True, index=True)
 
     # Push notifications (Firebase Cloud Messaging device token)
-    fcm_token = db.Column(db.String(255), nullable=True)
+    fcm_token = db.Column(db.String(255), nullable=True, index=True)
 
     # Average rating as a driver (updated on every new rating)
     avg_driver_rating  = db.Column(db.Float, nullable=True)
@@ -0,0 +1,125 @@
+"""
+Analytics Export — streaming NDJSON/CSV dumps for admins
+========================================================
+``export_lines(table, since, fmt)`` is a generator of text chunks for
+``/api/analytics/export``.  Rows are read as plain column tuples with
+``yield_per`` (a server-side cursor on PostgreSQL, chunked fetches on
+SQLite) and encoded one by one, so memory stays constant however many rows
+the table holds.  The caller wraps it in ``stream_with_context`` — the
+query runs while the response is being sent.
+
+Events older than the retention window live in monthly archives
+(services/event_archive.py); an ``events`` export streams those first and
+then the hot table.
+
+Only ids are exported for people (no names, emails or tokens): event
+metadata goes out without the keys in ``PII_KEYS`` (``user_registered``
+carries the address, for instance).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from typing import Iterator
+
+TABLES = ("events", "rides", "bookings", "trips")
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+FETCH_SIZE = 1000
+# Rows per yielded chunk — fewer, larger writes to the socket
+CHUNK_ROWS = 200
+# Event metadata keys that identify a person — dropped from exports
+PII_KEYS = frozenset({"email", "phone", "full_name", "name", "token"})
+
+
+def _tables() -> dict:
+    """table name → (model, exported columns); columns are model attributes."""
+    from ..models import AnalyticsEvent, CarpoolBooking, RidePost, Trip
+
+    return {
+        "events": (AnalyticsEvent, [
+            AnalyticsEvent.id, AnalyticsEvent.event_type, AnalyticsEvent.user_id,
+            AnalyticsEvent.event_metadata, AnalyticsEvent.created_at,
+        ]),
+        "rides": (RidePost, [
+            RidePost.id, RidePost.creator_user_id, RidePost.departure,
+            RidePost.destination, RidePost.departure_datetime, RidePost.seats_available,
+            RidePost.status, RidePost.requests_count, RidePost.accepted_count,
+            RidePost.created_at,
+        ]),
+        "bookings": (CarpoolBooking, [
+            CarpoolBooking.id, CarpoolBooking.ride_post_id, CarpoolBooking.passenger_user_id,
+            CarpoolBooking.seats_requested, CarpoolBooking.status,
+            CarpoolBooking.matched_score, CarpoolBooking.status_updated_at,
+            CarpoolBooking.created_at,
+        ]),
+        "trips": (Trip, [
+            Trip.id, Trip.user_id, Trip.mode, Trip.distance_km, Trip.booking_id,
+            Trip.created_at,
+        ]),
+    }
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _scrub_metadata(raw) -> dict:
+    """The event's metadata blob as a dict, without ``PII_KEYS``."""
+    try:
+        data = json.loads(raw or "{}")
+    except (ValueError, TypeError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {k: v for k, v in data.items() if k not in PII_KEYS}
+
+
+def export_lines(table: str, since: datetime | None = None, fmt: str = "ndjson") -> Iterator[str]:
+    """Yield the export of ``table`` (rows created at/after ``since``) in ``fmt``."""
+    from ..extensions import db
+
+    model, columns = _tables()[table]
+    names = [c.key for c in columns]
+
+    q = db.session.query(*columns)
+    if since is not None:
+        q = q.filter(model.created_at >= since)
+    rows = q.order_by(model.id.asc()).yield_per(FETCH_SIZE)
+    if table == "events":
+        from .event_archive import iter_archived_events
+        archived = (tuple(e[name] for name in names) for e in iter_archived_events(since))
+        rows = itertools.chain(archived, rows)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(names)
+
+    meta_at = names.index("event_metadata") if table == "events" else None
+
+    n = 0
+    for row in rows:
+        values = [_plain(v) for v in row]
+        if meta_at is not None:
+            values[meta_at] = _scrub_metadata(values[meta_at])
+        if writer is not None:
+            if meta_at is not None:
+                values[meta_at] = json.dumps(values[meta_at], ensure_ascii=False)
+            writer.writerow(values)
+        else:
+            # Metadata is inlined as JSON rather than a string of JSON
+            buf.write(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+            buf.write("\n")
+        n += 1
+        if n % CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    tail = buf.getvalue()
+    if tail:
+        yield tail
@@ -0,0 +1,590 @@
+"""
+Analytics Rollups — incrementally maintained dashboard counters
+===============================================================
+The admin endpoints used to aggregate raw tables on every page load: a
+GROUP BY over all of ``analytics_events``, and full counts of users, rides
+and bookings.  Their cost grew with the lifetime of the system.
+
+``RollupObserver`` listens on the EventBus and adds each event into hourly
+and daily buckets of ``analytics_rollups`` (one upsert per bucket):
+
+    metric             dimension       +1 on
+    ─────────────────  ──────────────  ────────────────────────────────────
+    events             event type      every event
+    rides_created      ""              ride_created
+    rides_deleted      ""              ride_deleted
+    users_registered   ""              user_registered
+    trips              trip mode       trip_logged (-1 on trip_deleted)
+    bookings_status    status          net change: +1 into a status, -1 out
+                                       of the previous one (booking_* events,
+                                       and -n per status on ride_deleted)
+    ride_origins       geohash cell    ride_created   (demand heatmap; cells
+    ride_destinations                                  at TILE_PRECISION)
+    trip_origins                       trip_logged (-1 on trip_deleted)
+    trip_destinations
+
+Summing a metric over its daily rows gives all-time totals, and the sum of
+``bookings_status`` per status is the current distribution — so readers
+scan O(days) rows instead of O(events).  The ``bookings_status`` counts use
+the stored status: an unanswered request that has passed its expiry stays
+PENDING there until the lifecycle sweeper writes it as REJECTED, so readers
+go through ``booking_status_totals()`` (or the KPI summary), which moves
+those to REJECTED like ``CarpoolBooking.effective_status`` does.
+Deletions are counted in the bucket where they happen, so a series over a
+window that holds a trip's deletion but not its logging can dip below zero.
+
+The upserts never run inside a request's transaction, where every write
+would hold locks on the shared daily rows until its commit and a failed
+upsert would abort the user's own change.  In sync EventBus mode each event
+is added once the publishing transaction has committed, in a short
+transaction of its own (``EventBus.on_commit``); in async mode each
+delivered batch is aggregated first and committed at once.  Rows are
+upserted in key order, so concurrent upserts lock them in the same order.
+An upsert that fails after the commit is logged and lost (the rebuild below
+repairs it).
+
+``flask --app run.py analytics rebuild-rollups`` recomputes every bucket
+(initial backfill, or after drift) by replaying the event log — the
+archives, then ``analytics_events`` — through the same ``event_deltas``, so
+rebuilt buckets equal what the live increments wrote.  History from before
+events were logged comes from the tables as they are now: users, rides,
+trips and bookings without a creation event are counted at their
+``created_at`` (a booking that has left PENDING is moved at
+``status_updated_at``), and a later deletion of such a ride or trip is not
+subtracted, since the tables no longer show it either.  Run it when
+traffic is low: increments from requests committing during the rebuild may
+be counted twice or lost.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from .event_bus import AnalyticsObserver, Event, EventBus
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+# Geohash length of heatmap cells (~1.2 km × 0.6 km); coarser tiles are prefixes
+TILE_PRECISION = 6
+BOOKING_STATUSES = ("PENDING", "ACCEPTED", "REJECTED", "CANCELLED")
+
+# KPI summary: reused while EventBus.data_version() is unchanged, at most this long
+# (bounds staleness from other workers' writes)
+_SUMMARY_TTL_SEC = 30
+_summary_cache: dict = {"data": None, "ts": 0.0, "version": None}
+
+# booking event → (status it leaves, status it enters)
+BOOKING_TRANSITIONS = {
+    "booking_created":   (None, "PENDING"),
+    "booking_approved":  ("PENDING", "ACCEPTED"),
+    "booking_rejected":  ("PENDING", "REJECTED"),
+    "booking_expired":   ("PENDING", "REJECTED"),
+    "booking_cancelled": (None, "CANCELLED"),  # from_status given in metadata
+}
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Truncate ``ts`` to the start of its hour or day."""
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if granularity == "day" else ts
+
+
+def event_deltas(event_type: str, metadata: dict | None) -> list[tuple[str, str, int]]:
+    """The ``(metric, dimension, delta)`` changes one event makes to the rollups."""
+    metadata = metadata or {}
+    out = [("events", event_type, 1)]
+    if event_type == "ride_created":
+        out.append(("rides_created", "", 1))
+        out += _tile_deltas("ride", metadata.get("departure_geohash"),
+                            metadata.get("destination_geohash"))
+    elif event_type == "ride_deleted":
+        out.append(("rides_deleted", "", 1))
+        # Its bookings went with it (cascade)
+        for status, n in (metadata.get("bookings") or {}).items():
+            out.append(("bookings_status", status, -int(n)))
+    elif event_type == "user_registered":
+        out.append(("users_registered", "", 1))
+    elif event_type == "trip_logged":
+        out.append(("trips", str(metadata.get("mode") or ""), 1))
+        out += _tile_deltas("trip", metadata.get("origin_geohash"),
+                            metadata.get("destination_geohash"))
+    elif event_type == "trip_deleted":
+        out.append(("trips", str(metadata.get("mode") or ""), -1))
+        out += _tile_deltas("trip", metadata.get("origin_geohash"),
+                            metadata.get("destination_geohash"), sign=-1)
+    elif event_type in BOOKING_TRANSITIONS:
+        old, new = BOOKING_TRANSITIONS[event_type]
+        old = metadata.get("from_status", old)
+        if old:
+            out.append(("bookings_status", old, -1))
+        out.append(("bookings_status", new, 1))
+    return out
+
+
+def _tile_deltas(kind: str, origin: str | None, destination: str | None,
+                 sign: int = 1) -> list[tuple[str, str, int]]:
+    out = []
+    if origin:
+        out.append((f"{kind}_origins", origin[:TILE_PRECISION], sign))
+    if destination:
+        out.append((f"{kind}_destinations", destination[:TILE_PRECISION], sign))
+    return out
+
+
+def _accumulate(counts: Counter, ts: datetime, metric: str, dimension: str, delta: int) -> None:
+    for granularity in GRANULARITIES:
+        counts[(granularity, metric, bucket_start(ts, granularity), dimension)] += delta
+
+
+def record(events: list[Event], connection=None) -> None:
+    """
+    Add events into the rollups, on ``connection`` if given, else in the
+    current session. Caller commits.
+    """
+    counts: Counter = Counter()
+    for e in events:
+        for metric, dimension, delta in event_deltas(e.event_type, e.metadata):
+            _accumulate(counts, e.created_at, metric, dimension, delta)
+    _upsert(counts, connection)
+
+
+def _record_committed(events: list[Event]) -> None:
+    """Add already committed events in a transaction of their own."""
+    from ..extensions import db
+
+    try:
+        with db.engine.begin() as connection:
+            record(events, connection)
+    except Exception as exc:
+        logger.warning("RollupObserver failed to record %s event(s): %s", len(events), exc)
+
+
+def _upsert(counts: Counter, connection=None) -> None:
+    """Add each ``(granularity, metric, bucket_start, dimension) → delta`` to its row."""
+    from ..extensions import db
+    from ..models.analytics_rollup import AnalyticsRollup
+
+    rows = [
+        {"granularity": g, "metric": m, "bucket_start": b, "dimension": d, "value": v}
+        for (g, m, b, d), v in sorted(counts.items()) if v
+    ]
+    if not rows:
+        return
+
+    executor = connection if connection is not None else db.session
+    bind = connection if connection is not None else db.session.get_bind()
+    dialect = bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(AnalyticsRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularity", "metric", "bucket_start", "dimension"],
+            set_={"value": AnalyticsRollup.value + stmt.excluded.value},
+        )
+        executor.execute(stmt, rows)
+        return
+
+    # Other dialects: update, insert when the bucket does not exist yet
+    table = AnalyticsRollup.__table__
+    for row in rows:
+        updated = executor.execute(
+            table.update()
+            .where(table.c.granularity == row["granularity"],
+                   table.c.metric == row["metric"],
+                   table.c.bucket_start == row["bucket_start"],
+                   table.c.dimension == row["dimension"])
+            .values(value=table.c.value + row["value"])
+        )
+        if not updated.rowcount:
+            executor.execute(table.insert(), [row])
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Observer
+# ──────────────────────────────────────────────────────────────────────────────
+
+class RollupObserver(AnalyticsObserver):
+    """Keeps ``analytics_rollups`` current from EventBus traffic."""
+
+    def on_event(
+        self,
+        event_type: str,
+        user_id: int | None = None,
+        metadata: dict | None = None,
+    ) -> None:
+        # Sync mode: after the publisher commits, outside its transaction
+        event = Event(event_type, user_id, metadata, datetime.utcnow())
+        EventBus.on_commit(lambda: _record_committed([event]))
+
+    def on_batch(self, events: list[Event]) -> None:
+        from ..extensions import db
+
+        record(events)
+        db.session.commit()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reads
+# ──────────────────────────────────────────────────────────────────────────────
+
+def totals(
+    metric: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    *,
+    granularity: str = "day",
+) -> dict[str, int]:
+    """Sum of ``metric`` per dimension over buckets in ``[since, until)``."""
+    from ..extensions import db
+    from ..models.analytics_rollup import AnalyticsRollup as R
+
+    q = (db.session.query(R.dimension, db.func.sum(R.value))
+         .filter(R.granularity == granularity, R.metric == metric))
+    if since is not None:
+        q = q.filter(R.bucket_start >= since)
+    if until is not None:
+        q = q.filter(R.bucket_start < until)
+    return {dim: int(total or 0) for dim, total in q.group_by(R.dimension).all()}
+
+
+def total(metric: str, since: datetime | None = None, until: datetime | None = None,
+          *, granularity: str = "day") -> int:
+    """Sum of ``metric`` over all dimensions."""
+    return sum(totals(metric, since, until, granularity=granularity).values())
+
+
+def series(
+    metric: str,
+    since: datetime,
+    until: datetime,
+    *,
+    granularity: str = "day",
+    dimension: str | None = None,
+) -> dict[datetime, int]:
+    """
+    ``bucket_start → value`` for buckets in ``[since, until)``, summed over all
+    dimensions unless ``dimension`` is given.
+    """
+    from ..extensions import db
+    from ..models.analytics_rollup import AnalyticsRollup as R
+
+    q = (db.session.query(R.bucket_start, db.func.sum(R.value))
+         .filter(R.granularity == granularity, R.metric == metric,
+                 R.bucket_start >= since, R.bucket_start < until))
+    if dimension is not None:
+        q = q.filter(R.dimension == dimension)
+    rows = q.group_by(R.bucket_start).all()
+    return {bucket: int(value or 0) for bucket, value in rows}
+
+
+# /api/analytics/series metric → (rollup metric, dimension or None for all)
+SERIES_METRICS = {
+    "rides":    ("rides_created", None),
+    "bookings": ("events", "booking_created"),
+    "users":    ("users_registered", None),
+    "trips":    ("trips", None),
+    "events":   ("events", None),
+}
+SERIES_BUCKETS = ("hour", "day", "week")
+
+
+def filled_series(name: str, bucket: str, days: int,
+                  now: datetime | None = None) -> list[tuple[datetime, int]]:
+    """
+    Zero-filled ``(bucket_start, value)`` pairs covering the last ``days`` days,
+    oldest first.  Weeks start on Monday and are summed from the daily rollups,
+    so at most one row per hour/day in the range is read.
+    """
+    metric, dimension = SERIES_METRICS[name]
+    now = now or datetime.utcnow()
+    if bucket == "hour":
+        step = timedelta(hours=1)
+        until = bucket_start(now, "hour") + step
+        since = until - timedelta(days=days)
+    else:
+        today = bucket_start(now, "day")
+        since = today - timedelta(days=days - 1)
+        until = today + timedelta(days=1)
+        step = timedelta(days=1)
+        if bucket == "week":
+            since -= timedelta(days=since.weekday())
+            until += timedelta(days=(7 - until.weekday()) % 7)
+            step = timedelta(weeks=1)
+
+    granularity = "hour" if bucket == "hour" else "day"
+    counts = series(metric, since, until, granularity=granularity, dimension=dimension)
+
+    out: list[tuple[datetime, int]] = []
+    start = since
+    while start < until:
+        if bucket == "week":
+            value = sum(counts.get(start + timedelta(days=i), 0) for i in range(7))
+        else:
+            value = counts.get(start, 0)
+        out.append((start, value))
+        start += step
+    return out
+
+
+def expired_unswept() -> int:
+    """
+    PENDING requests past their expiry that the lifecycle sweeper has not
+    written as REJECTED yet (``CarpoolBooking.effective_status``).  Only the
+    PENDING rows are scanned — a small set, since they expire within a day.
+    """
+    from ..extensions import db
+    from ..models import CarpoolBooking
+
+    return (db.session.query(db.func.count(CarpoolBooking.id))
+            .filter(CarpoolBooking.status == "PENDING",
+                    CarpoolBooking.effective_status == "REJECTED")
+            .scalar()) or 0
+
+
+def booking_status_totals() -> dict[str, int]:
+    """Current bookings per status as readers see them (effective status)."""
+    counts = totals("bookings_status")
+    unswept = expired_unswept()
+    if unswept:
+        counts["PENDING"] = counts.get("PENDING", 0) - unswept
+        counts["REJECTED"] = counts.get("REJECTED", 0) + unswept
+    return counts
+
+
+def kpi_summary() -> dict:
+    """
+    Dashboard KPI cards, each from one source: users and bookings from the
+    rollups (bookings by effective status), rides from one conditional
+    aggregate over ``ride_posts``.  Cached until the next event or
+    ``_SUMMARY_TTL_SEC``.
+    """
+    version = EventBus.data_version()
+    now = time.monotonic()
+    if (_summary_cache["data"] is not None
+            and _summary_cache["version"] == version
+            and now - _summary_cache["ts"] < _SUMMARY_TTL_SEC):
+        return _summary_cache["data"]
+
+    data = _compute_summary()
+    _summary_cache.update(data=data, ts=now, version=version)
+    return data
+
+
+def _compute_summary() -> dict:
+    from ..extensions import db
+    from ..models import RidePost
+    from ..models.analytics_rollup import AnalyticsRollup as R
+
+    def total_where(*conds):
+        return db.func.coalesce(db.func.sum(db.case((db.and_(*conds), R.value), else_=0)), 0)
+
+    # "This week" = last 7 days in hourly buckets; all-time totals from daily ones
+    now = datetime.utcnow()
+    week_ago = bucket_start(now - timedelta(days=7), "hour")
+    day = R.granularity == "day"
+    week = db.and_(R.granularity == "hour", R.bucket_start >= week_ago)
+
+    row = (
+        db.session.query(
+            total_where(day, R.metric == "users_registered"),
+            total_where(week, R.metric == "users_registered"),
+            *(total_where(day, R.metric == "bookings_status", R.dimension == s)
+              for s in BOOKING_STATUSES),
+        )
+        .filter(db.or_(day, week), R.metric.in_(("users_registered", "bookings_status")))
+        .one()
+    )
+    users, users_week, *by_status = map(int, row)
+    pending, accepted, rejected, cancelled = by_status
+    # Expired requests the sweeper has not written yet read as REJECTED everywhere
+    unswept = expired_unswept()
+    pending, rejected = pending - unswept, rejected + unswept
+    total_bookings = sum(by_status)
+
+    rides_total, open_rides, full_rides, rides_week = (
+        db.session.query(
+            db.func.count(RidePost.id),
+            db.func.count(db.case((RidePost.status == "OPEN", 1))),
+            db.func.count(db.case((RidePost.status == "FULL", 1))),
+            db.func.count(db.case((RidePost.created_at >= now - timedelta(days=7), 1))),
+        )
+        .one()
+    )
+
+    return {
+        "users": {
+            "total": users,
+            "this_week": users_week,
+        },
+        "rides": {
+            "total": rides_total,
+            "open": open_rides,
+            "full": full_rides,
+            "this_week": rides_week,
+        },
+        "bookings": {
+            "total": total_bookings,
+            "accepted": accepted,
+            "pending": pending,
+            "rejected": rejected,
+            "cancelled": cancelled,
+            "acceptance_rate": round(accepted / total_bookings * 100, 1) if total_bookings else 0,
+        },
+    }
+
+
+HEATMAP_KINDS = ("ride", "trip")
+HEATMAP_ENDS = ("origin", "destination")
+
+
+def heatmap(kind: str, end: str, precision: int, since: datetime, until: datetime) -> list[dict]:
+    """
+    Demand per geohash tile of length ``precision`` (≤ TILE_PRECISION) over
+    ``[since, until)``, busiest first.  Sums the hourly tile counters (daily
+    ones when both ends fall on midnight) grouped by cell prefix.
+    """
+    from ..extensions import db
+    from ..models.analytics_rollup import AnalyticsRollup as R
+    from ..utils import geohash
+
+    precision = max(1, min(precision, TILE_PRECISION))
+    whole_days = since == bucket_start(since, "day") and until == bucket_start(until, "day")
+    granularity = "day" if whole_days else "hour"
+    cell = db.func.substr(R.dimension, 1, precision)
+    count = db.func.sum(R.value)
+    rows = (
+        db.session.query(cell, count)
+        .filter(R.granularity == granularity, R.metric == f"{kind}_{end}s",
+                R.bucket_start >= bucket_start(since, granularity), R.bucket_start < until)
+        .group_by(cell)
+        .order_by(count.desc())
+        .all()
+    )
+    tiles = []
+    for code, n in rows:
+        if (n or 0) <= 0:  # deletions in the window can outweigh its additions
+            continue
+        lat_lo, lng_lo, lat_hi, lng_hi = geohash.decode_bbox(code)
+        tiles.append({
+            "geohash": code,
+            "count": int(n),
+            "lat": (lat_lo + lat_hi) / 2,
+            "lng": (lng_lo + lng_hi) / 2,
+            "bbox": [lat_lo, lng_lo, lat_hi, lng_hi],
+        })
+    return tiles
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Rebuild
+# ──────────────────────────────────────────────────────────────────────────────
+
+# event → (metadata key, entity) it creates / deletes
+_CREATES = {"ride_created": ("ride_id", "rides"), "trip_logged": ("trip_id", "trips"),
+            "booking_created": ("booking_id", "bookings")}
+_DELETES = {"ride_deleted": ("ride_id", "rides"), "trip_deleted": ("trip_id", "trips")}
+
+
+def _logged_events(chunk_size: int):
+    """``(event_type, user_id, metadata, created_at)`` of every logged event, oldest first."""
+    from ..extensions import db
+    from ..models import AnalyticsEvent as E
+    from .event_archive import _add_months, archived_months, iter_archived_events
+
+    def parse(raw):
+        try:
+            return json.loads(raw) if raw else {}
+        except (TypeError, ValueError):
+            return {}
+
+    for e in iter_archived_events():
+        yield e["event_type"], e["user_id"], parse(e["event_metadata"]), e["created_at"]
+
+    q = db.session.query(E.event_type, E.user_id, E.event_metadata, E.created_at)
+    months = archived_months()
+    if months:
+        # A compaction interrupted after writing its archive leaves those rows behind
+        q = q.filter(E.created_at >= _add_months(months[-1], 1))
+    for row in q.order_by(E.id.asc()).yield_per(chunk_size):
+        yield row.event_type, row.user_id, parse(row.event_metadata), row.created_at
+
+
+def rebuild(chunk_size: int = 1000) -> int:
+    """Recompute every rollup from the event log (plus pre-log history). Returns rows written."""
+    from ..extensions import db
+    from ..models import AnalyticsRollup, CarpoolBooking, RidePost, Trip, User
+
+    counts: Counter = Counter()
+    seen: dict[str, set] = {"users": set(), "rides": set(), "trips": set(),
+                            "bookings": set(), "booking_changes": set()}
+
+    # 1. Replay: exactly the deltas the live observer applied
+    for event_type, user_id, metadata, created_at in _logged_events(chunk_size):
+        deltas = event_deltas(event_type, metadata)
+        if event_type in _DELETES:
+            key, entity = _DELETES[event_type]
+            if metadata.get(key) not in seen[entity]:
+                deltas = [d for d in deltas if d[0] == "events"]
+        for metric, dimension, delta in deltas:
+            _accumulate(counts, created_at, metric, dimension, delta)
+
+        if event_type == "user_registered":
+            seen["users"].add(user_id)
+        elif event_type in _CREATES:
+            key, entity = _CREATES[event_type]
+            seen[entity].add(metadata.get(key))
+        if event_type in BOOKING_TRANSITIONS and event_type != "booking_created":
+            seen["booking_changes"].add(metadata.get("booking_id"))
+
+    # 2. History from before events were logged, as the tables show it now
+    def created(event_type: str, metadata: dict) -> list[tuple[str, str, int]]:
+        return [d for d in event_deltas(event_type, metadata) if d[0] != "events"]
+
+    for row in db.session.query(User.id, User.created_at).yield_per(chunk_size):
+        if row.id not in seen["users"]:
+            for metric, dimension, delta in created("user_registered", {}):
+                _accumulate(counts, row.created_at, metric, dimension, delta)
+
+    rides = db.session.query(RidePost.id, RidePost.created_at,
+                             RidePost.departure_geohash, RidePost.destination_geohash)
+    for row in rides.yield_per(chunk_size):
+        if row.id not in seen["rides"]:
+            for metric, dimension, delta in created("ride_created", {
+                    "departure_geohash": row.departure_geohash,
+                    "destination_geohash": row.destination_geohash}):
+                _accumulate(counts, row.created_at, metric, dimension, delta)
+
+    trips = db.session.query(Trip.id, Trip.created_at, Trip.mode,
+                             Trip.origin_geohash, Trip.destination_geohash)
+    for row in trips.yield_per(chunk_size):
+        if row.id not in seen["trips"]:
+            for metric, dimension, delta in created("trip_logged", {
+                    "mode": row.mode, "origin_geohash": row.origin_geohash,
+                    "destination_geohash": row.destination_geohash}):
+                _accumulate(counts, row.created_at, metric, dimension, delta)
+
+    bookings = db.session.query(CarpoolBooking.id, CarpoolBooking.status,
+                                CarpoolBooking.created_at, CarpoolBooking.status_updated_at)
+    for row in bookings.yield_per(chunk_size):
+        if row.id in seen["bookings"]:
+            continue
+        _accumulate(counts, row.created_at, "bookings_status", "PENDING", 1)
+        if row.id not in seen["booking_changes"] and row.status != "PENDING":
+            at = row.status_updated_at or row.created_at
+            _accumulate(counts, at, "bookings_status", "PENDING", -1)
+            _accumulate(counts, at, "bookings_status", row.status, 1)
+
+    db.session.query(AnalyticsRollup).delete(synchronize_session=False)
+    items = list(counts.items())
+    for i in range(0, len(items), chunk_size):
+        _upsert(Counter(dict(items[i:i + chunk_size])))
+    db.session.commit()
+    return sum(1 for _, v in items if v)
@@ -0,0 +1,154 @@
+"""
+Booking Lifecycle Analytics — read side of booking_transitions
+==============================================================
+``CarpoolBooking`` only holds its current status, so "how long do drivers
+take to approve?" or "how many approvals are later cancelled?" used to be
+unanswerable.  Every status change is now appended to
+``booking_transitions`` (``CarpoolBooking.set_status``; the request itself
+is logged by ``request_ride`` as NULL → PENDING).  The queries below only
+touch the transitions in the requested window:
+
+  - durations():  transitions into ``to`` within [since, until)
+                  (index: to_status, at), each joined to the same booking's
+                  earlier transition into ``from`` (index: booking_id, at)
+  - funnel():     requests created within [since, until) (index: to_status, at)
+                  and every later transition of those bookings
+                  (index: booking_id, at)
+
+Bookings that predate the log can be given an approximate history with
+``flask --app run.py rides backfill-transitions``.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+
+from sqlalchemy.orm import aliased
+
+
+def _percentile(sorted_values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def durations(from_status: str, to_status: str, since: datetime, until: datetime) -> dict:
+    """
+    Seconds from a booking entering ``from_status`` to it entering
+    ``to_status``, for ``to_status`` transitions in ``[since, until)``.
+    """
+    from ..extensions import db
+    from ..models.booking_transition import BookingTransition
+
+    start, end = aliased(BookingTransition), aliased(BookingTransition)
+    rows = (
+        db.session.query(start.at, end.at)
+        .select_from(end)
+        .join(start, db.and_(start.booking_id == end.booking_id,
+                             start.to_status == from_status,
+                             start.at <= end.at))
+        .filter(end.to_status == to_status, end.at >= since, end.at < until)
+        .all()
+    )
+    secs = sorted(round((t_end - t_start).total_seconds(), 1) for t_start, t_end in rows)
+    return {
+        "from": from_status,
+        "to": to_status,
+        "count": len(secs),
+        "mean_sec": round(sum(secs) / len(secs), 1) if secs else None,
+        "p50_sec": _percentile(secs, 0.5),
+        "p90_sec": _percentile(secs, 0.9),
+        "max_sec": secs[-1] if secs else None,
+    }
+
+
+def funnel(since: datetime, until: datetime) -> dict:
+    """Outcomes of the ride requests created in ``[since, until)``."""
+    from ..extensions import db
+    from ..models.booking_transition import BookingTransition as T
+
+    cohort = (
+        db.session.query(T.booking_id)
+        .filter(T.to_status == "PENDING", T.from_status.is_(None),
+                T.at >= since, T.at < until)
+    )
+    requested = cohort.count()
+
+    automatic = T.actor_user_id.is_(None)
+    rows = (
+        db.session.query(T.from_status, T.to_status, automatic,
+                         db.func.count(db.distinct(T.booking_id)))
+        .filter(T.booking_id.in_(cohort.scalar_subquery()), T.from_status.isnot(None))
+        .group_by(T.from_status, T.to_status, automatic)
+        .all()
+    )
+    edges: dict[tuple[str, str], int] = {}
+    expired = 0
+    for from_status, to_status, is_automatic, n in rows:
+        edges[(from_status, to_status)] = edges.get((from_status, to_status), 0) + n
+        if (from_status, to_status) == ("PENDING", "REJECTED") and is_automatic:
+            expired += n
+
+    accepted = edges.get(("PENDING", "ACCEPTED"), 0)
+    rejected = edges.get(("PENDING", "REJECTED"), 0) - expired
+    cancelled_pending = edges.get(("PENDING", "CANCELLED"), 0)
+    cancelled_accepted = edges.get(("ACCEPTED", "CANCELLED"), 0)
+    return {
+        "requested": requested,
+        "accepted": accepted,
+        "rejected": rejected,
+        "expired": expired,
+        "cancelled_while_pending": cancelled_pending,
+        "cancelled_after_accept": cancelled_accepted,
+        "still_pending": requested - accepted - rejected - expired - cancelled_pending,
+        "acceptance_rate": round(accepted / requested * 100, 1) if requested else 0,
+        "edges": [{"from": f, "to": t, "count": n} for (f, t), n in sorted(edges.items())],
+    }
+
+
+def backfill(batch_size: int = 500) -> int:
+    """
+    Give bookings with no logged history an approximate one: the request at
+    ``created_at`` and, if no longer PENDING, its current status at
+    ``status_updated_at``. Returns the number of bookings backfilled.
+    """
+    from ..extensions import db
+    from ..models import BookingTransition, CarpoolBooking, RidePost
+
+    logged = db.session.query(BookingTransition.id).filter(
+        BookingTransition.booking_id == CarpoolBooking.id)
+    done = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.session.query(CarpoolBooking.id, CarpoolBooking.ride_post_id,
+                             CarpoolBooking.passenger_user_id, CarpoolBooking.status,
+                             CarpoolBooking.created_at, CarpoolBooking.status_updated_at,
+                             RidePost.creator_user_id)
+            .join(RidePost, RidePost.id == CarpoolBooking.ride_post_id)
+            .filter(CarpoolBooking.id > last_id, ~logged.exists())
+            .order_by(CarpoolBooking.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        rows = []
+        for b in batch:
+            rows.append({"booking_id": b.id, "ride_post_id": b.ride_post_id,
+                         "from_status": None, "to_status": "PENDING",
+                         "actor_user_id": b.passenger_user_id, "at": b.created_at})
+            if b.status != "PENDING":
+                # Expiries are indistinguishable from rejections here: credit the driver
+                actor = b.passenger_user_id if b.status == "CANCELLED" else b.creator_user_id
+                rows.append({"booking_id": b.id, "ride_post_id": b.ride_post_id,
+                             "from_status": "PENDING", "to_status": b.status,
+                             "actor_user_id": actor, "at": b.status_updated_at})
+        db.session.execute(db.insert(BookingTransition), rows)
+        db.session.commit()
+        done += len(batch)
+        last_id = batch[-1].id
+    return done
@@ -0,0 +1,220 @@
+"""
+Event Archive — monthly retention for analytics_events
+======================================================
+``analytics_events`` is append-only and used to grow forever.  It now only
+keeps the last ``ANALYTICS_RETENTION_MONTHS`` calendar months (the current
+one included).  Each older month is compacted into one gzip'd NDJSON file
+in ``ANALYTICS_ARCHIVE_DIR``:
+
+    analytics_events-2026-03.ndjson.gz     one JSON object per event
+                                           (id, event_type, user_id,
+                                            event_metadata, created_at)
+
+and then removed from the hot table:
+
+  - PostgreSQL, when ``analytics_events`` is a native RANGE (created_at)
+    partitioned table: the month's partition ``analytics_events_YYYY_MM`` is
+    dropped (``ensure_partitions`` creates the coming ones).  To convert an
+    existing table, recreate it with ``PARTITION BY RANGE (created_at)`` and
+    ``PRIMARY KEY (id, created_at)`` and copy the rows over.
+  - Otherwise (SQLite, plain PostgreSQL table): one range DELETE per month on
+    the ``created_at`` index — with a six-month window the table never holds
+    more than about six months of rows either way.
+
+A month is written to a temporary file and renamed into place before its
+rows are deleted, so an interrupted run loses nothing; re-running skips
+events whose id is already archived.
+
+``iter_archived_events`` reads the archives back.  The analytics export and
+the rollup rebuild chain them in front of the hot table, so both still see
+the full history.
+
+Run ``flask --app run.py analytics compact-events`` from cron (monthly is
+enough; it is idempotent).
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+FETCH_SIZE = 1000
+_ARCHIVE_RE = re.compile(r"^analytics_events-(\d{4})-(\d{2})\.ndjson\.gz$")
+
+
+def _month_start(ts: datetime) -> datetime:
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month: datetime, n: int) -> datetime:
+    y, m = divmod(month.month - 1 + n, 12)
+    return month.replace(year=month.year + y, month=m + 1)
+
+
+def archive_dir() -> str:
+    from flask import current_app
+
+    path = current_app.config.get("ANALYTICS_ARCHIVE_DIR") or os.path.join(
+        current_app.instance_path, "analytics_archive")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _archive_path(month: datetime) -> str:
+    return os.path.join(archive_dir(), f"analytics_events-{month:%Y-%m}.ndjson.gz")
+
+
+def retention_cutoff(now: datetime | None = None, months: int | None = None) -> datetime:
+    """First instant kept in the hot table (start of the oldest retained month)."""
+    from flask import current_app
+
+    if months is None:
+        months = current_app.config.get("ANALYTICS_RETENTION_MONTHS", 6)
+    return _add_months(_month_start(now or datetime.utcnow()), -(max(1, months) - 1))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reading
+# ──────────────────────────────────────────────────────────────────────────────
+
+def archived_months() -> list[datetime]:
+    """Months that have an archive file, oldest first."""
+    months = []
+    for name in os.listdir(archive_dir()):
+        m = _ARCHIVE_RE.match(name)
+        if m:
+            months.append(datetime(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def iter_archived_events(since: datetime | None = None) -> Iterator[dict]:
+    """
+    Archived events created at/after ``since``, oldest month first, as dicts
+    with ``created_at`` parsed back to a datetime.  Streams line by line.
+    """
+    for month in archived_months():
+        if since is not None and _add_months(month, 1) <= since:
+            continue
+        with gzip.open(_archive_path(month), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                event["created_at"] = datetime.fromisoformat(event["created_at"])
+                if since is None or event["created_at"] >= since:
+                    yield event
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Compaction
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _is_partitioned(db) -> bool:
+    if db.engine.dialect.name != "postgresql":
+        return False
+    return bool(db.session.execute(db.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'analytics_events'"
+    )).scalar())
+
+
+def _partition_name(month: datetime) -> str:
+    return f"analytics_events_{month:%Y_%m}"
+
+
+def ensure_partitions(ahead: int = 2, now: datetime | None = None) -> int:
+    """PostgreSQL (partitioned table only): create this month's and the next partitions."""
+    from ..extensions import db
+
+    if not _is_partitioned(db):
+        return 0
+    month = _month_start(now or datetime.utcnow())
+    for i in range(ahead + 1):
+        start = _add_months(month, i)
+        db.session.execute(db.text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(start)} PARTITION OF analytics_events "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{_add_months(start, 1):%Y-%m-%d}')"
+        ))
+    db.session.commit()
+    return ahead + 1
+
+
+def _archive_month(db, month: datetime) -> int:
+    """Append the month's hot rows to its archive file. Returns rows written."""
+    from ..models.analytics_event import AnalyticsEvent as E
+
+    path = _archive_path(month)
+    tmp = path + ".tmp"
+    archived_ids: set[int] = set()
+    written = 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as out:
+        # Keep what an earlier run archived for this month
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as old:
+                for line in old:
+                    if line.strip():
+                        out.write(line)
+                        archived_ids.add(json.loads(line)["id"])
+
+        rows = (
+            db.session.query(E.id, E.event_type, E.user_id, E.event_metadata, E.created_at)
+            .filter(E.created_at >= month, E.created_at < _add_months(month, 1))
+            .order_by(E.id.asc())
+            .yield_per(FETCH_SIZE)
+        )
+        for row in rows:
+            if row.id in archived_ids:
+                continue
+            out.write(json.dumps({
+                "id": row.id,
+                "event_type": row.event_type,
+                "user_id": row.user_id,
+                "event_metadata": row.event_metadata,
+                "created_at": row.created_at.isoformat(),
+            }, ensure_ascii=False))
+            out.write("\n")
+            written += 1
+    if written or archived_ids:
+        os.replace(tmp, path)
+    else:
+        os.remove(tmp)  # empty month — no file
+    return written
+
+
+def compact(now: datetime | None = None, months: int | None = None) -> dict:
+    """
+    Archive and remove every month of events older than the retention window.
+    Returns ``{"months": [...], "archived": n}``.
+    """
+    from ..extensions import db
+    from ..models.analytics_event import AnalyticsEvent as E
+
+    cutoff = retention_cutoff(now, months)
+    oldest = db.session.query(db.func.min(E.created_at)).filter(E.created_at < cutoff).scalar()
+    partitioned = _is_partitioned(db)
+
+    done, total = [], 0
+    month = _month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        total += _archive_month(db, month)
+        if partitioned:
+            db.session.execute(db.text(f"DROP TABLE IF EXISTS {_partition_name(month)}"))
+        # Rows not in a monthly partition (plain table, or a DEFAULT partition)
+        (db.session.query(E)
+         .filter(E.created_at >= month, E.created_at < _add_months(month, 1))
+         .delete(synchronize_session=False))
+        db.session.commit()
+        done.append(f"{month:%Y-%m}")
+        month = _add_months(month, 1)
+
+    if done:
+        logger.info("Compacted analytics_events: %s event(s) from %s archived",
+                    total, ", ".join(done))
+    return {"months": done, "archived": total}
@@ -21,14 +21,41 @@ Consequence of NOT using this pattern:
     coupling.  Adding a second analytics destination (e.g. sending metrics
     to an external service) would require modifying every controller,
     violating the Open–Closed Principle.
+
+Delivery modes:
+    sync  (default, tests) — ``publish`` notifies every observer inline.
+          ``DBAnalyticsObserver`` adds its row to the caller's session, so
+          publish *before* ``db.session.commit()`` (flush first if you need
+          generated ids) and the event commits atomically with the change.
+    async (``EVENT_BUS_ASYNC=1``) — ``publish`` only enqueues onto a bounded
+          in-memory queue; a writer thread delivers events in batches
+          (every ``EVENT_BUS_BATCH_SIZE`` events or ``EVENT_BUS_FLUSH_MS``)
+          and ``DBAnalyticsObserver`` bulk-inserts each batch with one
+          executemany.  Events published while the session has uncommitted
+          writes are held until it commits (and dropped if it rolls back),
+          so observers only ever see committed state.  A full queue blocks
+          the publisher for up to ``EVENT_BUS_PUT_TIMEOUT_MS`` (backpressure),
+          then drops the event and counts it in ``EventBus.stats()``.
+
+``EventBus.data_version()`` changes once published events are durable (the
+publishing transaction committed, or the async batch was delivered); read
+caches such as the analytics KPI summary key on it.
 """
 
 from __future__ import annotations
+import atexit
+import itertools
 import json
 import logging
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any
+from typing import Any, NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +64,14 @@ logger = logging.getLogger(__name__)
 # Abstract Observer
 # ──────────────────────────────────────────────────────────────────────────────
 
+class Event(NamedTuple):
+    """One published event, as queued in async mode."""
+    event_type: str
+    user_id: int | None
+    metadata: dict | None
+    created_at: datetime
+
+
 class AnalyticsObserver(ABC):
     """Abstract base for all analytics observers."""
 
@@ -48,6 +83,11 @@ class AnalyticsObserver(ABC):
         metadata: dict | None = None,
     ) -> None: ...
 
+    def on_batch(self, events: list[Event]) -> None:
+        """Async mode: handle a batch of events. Override to process them in bulk."""
+        for e in events:
+            self.on_event(e.event_type, user_id=e.user_id, metadata=e.metadata)
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Concrete Observer — writes to the analytics_events table
@@ -82,6 +122,25 @@ class DBAnalyticsObserver(AnalyticsObserver):
         except Exception as exc:  # pragma: no cover
             logger.warning("DBAnalyticsObserver failed to record event: %s", exc)
 
+    def on_batch(self, events: list[Event]) -> None:
+        """Async mode: one multi-row INSERT (executemany) for the whole batch."""
+        from ..extensions import db
+        from ..models.analytics_event import AnalyticsEvent
+
+        db.session.execute(
+            db.insert(AnalyticsEvent),
+            [
+                {
+                    "event_type": e.event_type,
+                    "user_id": e.user_id,
+                    "event_metadata": json.dumps(e.metadata or {}),
+                    "created_at": e.created_at,
+                }
+                for e in events
+            ],
+        )
+        db.session.commit()
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Concrete Observer — stdout logger (useful for debugging / dev)
@@ -117,12 +176,28 @@ class EventBus:
         # At app startup — register observers once
         EventBus.subscribe(DBAnalyticsObserver())
 
-        # In a controller — publish an event
+        # In a controller — publish an event, then commit
+        db.session.flush()
         EventBus.publish("ride_created", user_id=user.id, metadata={"ride_id": ride.id})
+        db.session.commit()
     """
 
     _observers: list[AnalyticsObserver] = []
 
+    # bumped when delivered events are committed (see data_version)
+    _version = 0
+    _version_counter = itertools.count(1)
+
+    # async mode
+    _queue: "queue.Queue[Event | None] | None" = None
+    _writer: threading.Thread | None = None
+    _batch_size = 200
+    _flush_sec = 0.25
+    _put_timeout = 0.05
+    # written by request threads and the writer thread: update via _count()
+    _stats = {"published": 0, "dropped": 0, "delivered": 0, "batches": 0, "failed_batches": 0}
+    _stats_lock = threading.Lock()
+
     @classmethod
     def subscribe(cls, observer: AnalyticsObserver) -> None:
         """Register an observer."""
@@ -146,9 +221,196 @@ class EventBus:
         user_id: int | None = None,
         metadata: dict[str, Any] | None = None,
     ) -> None:
-        """Notify all subscribed observers of an event."""
+        """Notify all subscribed observers of an event (or queue it, in async mode)."""
+        cls._count("published")
+        if cls._queue is not None:
+            event = Event(event_type, user_id, metadata, datetime.utcnow())
+            session = _pending_write_session()
+            if session is not None:
+                session.info.setdefault("pending_events", []).append(event)
+            else:
+                cls._enqueue(event)
+            return
+
         for observer in cls._observers:
             try:
                 observer.on_event(event_type, user_id=user_id, metadata=metadata)
             except Exception as exc:  # pragma: no cover
                 logger.warning("Observer %s raised: %s", observer, exc)
+
+        session = _pending_write_session()
+        if session is not None:
+            session.info["bump_version"] = True
+        else:
+            cls._bump_version()
+
+    @classmethod
+    def on_commit(cls, callback) -> None:
+        """
+        Call ``callback()`` once the current transaction commits (at once when
+        there is none); it is dropped if the transaction rolls back.  The
+        committed session cannot run SQL at that point: a callback that
+        writes opens its own transaction (``db.engine.begin()``).
+        """
+        session = _pending_write_session()
+        if session is not None:
+            session.info.setdefault("after_commit", []).append(callback)
+        else:
+            callback()
+
+    @classmethod
+    def data_version(cls) -> int:
+        """Changes whenever published events become visible to readers (this process)."""
+        return cls._version
+
+    @classmethod
+    def _bump_version(cls) -> None:
+        cls._version = next(cls._version_counter)
+
+    @classmethod
+    def _count(cls, key: str, n: int = 1) -> int:
+        """Add ``n`` to a stats counter; returns its new value."""
+        with cls._stats_lock:
+            cls._stats[key] += n
+            return cls._stats[key]
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Counters for monitoring: published/dropped/delivered events, queue depth."""
+        q = cls._queue
+        with cls._stats_lock:
+            counters = dict(cls._stats)
+        return {
+            "mode": "async" if q is not None else "sync",
+            "queued": q.qsize() if q is not None else 0,
+            **counters,
+        }
+
+    # ── async mode ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def start_async(cls, app, *, queue_size: int = 10000, batch_size: int = 200,
+                    flush_ms: int = 250, put_timeout_ms: int = 50) -> None:
+        """Switch to async delivery and start the writer thread."""
+        if cls._writer is not None and cls._writer.is_alive():
+            return
+        cls._queue = queue.Queue(maxsize=queue_size)
+        cls._batch_size = batch_size
+        cls._flush_sec = flush_ms / 1000
+        cls._put_timeout = put_timeout_ms / 1000
+        cls._writer = threading.Thread(target=cls._write_loop, args=(app,),
+                                       name="event-bus-writer", daemon=True)
+        cls._writer.start()
+        atexit.register(cls.stop_async)
+        logger.info("EventBus async mode (queue=%s, batch=%s, flush=%sms)",
+                    queue_size, batch_size, flush_ms)
+
+    @classmethod
+    def stop_async(cls, timeout: float = 5.0) -> None:
+        """Flush what is queued, stop the writer and return to sync mode."""
+        q, writer = cls._queue, cls._writer
+        if q is None:
+            return
+        try:
+            q.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        if writer is not None:
+            writer.join(timeout)
+        cls._queue = None
+        cls._writer = None
+
+    @classmethod
+    def _enqueue(cls, event: Event) -> None:
+        q = cls._queue
+        if q is None:  # stopped meanwhile
+            return
+        try:
+            # Block briefly so a burst slows publishers down instead of losing events
+            q.put(event, timeout=cls._put_timeout)
+        except queue.Full:
+            dropped = cls._count("dropped")
+            if dropped % 100 == 1:
+                logger.warning("EventBus queue full — %s event(s) dropped so far", dropped)
+
+    @classmethod
+    def _write_loop(cls, app) -> None:
+        q = cls._queue
+        stopping = False
+        while not stopping:
+            batch: list[Event] = []
+            item = q.get()
+            deadline = time.monotonic() + cls._flush_sec
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= cls._batch_size:
+                    break
+                try:
+                    item = q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+            if batch:
+                cls._deliver(app, batch)
+
+    @classmethod
+    def _deliver(cls, app, batch: list[Event]) -> None:
+        from ..extensions import db
+
+        with app.app_context():
+            for observer in list(cls._observers):
+                try:
+                    observer.on_batch(batch)
+                except Exception as exc:
+                    db.session.rollback()
+                    cls._count("failed_batches")
+                    logger.warning("Observer %s failed on a batch of %s: %s",
+                                   observer, len(batch), exc)
+        cls._count("delivered", len(batch))
+        cls._count("batches")
+        cls._bump_version()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Async mode — hold events until the publishing transaction commits
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _pending_write_session():
+    """The request's session if it holds uncommitted writes, else None."""
+    try:
+        from ..extensions import db
+        session = db.session()
+    except Exception:  # no app context
+        return None
+    if session.new or session.dirty or session.deleted or session.info.get("has_flushed"):
+        return session
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session, flush_context):
+    session.info["has_flushed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _release_events(session):
+    session.info.pop("has_flushed", None)
+    for e in session.info.pop("pending_events", ()):
+        EventBus._enqueue(e)
+    for callback in session.info.pop("after_commit", ()):
+        try:
+            callback()
+        except Exception as exc:  # pragma: no cover
+            logger.warning("EventBus after-commit callback failed: %s", exc)
+    # After the callbacks, so caches keyed on the version see their writes
+    if session.info.pop("bump_version", False):
+        EventBus._bump_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session):
+    session.info.pop("has_flushed", None)
+    session.info.pop("pending_events", None)
+    session.info.pop("bump_version", None)
+    session.info.pop("after_commit", None)
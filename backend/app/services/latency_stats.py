@@ -0,0 +1,185 @@
+"""
+Latency Stats — streaming percentiles of booking response times
+===============================================================
+Two latencies are tracked as t-digests (utils/tdigest.py), fed by
+``LatencyObserver`` from EventBus booking events (``waited_sec`` in the
+event metadata = seconds from the request to the decision):
+
+    driver_response   booking_approved / booking_rejected   scope "all" and
+                                                            "driver:<id>"
+    booking_latency   the above plus booking_expired        scope "all"
+
+Each process adds values to in-memory *delta* digests once the publishing
+transaction commits (a rolled-back decision is never counted), and a
+flusher thread (``LatencyStats.start``, started by ``create_app``) folds
+them every ``FLUSH_EVERY_SEC`` into the stored ``latency_sketches`` rows
+(SELECT ... FOR UPDATE, merge, write) in its own transaction — digests are
+mergeable, so several workers can share a row without losing each other's
+values, and no request ever pays for the flush.  In async EventBus mode the
+writer thread records and flushes every delivered batch itself.  What is
+still pending at interpreter exit is flushed by an ``atexit`` hook.
+
+``summary()`` reads one row plus the local delta and answers p50/p90/p99 in
+constant time, however many bookings have been decided.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import threading
+from datetime import datetime
+
+from ..utils.tdigest import TDigest
+from .event_bus import AnalyticsObserver, Event, EventBus
+
+logger = logging.getLogger(__name__)
+
+FLUSH_EVERY_SEC = 60
+
+DRIVER_EVENTS = {"booking_approved", "booking_rejected"}
+LATENCY_EVENTS = DRIVER_EVENTS | {"booking_expired"}
+
+
+class LatencyStats:
+    """Process-wide delta digests (class-level state, like EventBus)."""
+
+    _lock = threading.Lock()
+    _pending: dict[tuple[str, str], TDigest] = {}
+    _thread: threading.Thread | None = None
+    _stop = threading.Event()
+
+    @classmethod
+    def add(cls, metric: str, scope: str, value: float) -> None:
+        with cls._lock:
+            cls._pending.setdefault((metric, scope), TDigest()).add(value)
+
+    @classmethod
+    def record_event(cls, event_type: str, user_id: int | None, metadata: dict | None) -> None:
+        waited = (metadata or {}).get("waited_sec")
+        if waited is None or event_type not in LATENCY_EVENTS:
+            return
+        cls.add("booking_latency", "all", waited)
+        if event_type in DRIVER_EVENTS:
+            cls.add("driver_response", "all", waited)
+            if user_id is not None:
+                cls.add("driver_response", f"driver:{user_id}", waited)
+
+    @classmethod
+    def flush(cls) -> int:
+        """Merge the local deltas into latency_sketches. Caller commits."""
+        from ..extensions import db
+        from ..models.latency_sketch import LatencySketch
+
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+        try:
+            for (metric, scope), delta in pending.items():
+                row = (LatencySketch.query
+                       .filter_by(metric=metric, scope=scope)
+                       .with_for_update()
+                       .first())
+                if row is None:
+                    row = LatencySketch(metric=metric, scope=scope)
+                    db.session.add(row)
+                    digest = delta
+                else:
+                    digest = TDigest.from_dict(row.get_digest())
+                    digest.merge(delta)
+                row.digest = json.dumps(digest.to_dict())
+                row.updated_at = datetime.utcnow()
+        except Exception:
+            # Keep the values for the next flush
+            with cls._lock:
+                for key, delta in pending.items():
+                    cls._pending.setdefault(key, TDigest()).merge(delta)
+            raise
+        return len(pending)
+
+    @classmethod
+    def flush_committed(cls) -> int:
+        """Flush and commit (inside the caller's app context); roll back on failure."""
+        from ..extensions import db
+
+        try:
+            n = cls.flush()
+            db.session.commit()
+            return n
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @classmethod
+    def start(cls, app, interval: float = FLUSH_EVERY_SEC) -> None:
+        """Start the per-process flusher thread; also flushes once at exit."""
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        cls._stop.clear()
+
+        def _flush():
+            with app.app_context():
+                try:
+                    cls.flush_committed()
+                except Exception as exc:
+                    logger.warning("[LATENCY] flush failed: %s", exc)
+
+        def _loop():
+            while not cls._stop.wait(interval):
+                _flush()
+            _flush()
+
+        cls._thread = threading.Thread(target=_loop, name="latency-flusher", daemon=True)
+        cls._thread.start()
+        atexit.register(cls.stop)
+        logger.info("Latency flusher started (every %ss)", interval)
+
+    @classmethod
+    def stop(cls, timeout: float | None = 5.0) -> None:
+        """Stop the flusher thread after a last flush."""
+        cls._stop.set()
+        if cls._thread is not None:
+            cls._thread.join(timeout)
+        cls._thread = None
+
+    @classmethod
+    def summary(cls, metric: str, scope: str = "all") -> dict:
+        """count and p50/p90/p99 seconds for one sketch (stored + not yet flushed)."""
+        from ..models.latency_sketch import LatencySketch
+
+        row = LatencySketch.query.filter_by(metric=metric, scope=scope).first()
+        digest = TDigest.from_dict(row.get_digest()) if row else TDigest()
+        with cls._lock:
+            local = cls._pending.get((metric, scope))
+            if local is not None:
+                digest.merge(local)
+
+        def q(p):
+            v = digest.quantile(p)
+            return round(v, 1) if v is not None else None
+
+        return {
+            "count": len(digest),
+            "p50_sec": q(0.5),
+            "p90_sec": q(0.9),
+            "p99_sec": q(0.99),
+        }
+
+
+class LatencyObserver(AnalyticsObserver):
+    """Feeds LatencyStats from booking decision events."""
+
+    def on_event(
+        self,
+        event_type: str,
+        user_id: int | None = None,
+        metadata: dict | None = None,
+    ) -> None:
+        # Counted once the decision is committed; the flusher thread persists it
+        EventBus.on_commit(lambda: LatencyStats.record_event(event_type, user_id, metadata))
+
+    def on_batch(self, events: list[Event]) -> None:
+        # Async mode: the writer thread is already off the request path
+        for e in events:
+            LatencyStats.record_event(e.event_type, e.user_id, e.metadata)
+        LatencyStats.flush_committed()
@@ -0,0 +1,200 @@
+"""
+Lifecycle Sweeper — background booking/ride housekeeping
+========================================================
+Two time-based transitions used to happen on the request path: every ride
+endpoint first rejected PENDING requests older than 24h (a full scan plus one
+synchronous SMTP send per expired booking, inside an unrelated user's
+request), and past rides were never moved out of OPEN at all.
+
+``LifecycleSweeper`` runs both off the request path:
+
+  - expire_pending_requests():  PENDING bookings older than
+                                ``AUTO_REJECT_AFTER`` → REJECTED
+                                (index: carpool_bookings(status, created_at))
+  - complete_past_rides():      OPEN/FULL rides that departed more than
+                                ``COMPLETE_AFTER`` ago → COMPLETED
+                                (index: ride_posts(status, departure_datetime))
+
+Each works in index-ordered batches and commits per batch; expiry emails go
+on the notification outbox in the same transaction
+(services/notifications.py).  Events ``booking_expired`` and
+``ride_completed`` are published on the EventBus for analytics and the ride
+index.
+
+Readers never depend on the sweep: ``CarpoolBooking.effective_status``
+already reports an expired PENDING request as REJECTED, and mutations
+materialize it first (``materialize_expiry``).  The sweep only makes the
+write durable and queues the passenger's email.
+
+The sweeper thread is started by ``create_app`` when
+``LIFECYCLE_SWEEPER_ENABLED`` is set.  With several web workers, enable it
+on one of them only (or disable it everywhere and run
+``flask --app run.py rides sweep`` from cron).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import joinedload
+
+from ..models.booking import AUTO_REJECT_AFTER
+
+logger = logging.getLogger(__name__)
+
+COMPLETE_AFTER = timedelta(hours=2)
+BATCH_SIZE = 200
+
+
+def queue_expired_notice(booking) -> None:
+    """Queue the passenger's auto-rejection email on the notification outbox."""
+    from ..utils.email_templates import urbix_email_html, ride_rows
+    from .notifications import queue_email
+
+    ride = booking.ride_post
+    if not (booking.passenger and booking.passenger.email):
+        return
+    text = (
+        f"Your request for {ride.departure} → {ride.destination} at "
+        f"{ride.departure_datetime.isoformat()} was auto-rejected because "
+        f"the driver didn’t respond within 24 hours."
+    )
+    html = urbix_email_html(
+        title="Request auto-rejected",
+        subtitle="The driver did not respond within 24 hours.",
+        badge="EXPIRED",
+        rows=ride_rows(ride, seats=booking.seats_requested, status="Rejected"),
+        cta_text="Open My Rides",
+        cta_url="",
+        footer_note="UrbiX • This is an automated update",
+    )
+    queue_email(booking.passenger.email,
+                "UrbiX: Ride request auto-rejected (no response)", text,
+                html=html, user_id=booking.passenger_user_id)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sweeps (require an app context)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def expire_pending_requests(now: datetime | None = None, *,
+                            batch_size: int = BATCH_SIZE) -> int:
+    """Reject PENDING requests older than AUTO_REJECT_AFTER. Returns how many."""
+    from ..extensions import db
+    from ..models import CarpoolBooking
+    from .event_bus import EventBus
+
+    now = now or datetime.utcnow()
+    cutoff = now - AUTO_REJECT_AFTER
+    total = 0
+    while True:
+        # created_at (not expires_at) so rows from before the column are swept too;
+        # rejected rows leave the PENDING range, so each pass starts from the top
+        batch = (
+            CarpoolBooking.query
+            .options(joinedload(CarpoolBooking.ride_post),
+                     joinedload(CarpoolBooking.passenger))
+            .filter(CarpoolBooking.status == "PENDING",
+                    CarpoolBooking.created_at < cutoff)
+            .order_by(CarpoolBooking.created_at.asc(), CarpoolBooking.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        for b in batch:
+            b.set_status("REJECTED", b.expires_at or now)
+            queue_expired_notice(b)
+            EventBus.publish("booking_expired", user_id=b.passenger_user_id,
+                             metadata={"ride_id": b.ride_post_id, "booking_id": b.id,
+                                       "waited_sec": b.waited_sec()})
+        db.session.commit()
+
+        total += len(batch)
+        if len(batch) < batch_size:
+            break
+    return total
+
+
+def complete_past_rides(now: datetime | None = None, *,
+                        batch_size: int = BATCH_SIZE) -> int:
+    """Mark OPEN/FULL rides that departed over COMPLETE_AFTER ago as COMPLETED."""
+    from ..extensions import db
+    from ..models import RidePost
+    from .event_bus import EventBus
+
+    cutoff = (now or datetime.utcnow()) - COMPLETE_AFTER
+    total = 0
+    for status in ("OPEN", "FULL"):
+        while True:
+            batch = (
+                RidePost.query
+                .filter(RidePost.status == status,
+                        RidePost.departure_datetime < cutoff)
+                .order_by(RidePost.departure_datetime.asc(), RidePost.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for ride in batch:
+                ride.status = "COMPLETED"
+                EventBus.publish("ride_completed", user_id=ride.creator_user_id,
+                                 metadata={"ride_id": ride.id})
+            db.session.commit()
+            total += len(batch)
+            if len(batch) < batch_size:
+                break
+    return total
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Background thread
+# ──────────────────────────────────────────────────────────────────────────────
+
+class LifecycleSweeper:
+    """Process-wide daemon thread that runs both sweeps every ``interval`` seconds."""
+
+    _thread: threading.Thread | None = None
+    _stop = threading.Event()
+
+    @classmethod
+    def run_once(cls) -> dict:
+        """Run both sweeps now (inside the caller's app context)."""
+        now = datetime.utcnow()
+        return {
+            "expired_requests": expire_pending_requests(now),
+            "completed_rides": complete_past_rides(now),
+        }
+
+    @classmethod
+    def start(cls, app, interval: float = 60.0) -> None:
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        cls._stop.clear()
+
+        def _loop():
+            while not cls._stop.wait(interval):
+                with app.app_context():
+                    try:
+                        result = cls.run_once()
+                        if any(result.values()):
+                            logger.info("[SWEEPER] %s", result)
+                    except Exception as exc:
+                        logger.warning("[SWEEPER] sweep failed: %s", exc)
+                        from ..extensions import db
+                        db.session.rollback()
+
+        cls._thread = threading.Thread(target=_loop, name="lifecycle-sweeper", daemon=True)
+        cls._thread.start()
+        logger.info("Lifecycle sweeper started (every %ss)", interval)
+
+    @classmethod
+    def stop(cls, timeout: float | None = 5.0) -> None:
+        cls._stop.set()
+        if cls._thread is not None:
+            cls._thread.join(timeout)
+        cls._thread = None
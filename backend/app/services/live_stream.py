@@ -0,0 +1,159 @@
+"""
+Live Stream — Server-Sent Events feed for the admin analytics dashboard
+=======================================================================
+``LiveStreamObserver`` turns every EventBus event into one message
+
+    {"event":  {"type", "user_id", "metadata", "created_at"},
+     "deltas": [{"metric", "dimension", "delta"}, ...]}
+
+(``deltas`` are the rollup counter changes, see analytics_rollup.event_deltas)
+and appends it to ``LiveFeed``: one shared, bounded ring buffer with a
+sequence number per message.  Each open ``/api/analytics/stream`` response
+just waits on the feed's condition and sends what is newer than its own
+position, so N open dashboards cost one subscription and no database
+queries at all.
+
+In sync mode messages are appended when the publishing transaction commits
+(nothing is shown for a rolled-back request); in async mode when the writer
+thread has delivered the batch.
+
+The sequence number is the SSE ``id``: a reconnecting EventSource sends it
+back as ``Last-Event-ID`` and resumes where it left off.  If the buffer has
+moved past that point the client gets an ``event: reset`` and should reload
+its totals from ``/summary``.  The feed is per process — with several
+workers each dashboard sees the events of the worker it is connected to.
+Every open stream holds a worker thread, so a process serves at most
+``ANALYTICS_STREAM_MAX_LISTENERS`` of them at once.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Iterator
+
+from .event_bus import AnalyticsObserver, Event, EventBus
+
+BUFFER_SIZE = 1000
+KEEPALIVE_SEC = 15
+MAX_STREAM_SEC = 300   # the browser reconnects on its own (with Last-Event-ID)
+RETRY_MS = 3000
+
+
+class LiveFeed:
+    """Process-wide fan-out buffer (class-level state, like EventBus)."""
+
+    _cond = threading.Condition()
+    _buffer: deque[tuple[int, str]] = deque(maxlen=BUFFER_SIZE)
+    _seq = 0
+    _listeners = 0
+
+    @classmethod
+    def publish(cls, message: dict) -> int:
+        data = json.dumps(message, default=str, ensure_ascii=False)
+        with cls._cond:
+            cls._seq += 1
+            cls._buffer.append((cls._seq, data))
+            cls._cond.notify_all()
+            return cls._seq
+
+    @classmethod
+    def current_seq(cls) -> int:
+        with cls._cond:
+            return cls._seq
+
+    @classmethod
+    def read_after(cls, last_seq: int, timeout: float) -> tuple[list[tuple[int, str]], bool]:
+        """
+        Messages with seq > ``last_seq``, waiting up to ``timeout`` seconds
+        for one.  The flag is True when some were already dropped from the
+        buffer (the reader fell too far behind).
+        """
+        with cls._cond:
+            if cls._seq <= last_seq:
+                cls._cond.wait(timeout)
+            if cls._seq <= last_seq:
+                return [], False
+            oldest = cls._buffer[0][0] if cls._buffer else cls._seq + 1
+            items = [item for item in cls._buffer if item[0] > last_seq]
+            return items, oldest > last_seq + 1
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._cond:
+            return {"seq": cls._seq, "buffered": len(cls._buffer), "listeners": cls._listeners}
+
+    @classmethod
+    def _listen(cls, delta: int, limit: int | None = None) -> bool:
+        """Add (or remove) listeners; False, and nothing added, past ``limit``."""
+        with cls._cond:
+            if delta > 0 and limit is not None and cls._listeners + delta > limit:
+                return False
+            cls._listeners += delta
+            return True
+
+
+def _message(event_type: str, user_id: int | None, metadata: dict | None,
+             created_at: datetime) -> dict:
+    from .analytics_rollup import event_deltas
+
+    return {
+        "event": {
+            "type": event_type,
+            "user_id": user_id,
+            "metadata": metadata or {},
+            "created_at": created_at.isoformat(),
+        },
+        "deltas": [
+            {"metric": metric, "dimension": dimension, "delta": delta}
+            for metric, dimension, delta in event_deltas(event_type, metadata)
+        ],
+    }
+
+
+def stream(last_event_id: str | None = None) -> Iterator[str]:
+    """
+    SSE lines for one client: new messages as ``event: analytics``, a
+    comment every ``KEEPALIVE_SEC`` and an ``event: reset`` after a gap.
+    Ends after ``MAX_STREAM_SEC`` so a worker is not held forever.  The
+    caller counts the listener (``LiveFeed._listen``) for as long as the
+    response is open.
+    """
+    try:
+        last_seq = int(last_event_id)
+    except (TypeError, ValueError):
+        last_seq = LiveFeed.current_seq()
+    last_seq = min(last_seq, LiveFeed.current_seq())
+
+    yield f"retry: {RETRY_MS}\n\n"
+    deadline = time.monotonic() + MAX_STREAM_SEC
+    while time.monotonic() < deadline:
+        items, gap = LiveFeed.read_after(last_seq, KEEPALIVE_SEC)
+        if gap:
+            yield "event: reset\ndata: {}\n\n"
+        if not items:
+            yield ": keepalive\n\n"
+            continue
+        for seq, data in items:
+            yield f"id: {seq}\nevent: analytics\ndata: {data}\n\n"
+        last_seq = items[-1][0]
+
+
+class LiveStreamObserver(AnalyticsObserver):
+    """Feeds LiveFeed once the events are durable."""
+
+    def on_event(
+        self,
+        event_type: str,
+        user_id: int | None = None,
+        metadata: dict | None = None,
+    ) -> None:
+        message = _message(event_type, user_id, metadata, datetime.utcnow())
+        EventBus.on_commit(lambda: LiveFeed.publish(message))
+
+    def on_batch(self, events: list[Event]) -> None:
+        for e in events:
+            LiveFeed.publish(_message(e.event_type, e.user_id, e.metadata, e.created_at))
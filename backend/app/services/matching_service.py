@@ -0,0 +1,284 @@
+"""
+Matching Service — vectorised ride scoring
+==========================================
+Scores a passenger's trip (origin, destination, desired departure time,
+lifestyle preferences) against every candidate ride in a single NumPy pass
+and returns the rides ranked best-first.
+
+Each ride gets five sub-scores in [0, 1]:
+  - pickup    — distance from the passenger's origin to the ride's departure
+  - dropoff   — distance from the ride's destination to the passenger's destination
+  - time      — difference between the wanted and the actual departure time
+  - prefs     — share of carpool preferences (smoking/pets/music/chatty) that agree
+  - rating    — the driver's average rating (unrated drivers are treated as average)
+
+The final score is their weighted average on a 0–100 scale.  Inputs the caller
+did not provide (e.g. no origin) are left out and the remaining weights are
+renormalised, so a score is always comparable within one request.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+
+_EARTH_RADIUS_KM = 6371.0
+_EPOCH = datetime(1970, 1, 1)
+
+WEIGHTS = {
+    "pickup":  0.30,
+    "dropoff": 0.30,
+    "time":    0.20,
+    "prefs":   0.10,
+    "rating":  0.10,
+}
+
+# Distance / time at which a sub-score has decayed to 1/e (~0.37)
+PICKUP_SCALE_KM  = 2.0
+DROPOFF_SCALE_KM = 2.0
+TIME_SCALE_MIN   = 60.0
+
+# Used for drivers who have not been rated yet
+NEUTRAL_RATING = 3.5
+
+_PREF_KEYS = ("allow_smoking", "allow_pets", "music_ok", "chatty")
+_COLUMNS = (
+    "id", "creator_user_id", "departure_ts", "seats_available",
+    "dep_lat", "dep_lng", "dest_lat", "dest_lng",
+    *_PREF_KEYS, "rating",
+)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Input helpers
+# ──────────────────────────────────────────────────────────────────────────────
+
+def preferences_from_user(user) -> dict[str, bool] | None:
+    """Carpool preferences of a User as the flat dict the scorer expects."""
+    prefs = getattr(user, "preferences", None)
+    if prefs is None:
+        return None
+    return {key: bool(getattr(prefs, key)) for key in _PREF_KEYS}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Vectorised core
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _haversine(lat1, lng1, lat2, lng2) -> np.ndarray:
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _epoch_seconds(values) -> np.ndarray:
+    """Naive UTC datetimes → float seconds since the epoch."""
+    return np.fromiter(((dt - _EPOCH).total_seconds() for dt in values),
+                       dtype=np.float64, count=len(values))
+
+
+def _columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+    """Turn row tuples (ordered as _COLUMNS) into one NumPy array per column."""
+    cols = list(zip(*rows)) if rows else [()] * len(_COLUMNS)
+    out = {
+        "id":              np.asarray(cols[0], dtype=np.int64),
+        "creator_user_id": np.asarray(cols[1], dtype=np.int64),
+        "departure_ts":    _epoch_seconds(cols[2]),
+        "seats_available": np.asarray(cols[3], dtype=np.int64),
+    }
+    for name, col in zip(_COLUMNS[4:8], cols[4:8]):
+        out[name] = np.asarray(col, dtype=np.float64)
+    for name, col in zip(_PREF_KEYS, cols[8:12]):
+        out[name] = np.asarray(col, dtype=bool)
+    out["rating"] = np.asarray(
+        [NEUTRAL_RATING if r is None else r for r in cols[12]], dtype=np.float64)
+    return out
+
+
+def score_columns(
+    cols: dict[str, np.ndarray],
+    *,
+    origin: tuple[float, float] | None = None,
+    destination: tuple[float, float] | None = None,
+    departure: datetime | None = None,
+    preferences: dict[str, bool] | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Score every ride in ``cols`` at once. Returns the final ``score`` (0–100)
+    plus each sub-score and the raw gaps, all as arrays aligned with ``cols``.
+    """
+    n = len(cols["id"])
+    parts: dict[str, np.ndarray] = {}
+    out: dict[str, np.ndarray] = {}
+
+    if origin is not None:
+        gap = _haversine(origin[0], origin[1], cols["dep_lat"], cols["dep_lng"])
+        out["gap_to_pickup_km"] = gap
+        parts["pickup"] = np.exp(-gap / PICKUP_SCALE_KM)
+    if destination is not None:
+        gap = _haversine(cols["dest_lat"], cols["dest_lng"], destination[0], destination[1])
+        out["gap_from_dropoff_km"] = gap
+        parts["dropoff"] = np.exp(-gap / DROPOFF_SCALE_KM)
+    if departure is not None:
+        delta_min = np.abs(cols["departure_ts"] - _epoch_seconds([departure])[0]) / 60.0
+        out["time_delta_min"] = delta_min
+        parts["time"] = np.exp(-delta_min / TIME_SCALE_MIN)
+    if preferences is not None:
+        # A conflict is the ride allowing something the passenger does not want
+        # (smoking/music/chat), or refusing pets when the passenger brings one.
+        conflicts = (
+            (cols["allow_smoking"] & (not preferences.get("allow_smoking", False))).astype(np.int8)
+            + (~cols["allow_pets"] & preferences.get("allow_pets", False)).astype(np.int8)
+            + (cols["music_ok"] & (not preferences.get("music_ok", True))).astype(np.int8)
+            + (cols["chatty"] & (not preferences.get("chatty", True))).astype(np.int8)
+        )
+        out["preference_conflicts"] = conflicts
+        parts["prefs"] = 1.0 - conflicts / len(_PREF_KEYS)
+    parts["rating"] = np.clip(cols["rating"] / 5.0, 0.0, 1.0)
+
+    total_weight = sum(WEIGHTS[k] for k in parts)
+    score = np.zeros(n, dtype=np.float64)
+    for key, part in parts.items():
+        score += WEIGHTS[key] * part
+    out["score"] = np.round(score / total_weight * 100.0, 1)
+    out.update({f"{k}_score": v for k, v in parts.items()})
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Service
+# ──────────────────────────────────────────────────────────────────────────────
+
+class MatchingService:
+    """
+    Ranks open rides for a passenger.
+
+    Usage::
+
+        matches = MatchingService.rank(
+            origin=(45.52, -73.58), destination=(45.49, -73.57),
+            departure=datetime(2026, 3, 2, 8, 0), preferences={"allow_pets": True},
+        )
+        booking.matched_score = MatchingService.score_ride(ride, origin=..., ...)
+    """
+
+    @staticmethod
+    def _candidate_rows(query) -> list[tuple]:
+        from ..models import RidePost, User
+        return (
+            query.join(User, User.id == RidePost.creator_user_id)
+            .with_entities(
+                RidePost.id, RidePost.creator_user_id, RidePost.departure_datetime,
+                RidePost.seats_available,
+                RidePost.departure_lat, RidePost.departure_lng,
+                RidePost.destination_lat, RidePost.destination_lng,
+                RidePost.allow_smoking, RidePost.allow_pets,
+                RidePost.music_ok, RidePost.chatty,
+                User.avg_driver_rating,
+            )
+            .all()
+        )
+
+    @classmethod
+    def rank(
+        cls,
+        *,
+        origin: tuple[float, float] | None = None,
+        destination: tuple[float, float] | None = None,
+        departure: datetime | None = None,
+        preferences: dict[str, bool] | None = None,
+        seats: int = 1,
+        exclude_user_id: int | None = None,
+        max_pickup_km: float | None = None,
+        max_dropoff_km: float | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """
+        Score all OPEN future rides with resolved coordinates and return the top
+        ``limit`` as dicts with ``ride_id``, ``score`` and the per-part breakdown.
+        """
+        from ..models import RidePost
+
+        q = RidePost.query.filter(
+            RidePost.status == "OPEN",
+            RidePost.departure_datetime > datetime.utcnow(),
+            RidePost.seats_available >= seats,
+            RidePost.departure_lat.isnot(None),
+            RidePost.destination_lat.isnot(None),
+        )
+        if exclude_user_id is not None:
+            q = q.filter(RidePost.creator_user_id != exclude_user_id)
+        if origin is not None and max_pickup_km is not None:
+            # Cheap bounding box in SQL; the exact radius is applied after scoring
+            dlat = max_pickup_km / 111.0
+            dlng = max_pickup_km / (111.0 * max(np.cos(np.radians(origin[0])), 0.01))
+            q = q.filter(
+                RidePost.departure_lat.between(origin[0] - dlat, origin[0] + dlat),
+                RidePost.departure_lng.between(origin[1] - dlng, origin[1] + dlng),
+            )
+
+        rows = cls._candidate_rows(q)
+        if not rows:
+            return []
+        cols = _columns(rows)
+        scored = score_columns(cols, origin=origin, destination=destination,
+                               departure=departure, preferences=preferences)
+
+        keep = np.ones(len(rows), dtype=bool)
+        if max_pickup_km is not None and "gap_to_pickup_km" in scored:
+            keep &= scored["gap_to_pickup_km"] <= max_pickup_km
+        if max_dropoff_km is not None and "gap_from_dropoff_km" in scored:
+            keep &= scored["gap_from_dropoff_km"] <= max_dropoff_km
+        idx = np.flatnonzero(keep)
+        if idx.size == 0:
+            return []
+
+        # Partial sort: only the top `limit` need ordering
+        k = min(limit, idx.size)
+        top = idx[np.argpartition(-scored["score"][idx], k - 1)[:k]]
+        top = top[np.argsort(-scored["score"][top], kind="stable")]
+
+        return [cls._match_dict(cols, scored, i) for i in top]
+
+    @classmethod
+    def score_ride(
+        cls,
+        ride,
+        *,
+        origin: tuple[float, float] | None = None,
+        destination: tuple[float, float] | None = None,
+        departure: datetime | None = None,
+        preferences: dict[str, bool] | None = None,
+    ) -> float | None:
+        """Score a single RidePost the same way ``rank`` does (0–100)."""
+        from ..models import RidePost
+
+        # Rides without coordinates can only be scored on time/prefs/rating
+        if ride.departure_coords is None:
+            origin = None
+        if ride.destination_coords is None:
+            destination = None
+        rows = cls._candidate_rows(RidePost.query.filter(RidePost.id == ride.id))
+        if not rows:
+            return None
+        scored = score_columns(_columns(rows), origin=origin, destination=destination,
+                               departure=departure, preferences=preferences)
+        return float(scored["score"][0])
+
+    @staticmethod
+    def _match_dict(cols: dict[str, np.ndarray], scored: dict[str, np.ndarray], i: int) -> dict:
+        out = {
+            "ride_id": int(cols["id"][i]),
+            "score":   float(scored["score"][i]),
+            "breakdown": {
+                k[:-6]: round(float(v[i]), 3) for k, v in scored.items() if k.endswith("_score")
+            },
+        }
+        for key in ("gap_to_pickup_km", "gap_from_dropoff_km", "time_delta_min"):
+            if key in scored:
+                out[key] = round(float(scored[key][i]), 2)
+        if "preference_conflicts" in scored:
+            out["preference_conflicts"] = int(scored["preference_conflicts"][i])
+        return out
@@ -24,9 +24,15 @@ Consequence of NOT using this pattern:
 """
 
 from __future__ import annotations
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Abstract Product
@@ -37,6 +43,9 @@ class MobilityService(ABC):
     Common interface that all mobility-service implementations must satisfy.
     """
 
+    # Seconds the admin services panel waits for this service's probe()
+    probe_timeout: float = 2.0
+
     @property
     @abstractmethod
     def service_type(self) -> str:
@@ -59,6 +68,12 @@ class MobilityService(ABC):
         """Return True if the service is currently reachable/enabled."""
         ...
 
+    def probe(self) -> dict[str, Any]:
+        """get_info() plus ``available``. Override to fetch upstream data only once."""
+        info = self.get_info()
+        info["available"] = self.is_available()
+        return info
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Concrete Products
@@ -67,6 +82,9 @@ class MobilityService(ABC):
 class BixiMobilityService(MobilityService):
     """Wraps the BixiService singleton to conform to the MobilityService interface."""
 
+    # GBFS fetches time out after 8s each; serve a slow first load from the cache later
+    probe_timeout = 4.0
+
     @property
     def service_type(self) -> str:
         return "bixi"
@@ -97,6 +115,12 @@ class BixiMobilityService(MobilityService):
         except Exception:
             return False
 
+    def probe(self) -> dict[str, Any]:
+        # get_info() already fetched the stations — it succeeding means available
+        info = self.get_info()
+        info["available"] = True
+        return info
+
 
 class TransitMobilityService(MobilityService):
     """Represents the STM (Société de transport de Montréal) transit system."""
@@ -188,6 +212,18 @@ class WalkingMobilityService(MobilityService):
 # Factory
 # ──────────────────────────────────────────────────────────────────────────────
 
+PROBE_TTL_SEC = 30
+
+
+def _probe_error(svc: MobilityService, error: str) -> dict[str, Any]:
+    return {
+        "service_type": svc.service_type,
+        "display_name": svc.display_name,
+        "available": False,
+        "error": error,
+    }
+
+
 class MobilityServiceFactory:
     """
     Factory that creates MobilityService instances by service-type key.
@@ -198,8 +234,17 @@ class MobilityServiceFactory:
         info = svc.get_info()
 
         all_services = MobilityServiceFactory.create_all()
+
+        # Admin panel: every service's info, probed in parallel and cached
+        infos = MobilityServiceFactory.probe_all()
     """
 
+    # probe_all(): service_type → (monotonic time, info); probes still running
+    _probe_cache: dict[str, tuple[float, dict[str, Any]]] = {}
+    _probe_inflight: dict[str, Future] = {}
+    _probe_lock = threading.Lock()
+    _probe_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mobility-probe")
+
     _registry: dict[str, type[MobilityService]] = {
         "bixi":     BixiMobilityService,
         "transit":  TransitMobilityService,
@@ -227,6 +272,67 @@ class MobilityServiceFactory:
         """Return one instance of every registered service."""
         return [klass() for klass in cls._registry.values()]
 
+    @classmethod
+    def probe_all(cls, ttl: float = PROBE_TTL_SEC) -> list[dict[str, Any]]:
+        """
+        ``probe()`` every registered service concurrently and return their info
+        dicts in registry order.
+
+        Results are cached for ``ttl`` seconds.  Each service gets its own
+        ``probe_timeout``; the call returns once every probe has finished or
+        hit its deadline, so it takes about the slowest deadline, not the sum
+        of upstream latencies.  A probe that misses its deadline is reported
+        unavailable but keeps running, and its result is cached when it lands.
+        Probes run in the caller's app context (the carpool one queries the DB).
+        """
+        from flask import current_app
+        app = current_app._get_current_object()
+
+        now = time.monotonic()
+        services = cls.create_all()
+        futures: dict[str, Future] = {}
+        with cls._probe_lock:
+            for svc in services:
+                cached = cls._probe_cache.get(svc.service_type)
+                if cached is not None and now - cached[0] < ttl:
+                    continue
+                fut = cls._probe_inflight.get(svc.service_type)
+                if fut is None:
+                    fut = cls._probe_pool.submit(cls._run_probe, app, svc)
+                    cls._probe_inflight[svc.service_type] = fut
+                futures[svc.service_type] = fut
+
+        out = []
+        for svc in services:
+            fut = futures.get(svc.service_type)
+            if fut is not None:
+                try:
+                    fut.result(timeout=max(0.0, now + svc.probe_timeout - time.monotonic()))
+                except FutureTimeout:
+                    out.append(_probe_error(svc, f"timed out after {svc.probe_timeout:g}s"))
+                    continue
+            with cls._probe_lock:
+                cached = cls._probe_cache.get(svc.service_type)
+            out.append(dict(cached[1]) if cached else _probe_error(svc, "no result"))
+        return out
+
+    @classmethod
+    def invalidate_probes(cls) -> None:
+        with cls._probe_lock:
+            cls._probe_cache.clear()
+
+    @classmethod
+    def _run_probe(cls, app, svc: MobilityService) -> None:
+        try:
+            with app.app_context():
+                result = svc.probe()
+        except Exception as exc:
+            logger.warning("Mobility probe %s failed: %s", svc.service_type, exc)
+            result = _probe_error(svc, str(exc))
+        with cls._probe_lock:
+            cls._probe_cache[svc.service_type] = (time.monotonic(), result)
+            cls._probe_inflight.pop(svc.service_type, None)
+
     @classmethod
     def available_types(cls) -> list[str]:
         return list(cls._registry)
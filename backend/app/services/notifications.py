@@ -0,0 +1,384 @@
+"""
+Notification Outbox — transactional email/push delivery
+=======================================================
+Controllers used to send email and push notifications right after
+``db.session.commit()``, inside the request and wrapped in bare try/except:
+a crash between the commit and the send lost the notification, and every
+send added SMTP/FCM latency to the response.
+
+Now a notification is a row in ``notification_outbox`` added with
+``queue_email`` / ``queue_push`` *before* the commit, so it is stored
+atomically with the booking/ride change that caused it (and rolled back
+with it).  The request pays for one extra INSERT.
+
+``OutboxDispatcher`` drains the table in batches:
+
+  1. claim — ``UPDATE … SET status='SENDING', claim_token=:t WHERE id IN
+     (next PENDING ids) AND status='PENDING'``.  The status re-check makes the
+     claim atomic, so any number of dispatchers (threads, workers, hosts) can
+     run side by side without sending a row twice.
+  2. deliver — email over one persistent SMTP session; the batch's pushes
+     together through FCM's ``send_each`` (one call per 500), clearing
+     ``User.fcm_token`` for tokens FCM reports as unregistered.
+  3. settle — SENT, or back to PENDING with exponential backoff in
+     ``available_at``, or FAILED after ``MAX_ATTEMPTS``.  Each row is
+     committed on its own so a crash re-sends at most the row in flight.
+
+Notifications for the same recipient are coalesced: everything claimed
+together for one address/token goes out as a single digest (built with
+``urbix_email_html`` rows), and a recipient notified less than
+``NOTIFICATION_COALESCE_SEC`` ago is held until that window closes, so a
+burst of requests or expiries becomes one email and one push.
+
+Claims older than ``CLAIM_TIMEOUT`` (a dispatcher died mid-batch) are
+released back to PENDING.  The dispatcher thread is started by
+``create_app`` when ``NOTIFICATION_DISPATCHER_ENABLED`` is set and is woken
+as soon as a session that queued notifications commits; run one pass by
+hand with ``flask --app run.py notifications drain``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models.notification import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+# Matches FCM's send_each() limit, so one batch of pushes is one HTTP call
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+RETRY_BASE = timedelta(seconds=30)
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Write side (request path)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def queue_email(to_email: str | None, subject: str, text: str, *,
+                html: str | None = None, user_id: int | None = None) -> NotificationOutbox | None:
+    """Add an email to the outbox in the current session. The caller commits."""
+    if not to_email:
+        return None
+    row = NotificationOutbox(channel="email", user_id=user_id, recipient=to_email,
+                             subject=subject, body=text, html=html)
+    db.session.add(row)
+    db.session.info["notifications_queued"] = True
+    return row
+
+
+def queue_push(fcm_token: str | None, title: str, body: str, *,
+               data: dict | None = None, user_id: int | None = None) -> NotificationOutbox | None:
+    """Add a push notification to the outbox in the current session. The caller commits."""
+    if not fcm_token:
+        return None
+    row = NotificationOutbox(channel="push", user_id=user_id, recipient=fcm_token,
+                             subject=title, body=body,
+                             payload=json.dumps(data) if data else None)
+    db.session.add(row)
+    db.session.info["notifications_queued"] = True
+    return row
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop("notifications_queued", False):
+        OutboxDispatcher.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_queued(session):
+    session.info.pop("notifications_queued", None)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Delivery side
+# ──────────────────────────────────────────────────────────────────────────────
+
+class _Skip(Exception):
+    """The channel is not configured in this deployment — nothing to send."""
+
+
+class OutboxDispatcher:
+    """Claims, delivers and settles outbox rows; optionally on a daemon thread."""
+
+    _thread: threading.Thread | None = None
+    _wakeup = threading.Event()
+    _stop = threading.Event()
+    _local = threading.local()  # one SMTP session per dispatching thread
+
+    # ── one batch ────────────────────────────────────────────────────────────
+
+    @classmethod
+    def drain(cls, batch_size: int = BATCH_SIZE) -> int:
+        """Deliver one batch of due notifications. Returns how many were claimed."""
+        now = datetime.utcnow()
+        cls._release_stale(now)
+
+        token = uuid.uuid4().hex
+        due = (
+            select(NotificationOutbox.id)
+            .where(NotificationOutbox.status == "PENDING",
+                   NotificationOutbox.available_at <= now)
+            .order_by(NotificationOutbox.available_at, NotificationOutbox.id)
+            .limit(batch_size)
+        )
+        db.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(due.scalar_subquery()),
+                   NotificationOutbox.status == "PENDING")
+            .values(status="SENDING", claim_token=token, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        rows = (NotificationOutbox.query
+                .filter_by(claim_token=token, status="SENDING")
+                .order_by(NotificationOutbox.id)
+                .all())
+        groups = cls._hold_recent(cls._group(rows), now)
+        push_groups = [g for g in groups if g[0].channel == "push"]
+        for group in groups:
+            if group[0].channel != "push":
+                cls._deliver(group)
+                db.session.commit()
+        if push_groups:
+            cls._deliver_pushes(push_groups)
+        db.session.commit()
+        return len(rows)
+
+    @classmethod
+    def drain_all(cls, batch_size: int = BATCH_SIZE) -> int:
+        total = 0
+        while True:
+            n = cls.drain(batch_size)
+            total += n
+            if n < batch_size:
+                return total
+
+    @staticmethod
+    def _release_stale(now: datetime) -> None:
+        released = db.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.status == "SENDING",
+                   NotificationOutbox.claimed_at < now - CLAIM_TIMEOUT)
+            .values(status="PENDING", claim_token=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if released:
+            logger.warning("[OUTBOX] released %s stale claim(s)", released)
+        db.session.commit()
+
+    @staticmethod
+    def _settle(row: NotificationOutbox, error: Exception | None = None) -> None:
+        if error is None:
+            row.status = "SENT"
+            row.sent_at = datetime.utcnow()
+            row.last_error = None
+        elif isinstance(error, _Skip):
+            row.status = "SKIPPED"
+            row.last_error = str(error)
+        else:
+            row.last_error = str(error)[:500]
+            if row.attempts >= MAX_ATTEMPTS:
+                row.status = "FAILED"
+                logger.warning("[OUTBOX] %s #%s failed permanently: %s", row.channel, row.id, error)
+            else:
+                row.status = "PENDING"
+                row.available_at = datetime.utcnow() + RETRY_BASE * 2 ** (row.attempts - 1)
+
+    # ── coalescing ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _group(rows: list[NotificationOutbox]) -> list[list[NotificationOutbox]]:
+        """One group per (channel, recipient), oldest notification first."""
+        groups: dict[tuple[str, str], list[NotificationOutbox]] = {}
+        for row in rows:
+            groups.setdefault((row.channel, row.recipient), []).append(row)
+        return list(groups.values())
+
+    @staticmethod
+    def _hold_recent(groups, now: datetime):
+        """
+        Put back groups whose recipient was notified within the coalescing
+        window, due when that window ends — everything else queued for them
+        meanwhile becomes due at the same moment and goes out as one digest.
+        """
+        window = timedelta(seconds=current_app.config.get("NOTIFICATION_COALESCE_SEC", 0))
+        if not window or not groups:
+            return groups
+
+        recent = {}
+        for channel in {g[0].channel for g in groups}:
+            recipients = [g[0].recipient for g in groups if g[0].channel == channel]
+            recent.update(
+                ((channel, recipient), last)
+                for recipient, last in db.session.query(
+                    NotificationOutbox.recipient, db.func.max(NotificationOutbox.sent_at))
+                .filter(NotificationOutbox.channel == channel,
+                        NotificationOutbox.recipient.in_(recipients),
+                        NotificationOutbox.status == "SENT",
+                        NotificationOutbox.sent_at > now - window)
+                .group_by(NotificationOutbox.recipient)
+            )
+
+        ready = []
+        for group in groups:
+            last = recent.get((group[0].channel, group[0].recipient))
+            if last is None:
+                ready.append(group)
+                continue
+            for row in group:
+                row.status = "PENDING"
+                row.claim_token = None
+                row.available_at = last + window
+        return ready
+
+    @staticmethod
+    def _email_digest(rows: list[NotificationOutbox]) -> tuple[str, str, str | None]:
+        """(subject, text, html) for a group; a digest when there is more than one."""
+        if len(rows) == 1:
+            return rows[0].subject, rows[0].body, rows[0].html
+        from ..utils.email_templates import urbix_email_html
+
+        headline = f"{len(rows)} updates on your rides"
+        text = "\n\n".join(f"• {r.body}" for r in rows)
+        html = urbix_email_html(
+            title=headline,
+            subtitle="Here is everything that happened since our last email.",
+            badge="DIGEST",
+            rows=[(r.created_at.strftime("%H:%M"), r.subject.removeprefix("UrbiX: "))
+                  for r in rows],
+            cta_text="Open My Rides",
+            cta_url="",
+            footer_note="UrbiX • Updates are bundled so we don’t flood your inbox",
+        )
+        return f"UrbiX: {headline}", text, html
+
+    @staticmethod
+    def _push_digest(rows: list[NotificationOutbox]) -> tuple[str, str, dict | None]:
+        """(title, body, data) for a group; a digest when there is more than one."""
+        if len(rows) == 1:
+            return rows[0].subject, rows[0].body, rows[0].get_payload()
+        body = "; ".join(r.subject for r in rows)
+        if len(body) > 180:
+            body = body[:177] + "…"
+        return f"{len(rows)} ride updates", body, {"screen": "my-rides"}
+
+    # ── delivery ─────────────────────────────────────────────────────────────
+
+    @classmethod
+    def _deliver(cls, group: list[NotificationOutbox]) -> None:
+        """Send one email for the group and settle every row with the outcome."""
+        for row in group:
+            row.attempts += 1
+        try:
+            if group[0].channel != "email":
+                raise ValueError(f"unknown channel {group[0].channel!r}")
+            cls._send_email(group[0].recipient, *cls._email_digest(group))
+        except Exception as exc:
+            for row in group:
+                cls._settle(row, exc)
+        else:
+            for row in group:
+                cls._settle(row)
+
+    @classmethod
+    def _deliver_pushes(cls, groups: list[list[NotificationOutbox]]) -> None:
+        """Send one push per group, all of them in as few FCM calls as possible."""
+        from .push_service import (
+            PUSH_DEAD_TOKEN, PUSH_SENT, prune_tokens, push_enabled, send_push_batch,
+        )
+
+        for row in (r for g in groups for r in g):
+            row.attempts += 1
+        if not push_enabled():
+            for row in (r for g in groups for r in g):
+                cls._settle(row, _Skip("Firebase not configured"))
+            return
+
+        results = send_push_batch(
+            [(g[0].recipient, *cls._push_digest(g)) for g in groups])
+        dead = []
+        for group, (outcome, error) in zip(groups, results):
+            for row in group:
+                if outcome == PUSH_SENT:
+                    cls._settle(row)
+                elif outcome == PUSH_DEAD_TOKEN:
+                    # Retrying can never succeed — fail now and forget the token
+                    row.status = "FAILED"
+                    row.last_error = (error or "unregistered token")[:500]
+                else:
+                    cls._settle(row, RuntimeError(error))
+            if outcome == PUSH_DEAD_TOKEN:
+                dead.append(group[0].recipient)
+        if dead:
+            pruned = prune_tokens(dead)
+            logger.info("[OUTBOX] cleared %s unregistered FCM token(s)", pruned)
+
+    @classmethod
+    def _send_email(cls, to_email: str, subject: str, text: str, html: str | None) -> None:
+        from ..utils.emailer import SMTPSession, build_email
+
+        msg = build_email(to_email, subject, text, html=html)
+        if msg is None:
+            logger.info("[OUTBOX] SMTP not configured, skipping email %r", subject)
+            raise _Skip("SMTP not configured")
+        smtp = getattr(cls._local, "smtp", None)
+        if smtp is None:
+            smtp = cls._local.smtp = SMTPSession()
+        try:
+            smtp.send(msg)
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+            raise
+
+    # ── background thread ────────────────────────────────────────────────────
+
+    @classmethod
+    def wake(cls) -> None:
+        cls._wakeup.set()
+
+    @classmethod
+    def start(cls, app, interval: float = 5.0) -> None:
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        cls._stop.clear()
+
+        def _loop():
+            while not cls._stop.is_set():
+                cls._wakeup.wait(interval)
+                cls._wakeup.clear()
+                with app.app_context():
+                    try:
+                        sent = cls.drain_all()
+                    except Exception as exc:
+                        logger.warning("[OUTBOX] drain failed: %s", exc)
+                        db.session.rollback()
+                        sent = 0
+                # Keep the SMTP connection across busy polls; drop it once idle
+                if not sent and getattr(cls._local, "smtp", None) is not None:
+                    cls._local.smtp.close()
+
+        cls._thread = threading.Thread(target=_loop, name="notification-outbox", daemon=True)
+        cls._thread.start()
+        logger.info("Notification outbox dispatcher started (poll every %ss)", interval)
+
+    @classmethod
+    def stop(cls, timeout: float | None = 5.0) -> None:
+        cls._stop.set()
+        cls._wakeup.set()
+        if cls._thread is not None:
+            cls._thread.join(timeout)
+        cls._thread = None
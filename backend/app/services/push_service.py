@@ -6,6 +6,10 @@ Sends push notifications to users when their carpool booking status changes.
 Set FIREBASE_CREDENTIALS_PATH in .env to enable.
 Without it, all calls silently no-op so the app works without Firebase configured.
 
+Pushes are queued on the notification outbox and delivered in batches
+(``send_push_batch``, up to 500 per FCM call); tokens FCM reports as
+unregistered are cleared from ``User.fcm_token`` so they are not retried.
+
 Setup:
   1. Create a Firebase project at https://console.firebase.google.com
   2. Project settings → Service accounts → Generate new private key
@@ -15,6 +19,8 @@ Setup:
 import logging
 import os
 
+from .notifications import queue_push
+
 logger = logging.getLogger(__name__)
 
 _fcm_app = None
@@ -45,6 +51,11 @@ def _get_fcm():
         return None
 
 
+def push_enabled() -> bool:
+    """True if Firebase is configured and initialised."""
+    return _get_fcm() is not None
+
+
 def send_push(fcm_token: str, title: str, body: str, data: dict | None = None) -> bool:
     """
     Send a push notification to a single device.
@@ -72,39 +83,114 @@ def send_push(fcm_token: str, title: str, body: str, data: dict | None = None) -
         return False
 
 
+# FCM accepts at most this many messages per send_each() call
+FCM_BATCH_LIMIT = 500
+
+PUSH_SENT = "sent"
+PUSH_DEAD_TOKEN = "dead_token"
+PUSH_ERROR = "error"
+
+
+def _is_dead_token(exc: Exception) -> bool:
+    from firebase_admin import exceptions, messaging
+    if isinstance(exc, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+        return True
+    return (isinstance(exc, exceptions.InvalidArgumentError)
+            and "registration token" in str(exc).lower())
+
+
+def send_push_batch(pushes: list[tuple[str, str, str, dict | None]]) -> list[tuple[str, str | None]]:
+    """
+    Send ``(fcm_token, title, body, data)`` pushes with FCM's batch API,
+    ``FCM_BATCH_LIMIT`` per HTTP call.  Returns one ``(outcome, error)`` per
+    push, in order: outcome is PUSH_SENT, PUSH_DEAD_TOKEN (the token is
+    unregistered/invalid — stop using it) or PUSH_ERROR (worth retrying).
+    """
+    from firebase_admin import messaging
+
+    results: list[tuple[str, str | None]] = []
+    for start in range(0, len(pushes), FCM_BATCH_LIMIT):
+        chunk = pushes[start:start + FCM_BATCH_LIMIT]
+        msgs = [
+            messaging.Message(
+                notification=messaging.Notification(title=title, body=body),
+                data={str(k): str(v) for k, v in (data or {}).items()},
+                token=token,
+            )
+            for token, title, body, data in chunk
+        ]
+        try:
+            batch = messaging.send_each(msgs)
+        except Exception as exc:
+            logger.warning("Push batch failed: %s", exc)
+            results.extend((PUSH_ERROR, str(exc)) for _ in chunk)
+            continue
+        for resp in batch.responses:
+            if resp.success:
+                results.append((PUSH_SENT, None))
+            elif _is_dead_token(resp.exception):
+                results.append((PUSH_DEAD_TOKEN, str(resp.exception)))
+            else:
+                results.append((PUSH_ERROR, str(resp.exception)))
+        logger.info("Push batch: %s sent, %s failed", batch.success_count, batch.failure_count)
+    return results
+
+
+def prune_tokens(tokens) -> int:
+    """Clear ``User.fcm_token`` wherever it holds one of ``tokens``. The caller commits."""
+    from ..models.user import User
+
+    tokens = list(set(tokens))
+    if not tokens:
+        return 0
+    return (User.query
+            .filter(User.fcm_token.in_(tokens))
+            .update({User.fcm_token: None}, synchronize_session=False))
+
+
 # ── Convenience wrappers used by ride_controller ──────────────────────────────
+# These queue the push on the notification outbox (services/notifications.py)
+# in the caller's session; it is sent after the caller commits.
 
-def notify_booking_approved(passenger_fcm: str, departure: str, destination: str):
-    send_push(
+def notify_booking_approved(passenger_fcm: str, departure: str, destination: str,
+                            *, user_id: int | None = None):
+    queue_push(
         passenger_fcm,
         title="🚗 Ride request approved!",
         body=f"Your request for {departure} → {destination} was accepted. Check My Rides.",
         data={"screen": "my-rides", "status": "ACCEPTED"},
+        user_id=user_id,
     )
 
 
-def notify_booking_rejected(passenger_fcm: str, departure: str, destination: str):
-    send_push(
+def notify_booking_rejected(passenger_fcm: str, departure: str, destination: str,
+                            *, user_id: int | None = None):
+    queue_push(
         passenger_fcm,
         title="Ride request rejected",
         body=f"Your request for {departure} → {destination} wasn't accepted.",
         data={"screen": "my-rides", "status": "REJECTED"},
+        user_id=user_id,
     )
 
 
-def notify_booking_cancelled(driver_fcm: str, departure: str, destination: str):
-    send_push(
+def notify_booking_cancelled(driver_fcm: str, departure: str, destination: str,
+                             *, user_id: int | None = None):
+    queue_push(
         driver_fcm,
         title="Passenger cancelled",
         body=f"A passenger cancelled their request for {departure} → {destination}.",
         data={"screen": "my-rides"},
+        user_id=user_id,
     )
 
 
-def notify_new_request(driver_fcm: str, departure: str, destination: str, passenger_name: str):
-    send_push(
+def notify_new_request(driver_fcm: str, departure: str, destination: str, passenger_name: str,
+                       *, user_id: int | None = None):
+    queue_push(
         driver_fcm,
         title=f"New ride request from {passenger_name}",
         body=f"{departure} → {destination} — review it in My Rides.",
         data={"screen": "my-rides", "status": "PENDING"},
+        user_id=user_id,
     )
@@ -0,0 +1,268 @@
+"""
+Ride Spatial Index — in-memory grid over open rides
+===================================================
+Radius matching used to load every open ride and run haversine on each one
+in Python.  This module keeps a process-wide grid index of the pickup
+(departure) and drop-off (destination) points of OPEN, future RidePosts so a
+radius query only looks at the handful of grid cells that overlap the
+search circle.
+
+The index is built lazily from the database on first use and kept current by
+``RideIndexObserver``, which listens on the EventBus for ride/booking events.
+Once the publishing transaction commits, the affected ride is marked stale
+and re-read before the next query (a rolled-back change never reaches the
+index).  Each process owns its own copy, so the index is also rebuilt from
+scratch every ``_REBUILD_AFTER_SEC`` to pick up changes made by other workers.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import NamedTuple
+
+from ..utils.geocoding import haversine_km
+from .event_bus import AnalyticsObserver, EventBus
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in degrees (~5.5 km of latitude, ~3.9 km of longitude in Montréal)
+_CELL_DEG = 0.05
+_KM_PER_DEG_LAT = 111.0
+_REBUILD_AFTER_SEC = 300
+
+
+class IndexedRide(NamedTuple):
+    id: int
+    creator_user_id: int
+    departure_datetime: datetime
+    dep_lat: float
+    dep_lng: float
+    dest_lat: float
+    dest_lng: float
+
+
+def _cell(lat: float, lng: float) -> tuple[int, int]:
+    return math.floor(lat / _CELL_DEG), math.floor(lng / _CELL_DEG)
+
+
+def _covering_cells(lat: float, lng: float, radius_km: float):
+    dlat = radius_km / _KM_PER_DEG_LAT
+    dlng = radius_km / (_KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    lat_lo, lng_lo = _cell(lat - dlat, lng - dlng)
+    lat_hi, lng_hi = _cell(lat + dlat, lng + dlng)
+    for i in range(lat_lo, lat_hi + 1):
+        for j in range(lng_lo, lng_hi + 1):
+            yield i, j
+
+
+class RideSpatialIndex:
+    """
+    Process-wide grid index (class-level state, like EventBus).
+
+    Usage::
+
+        RideSpatialIndex.nearby(45.50, -73.57, radius_km=2.0)            # pickups
+        RideSpatialIndex.nearby(45.50, -73.57, 2.0, end="dropoff")       # drop-offs
+        RideSpatialIndex.route_candidates(origin, dest, 3.0, 3.0)
+    """
+
+    _lock = threading.RLock()
+    _rides: dict[int, IndexedRide] = {}
+    _cells: dict[str, dict[tuple[int, int], set[int]]] = {
+        "pickup": defaultdict(set),
+        "dropoff": defaultdict(set),
+    }
+    _built_at: float | None = None
+    # Rides changed by committed transactions, re-read before the next query
+    _stale: set[int] = set()
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Reload every OPEN future ride with resolved coordinates from the DB."""
+        from ..models.ride_post import RidePost
+
+        rows = (
+            RidePost.query
+            .with_entities(
+                RidePost.id, RidePost.creator_user_id, RidePost.departure_datetime,
+                RidePost.departure_lat, RidePost.departure_lng,
+                RidePost.destination_lat, RidePost.destination_lng,
+            )
+            .filter(
+                RidePost.status == "OPEN",
+                RidePost.departure_datetime > datetime.utcnow(),
+                RidePost.departure_lat.isnot(None),
+                RidePost.destination_lat.isnot(None),
+            )
+            .all()
+        )
+        with cls._lock:
+            cls._rides = {}
+            cls._cells = {"pickup": defaultdict(set), "dropoff": defaultdict(set)}
+            cls._stale = set()
+            for row in rows:
+                cls._insert(IndexedRide(*row))
+            cls._built_at = time.monotonic()
+        logger.info("RideSpatialIndex: indexed %d open rides", len(rows))
+        return len(rows)
+
+    @classmethod
+    def ensure_fresh(cls) -> None:
+        built_at = cls._built_at
+        if built_at is None or time.monotonic() - built_at > _REBUILD_AFTER_SEC:
+            cls.rebuild()
+            return
+        with cls._lock:
+            stale, cls._stale = cls._stale, set()
+        for ride_id in stale:
+            cls.refresh(ride_id)
+
+    @classmethod
+    def mark_stale(cls, ride_id: int) -> None:
+        """Re-read ``ride_id`` before the next query (safe to call after commit: no SQL)."""
+        with cls._lock:
+            if cls._built_at is not None:
+                cls._stale.add(ride_id)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the index; it is rebuilt on the next query."""
+        with cls._lock:
+            cls._rides = {}
+            cls._cells = {"pickup": defaultdict(set), "dropoff": defaultdict(set)}
+            cls._stale = set()
+            cls._built_at = None
+
+    @classmethod
+    def refresh(cls, ride_id: int) -> None:
+        """Re-read one ride from the DB and add, move or drop it accordingly."""
+        if cls._built_at is None:
+            return  # not built yet — the first query will load current state
+        from ..models.ride_post import RidePost
+        ride = RidePost.query.get(ride_id)
+        with cls._lock:
+            cls.remove(ride_id)
+            if (
+                ride is not None
+                and ride.status == "OPEN"
+                and ride.departure_datetime > datetime.utcnow()
+                and ride.departure_coords
+                and ride.destination_coords
+            ):
+                cls._insert(IndexedRide(
+                    ride.id, ride.creator_user_id, ride.departure_datetime,
+                    ride.departure_lat, ride.departure_lng,
+                    ride.destination_lat, ride.destination_lng,
+                ))
+
+    @classmethod
+    def remove(cls, ride_id: int) -> None:
+        with cls._lock:
+            entry = cls._rides.pop(ride_id, None)
+            if entry is None:
+                return
+            cls._cells["pickup"][_cell(entry.dep_lat, entry.dep_lng)].discard(ride_id)
+            cls._cells["dropoff"][_cell(entry.dest_lat, entry.dest_lng)].discard(ride_id)
+
+    @classmethod
+    def _insert(cls, entry: IndexedRide) -> None:
+        cls._rides[entry.id] = entry
+        cls._cells["pickup"][_cell(entry.dep_lat, entry.dep_lng)].add(entry.id)
+        cls._cells["dropoff"][_cell(entry.dest_lat, entry.dest_lng)].add(entry.id)
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    @classmethod
+    def nearby(
+        cls,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        *,
+        end: str = "pickup",
+    ) -> list[tuple[IndexedRide, float]]:
+        """
+        Return ``(ride, distance_km)`` pairs whose pickup (or drop-off) point lies
+        within ``radius_km`` of (lat, lng), nearest first.
+        """
+        if end not in ("pickup", "dropoff"):
+            raise ValueError("end must be 'pickup' or 'dropoff'")
+        cls.ensure_fresh()
+        now = datetime.utcnow()
+
+        out = []
+        with cls._lock:
+            cells = cls._cells[end]
+            for key in _covering_cells(lat, lng, radius_km):
+                for ride_id in cells.get(key, ()):
+                    r = cls._rides[ride_id]
+                    if r.departure_datetime <= now:
+                        continue
+                    plat, plng = (r.dep_lat, r.dep_lng) if end == "pickup" else (r.dest_lat, r.dest_lng)
+                    dist = haversine_km(lat, lng, plat, plng)
+                    if dist <= radius_km:
+                        out.append((r, dist))
+        out.sort(key=lambda pair: pair[1])
+        return out
+
+    @classmethod
+    def route_candidates(
+        cls,
+        origin: tuple[float, float],
+        destination: tuple[float, float],
+        origin_radius_km: float,
+        dest_radius_km: float,
+    ) -> list[tuple[IndexedRide, float, float]]:
+        """
+        Rides whose pickup is near ``origin`` AND whose drop-off is near
+        ``destination``, as ``(ride, gap_to_pickup_km, gap_from_dropoff_km)``.
+        """
+        pickups = {r.id: (r, d) for r, d in cls.nearby(*origin, origin_radius_km, end="pickup")}
+        if not pickups:
+            return []
+        out = []
+        for r, d_drop in cls.nearby(*destination, dest_radius_km, end="dropoff"):
+            hit = pickups.get(r.id)
+            if hit is not None:
+                out.append((r, hit[1], d_drop))
+        return out
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls._rides)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Observer — keeps the index current from EventBus traffic
+# ──────────────────────────────────────────────────────────────────────────────
+
+class RideIndexObserver(AnalyticsObserver):
+    """Re-indexes the affected ride whenever a ride or its bookings change."""
+
+    REFRESH_EVENTS = {
+        "ride_created", "ride_updated",
+        "booking_approved", "booking_cancelled",
+    }
+    REMOVE_EVENTS = {"ride_deleted", "ride_completed"}
+
+    def on_event(
+        self,
+        event_type: str,
+        user_id: int | None = None,
+        metadata: dict | None = None,
+    ) -> None:
+        ride_id = (metadata or {}).get("ride_id")
+        if ride_id is None:
+            return
+        # Applied only once the change is committed (sync mode publishes before commit)
+        if event_type in self.REMOVE_EVENTS:
+            EventBus.on_commit(lambda: RideSpatialIndex.remove(ride_id))
+        elif event_type in self.REFRESH_EVENTS:
+            EventBus.on_commit(lambda: RideSpatialIndex.mark_stale(ride_id))
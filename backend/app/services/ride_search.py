@@ -0,0 +1,225 @@
+"""
+Ride Text Search — indexed departure/destination lookup
+=======================================================
+Replaces ``ilike('%term%')`` (which can never use an index) with a real
+text index over ``ride_posts.departure`` / ``ride_posts.destination``:
+
+  - SQLite:     an FTS5 external-content table (``ride_posts_fts``) using the
+                ``unicode61 remove_diacritics 2`` tokenizer, kept in sync by
+                INSERT/UPDATE/DELETE triggers on ``ride_posts``.
+  - PostgreSQL: trigram GIN expression indexes on an immutable
+                ``unaccent(lower(col))`` wrapper, so ``LIKE '%tok%'`` is indexed.
+
+Both fold accents and treat hyphens as word breaks, so "Côte-des-Neiges" and
+"cote des neiges" find the same rides.  Any other backend, or a database
+where the index has not been built yet, falls back to per-word ILIKE; the
+stored text is not folded there, so each word matches either as typed or
+unaccented ("Montréal" finds "Montréal" and "Montreal", "Montreal" only
+the latter).
+
+Build (or rebuild) the index with::
+
+    flask --app run.py rides build-search-index
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+import unicodedata
+
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "ride_posts_fts"
+
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        departure, destination,
+        content='ride_posts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON ride_posts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, departure, destination)
+        VALUES (new.id, new.departure, new.destination);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON ride_posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, departure, destination)
+        VALUES ('delete', old.id, old.departure, old.destination);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF departure, destination
+    ON ride_posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, departure, destination)
+        VALUES ('delete', old.id, old.departure, old.destination);
+        INSERT INTO {FTS_TABLE}(rowid, departure, destination)
+        VALUES (new.id, new.departure, new.destination);
+    END
+    """,
+]
+_SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() is only STABLE; an IMMUTABLE wrapper is required for index expressions
+    """
+    CREATE OR REPLACE FUNCTION urbix_unaccent(text) RETURNS text AS
+    $$ SELECT public.unaccent('public.unaccent', $1) $$
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_ride_posts_departure_trgm
+    ON ride_posts USING gin (urbix_unaccent(lower(departure)) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_ride_posts_destination_trgm
+    ON ride_posts USING gin (urbix_unaccent(lower(destination)) gin_trgm_ops)
+    """,
+]
+
+# engine url → (whether the index exists, when that was checked).  A missing
+# index is looked for again after _RECHECK_SEC, so building it from another
+# process (`flask rides build-search-index`) turns the index path back on.
+_available: dict[str, tuple[bool, float]] = {}
+_RECHECK_SEC = 60
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ──────────────────────────────────────────────────────────────────────────────
+
+def fold(value: str) -> str:
+    """Lower-case and strip accents: 'Côte-des-Neiges' → 'cote-des-neiges'."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokens(value: str) -> list[str]:
+    """Accent-folded words of a search term (hyphens/commas/spaces split words)."""
+    return [t for t in re.split(r"[\W_]+", fold(value)) if t]
+
+
+def _words(value: str) -> list[str]:
+    """Words of a search term as typed (accents kept)."""
+    return [w for w in re.split(r"[\W_]+", unicodedata.normalize("NFC", value)) if w]
+
+
+def _fts_column_expr(column: str, words: list[str]) -> str:
+    # Each word is quoted (FTS5 string literal) and prefix-matched
+    quoted = " AND ".join('"' + w.replace('"', '""') + '"*' for w in words)
+    return f"{column} : ({quoted})"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Index management
+# ──────────────────────────────────────────────────────────────────────────────
+
+def build_search_index(connection) -> str:
+    """Create the index for the connection's dialect (idempotent) and repopulate it."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for stmt in _SQLITE_DDL:
+            connection.execute(text(stmt))
+        connection.execute(text(_SQLITE_REBUILD))
+    elif dialect == "postgresql":
+        for stmt in _POSTGRES_DDL:
+            connection.execute(text(stmt))
+    else:
+        return f"no text index for dialect '{dialect}' (ILIKE fallback)"
+    _available.clear()
+    return f"{dialect} ride search index ready"
+
+
+def _index_available(session) -> bool:
+    engine = session.get_bind()
+    key = str(engine.url)
+    cached = _available.get(key)
+    if cached is None or (not cached[0] and time.monotonic() - cached[1] > _RECHECK_SEC):
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            found = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+                {"n": FTS_TABLE},
+            ).first()
+        elif dialect == "postgresql":
+            found = session.execute(
+                text("SELECT 1 FROM pg_proc WHERE proname = 'urbix_unaccent'")
+            ).first()
+        else:
+            found = None
+        _available[key] = (found is not None, time.monotonic())
+        if found is None and cached is None:
+            logger.warning("Ride search index missing on %s — using ILIKE fallback "
+                           "(run `flask rides build-search-index`)", dialect)
+    return _available[key][0]
+
+
+def exclude_from_migrations(obj, name, type_, reflected, compare_to) -> bool:
+    """
+    Alembic ``include_object`` hook: keep the FTS5 virtual/shadow tables out of
+    ``flask db migrate`` so autogenerate never tries to drop them.
+    """
+    return not (type_ == "table" and name and name.startswith(FTS_TABLE))
+
+
+def install_ddl_listener(table) -> None:
+    """Build the index right after ``db.create_all()`` creates ``ride_posts`` (idempotent)."""
+    if not event.contains(table, "after_create", _after_create):
+        event.listen(table, "after_create", _after_create)
+
+
+def _after_create(target, connection, **kw):
+    try:
+        build_search_index(connection)
+    except Exception as exc:  # e.g. SQLite compiled without FTS5
+        logger.warning("Could not build ride search index: %s", exc)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Query
+# ──────────────────────────────────────────────────────────────────────────────
+
+def filter_rides(query, *, departure: str = "", destination: str = ""):
+    """Restrict a RidePost query to rides whose departure/destination match the terms."""
+    from ..extensions import db
+    from ..models.ride_post import RidePost
+
+    raw = {"departure": departure, "destination": destination}
+    terms = {col: tokens(value) for col, value in raw.items()}
+    terms = {col: words for col, words in terms.items() if words}
+    if not terms:
+        return query
+
+    dialect = db.session.get_bind().dialect.name
+    if _index_available(db.session):
+        if dialect == "sqlite":
+            expr = " AND ".join(_fts_column_expr(col, words) for col, words in terms.items())
+            matches = (
+                text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :expr")
+                .bindparams(expr=expr)
+                .columns(rowid=db.Integer)
+            )
+            return query.filter(RidePost.id.in_(matches))
+        if dialect == "postgresql":
+            for col, words in terms.items():
+                folded = db.func.urbix_unaccent(db.func.lower(getattr(RidePost, col)))
+                for w in words:
+                    query = query.filter(folded.like(f"%{w}%"))
+            return query
+
+    # Fallback: the column is not folded, so try each word as typed and unaccented
+    for col in terms:
+        column = getattr(RidePost, col)
+        for w in _words(raw[col]):
+            variants = {w, fold(w)}
+            query = query.filter(db.or_(*(column.ilike(f"%{v}%") for v in sorted(variants))))
+    return query
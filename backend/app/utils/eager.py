@@ -0,0 +1,22 @@
+"""
+Eager-loading helpers for list endpoints.
+
+List endpoints serialize many rows at once; every relationship a ``to_dict``
+touches must be loaded up front (joinedload/selectinload) or the endpoint
+issues one extra query per row.  ``serializer_options`` bundles the eager
+loads with a guard: when ``ORM_RAISE_ON_LAZY_LOAD`` is on (development and
+testing), any relationship that would still lazy-load with SQL raises, so a
+missing eager load fails the request instead of silently costing N queries.
+"""
+
+from flask import current_app
+from sqlalchemy.orm import raiseload
+
+
+def serializer_options(*loads):
+    """Return ``loads`` plus, in debug configs, ``raiseload('*')`` for everything else."""
+    opts = list(loads)
+    if current_app.config.get("ORM_RAISE_ON_LAZY_LOAD"):
+        # sql_only: a many-to-one already in the identity map is still allowed
+        opts.append(raiseload("*", sql_only=True))
+    return opts
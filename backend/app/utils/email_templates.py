@@ -135,3 +135,17 @@ def urbix_email_html(
   </body>
 </html>
 """
+
+
+def ride_rows(ride, *, seats: int | None = None, status: str | None = None) -> list[tuple[str, str]]:
+    """Standard detail rows (route, departure, seats, status) for a ride email."""
+    rows = [
+        ("Route", f"{ride.departure} → {ride.destination}"),
+        ("Departure", ride.departure_datetime.isoformat()),
+        ("Seats available", str(ride.seats_available)),
+    ]
+    if seats is not None:
+        rows.append(("Seats requested", str(seats)))
+    if status is not None:
+        rows.append(("Status", status))
+    return rows
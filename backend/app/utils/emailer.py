@@ -1,19 +1,38 @@
+"""
+Outbound email: message building and a persistent SMTP connection.
+
+Emails are not sent from here directly.  Callers add them to the
+notification outbox (``services.notifications.queue_email``), whose
+dispatcher delivers them over one ``SMTPSession`` per thread and retries
+failures with backoff.
+
+Environment:
+    SMTP_HOST / SMTP_PORT / SMTP_USER / SMTP_PASS / SMTP_FROM
+"""
+
 import os
 import smtplib
 from email.message import EmailMessage
 
 
-def send_email(to_email: str, subject: str, body: str, *, html: str | None = None) -> None:
+def _smtp_settings() -> dict | None:
     host = os.getenv("SMTP_HOST")
-    port = int(os.getenv("SMTP_PORT", "587"))
     username = os.getenv("SMTP_USER")
     password = (os.getenv("SMTP_PASS") or "").replace(" ", "").replace("\t", "") or None
     from_email = os.getenv("SMTP_FROM", username)
-
     if not host or not username or not password or not from_email:
-        print("[EMAIL] SMTP not configured, skipping email:", subject)
-        return
+        return None
+    return {
+        "host": host,
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "username": username,
+        "password": password,
+        "from_email": from_email,
+    }
 
+
+def _build_message(from_email: str, to_email: str, subject: str, body: str,
+                   html: str | None) -> EmailMessage:
     msg = EmailMessage()
     msg["From"] = from_email
     msg["To"] = to_email
@@ -25,8 +44,52 @@ def send_email(to_email: str, subject: str, body: str, *, html: str | None = Non
     # Optional HTML version
     if html:
         msg.add_alternative(html, subtype="html")
+    return msg
+
+
+def _connect(settings: dict) -> smtplib.SMTP:
+    server = smtplib.SMTP(settings["host"], settings["port"], timeout=30)
+    server.starttls()
+    server.login(settings["username"], settings["password"])
+    return server
+
+
+class SMTPSession:
+    """
+    One persistent authenticated SMTP connection, opened on first use.
+    ``send`` reconnects once if the server dropped an idle connection.
+    """
+
+    def __init__(self):
+        self._server = None
+
+    def send(self, msg: EmailMessage) -> None:
+        for retry in (False, True):
+            if self._server is None:
+                settings = _smtp_settings()
+                if settings is None:
+                    raise smtplib.SMTPException("SMTP not configured")
+                self._server = _connect(settings)
+            try:
+                self._server.send_message(msg)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.close()
+                if retry:
+                    raise
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._server = None
+
 
-    with smtplib.SMTP(host, port) as server:
-        server.starttls()
-        server.login(username, password)
-        server.send_message(msg)
+def build_email(to_email: str, subject: str, body: str, *, html: str | None = None) -> EmailMessage | None:
+    """The message as it would be sent, or None if SMTP is not configured."""
+    settings = _smtp_settings()
+    if settings is None:
+        return None
+    return _build_message(settings["from_email"], to_email, subject, body, html)
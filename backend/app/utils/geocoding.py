@@ -73,6 +73,21 @@ def geocode(address: str, city_hint: str = "Montréal") -> Optional[tuple[float,
     return None
 
 
+def point_from_payload(data: dict, prefix: str) -> Optional[tuple[float, float]]:
+    """
+    Read ``<prefix>Lat``/``<prefix>Lng`` (or ``<prefix>_lat``/``<prefix>_lng``)
+    from a JSON body or query args. Returns None if missing or not numeric.
+    """
+    lat = data.get(f"{prefix}Lat", data.get(f"{prefix}_lat"))
+    lng = data.get(f"{prefix}Lng", data.get(f"{prefix}_lng"))
+    if lat is None or lng is None:
+        return None
+    try:
+        return float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+
+
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     R = 6371.0
     dlat = math.radians(lat2 - lat1)
@@ -0,0 +1,76 @@
+"""
+Geohash encoding.
+Turns a (lat, lon) pair into a short base-32 string where a shared prefix
+means the two points fall in the same cell. Used to tag rides with a
+coarse location that can be indexed and grouped without any maths in SQL.
+
+Approximate cell sizes:
+  precision 5 → ~4.9 km × 4.9 km
+  precision 6 → ~1.2 km × 0.6 km
+  precision 7 → ~153 m × 153 m
+"""
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+DEFAULT_PRECISION = 7
+
+
+def encode(lat: float, lon: float, precision: int = DEFAULT_PRECISION) -> str:
+    """Return the geohash of (lat, lon) with `precision` characters."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+
+    chars = []
+    bit, ch = 0, 0
+    even = True  # even bits encode longitude, odd bits latitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+
+    return "".join(chars)
+
+
+def decode_bbox(code: str) -> tuple[float, float, float, float]:
+    """Return the (lat_lo, lng_lo, lat_hi, lng_hi) cell covered by `code`."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for c in code:
+        ch = _BASE32.index(c)
+        for shift in range(4, -1, -1):
+            bit = (ch >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def decode(code: str) -> tuple[float, float]:
+    """Return the centre (lat, lng) of the cell `code`."""
+    lat_lo, lon_lo, lat_hi, lon_hi = decode_bbox(code)
+    return (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination.
+
+List endpoints accept ``?limit=&after=<cursor>`` and return the next page's
+cursor alongside the data (see ``responses.ok_page``).  A cursor is an opaque,
+URL-safe token wrapping the ``(sort_value, id)`` of the last row served, and
+the next page is fetched with ``WHERE (sort, id) > cursor`` — an index range
+scan, so page N costs the same as page 1.
+
+Endpoints that were unbounded before pagination pass ``default_limit=None``:
+without ``?limit=`` they still return every row (the frontend does not follow
+``next_cursor`` yet).
+"""
+
+import base64
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class CursorError(ValueError):
+    """Raised for a malformed ``after`` cursor or ``limit``."""
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = f"{sort_value.isoformat()},{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        sort_value, row_id = raw.rsplit(",", 1)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise CursorError("Invalid cursor") from exc
+
+
+def _page_args(default_limit: int | None) -> tuple[tuple[datetime, int] | None, int | None]:
+    if "limit" in request.args or default_limit is not None:
+        try:
+            limit = int(request.args.get("limit", default_limit))
+        except ValueError as exc:
+            raise CursorError("limit must be an integer") from exc
+        limit = max(1, min(limit, MAX_LIMIT))
+    else:
+        limit = None
+    after = request.args.get("after")
+    return (decode_cursor(after) if after else None), limit
+
+
+def keyset_page(query, sort_col, id_col, *, descending: bool = False,
+                default_limit: int | None = DEFAULT_LIMIT) -> tuple[list, str | None]:
+    """
+    Apply ``?after=`` / ``?limit=`` from the current request to ``query``,
+    ordered by ``(sort_col, id_col)``.  Returns ``(rows, next_cursor)``;
+    ``next_cursor`` is None on the last page.  With ``default_limit=None``
+    and no ``?limit=``, every remaining row is returned.
+
+    :raises CursorError: if the request's cursor or limit is invalid.
+    """
+    after, limit = _page_args(default_limit)
+
+    if after is not None:
+        value, row_id = after
+        if descending:
+            query = query.filter(or_(sort_col < value, and_(sort_col == value, id_col < row_id)))
+        else:
+            query = query.filter(or_(sort_col > value, and_(sort_col == value, id_col > row_id)))
+
+    order = (sort_col.desc(), id_col.desc()) if descending else (sort_col.asc(), id_col.asc())
+    if limit is None:
+        return query.order_by(*order).all(), None
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
@@ -10,3 +10,12 @@ def fail(message, status=400, code=None):
     if code:
         payload["error"]["code"] = code
     return jsonify(payload), status
+
+
+def ok_page(data, next_cursor, status=200):
+    """Like ok(), plus the cursor for the next page (None on the last page)."""
+    return jsonify({
+        "success": True,
+        "data": data,
+        "page": {"next_cursor": next_cursor, "has_more": next_cursor is not None},
+    }), status
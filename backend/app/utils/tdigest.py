@@ -0,0 +1,119 @@
+"""
+t-digest — a small, mergeable quantile sketch.
+
+Keeps at most about ``delta`` weighted centroids whatever the number of
+values added, with more resolution near the tails (p99 stays accurate).
+Two digests merge by pooling their centroids, so per-process deltas can be
+folded into a stored digest.  Merging variant, k1 scale function
+(Dunning & Ertl, "Computing extremely accurate quantiles using t-digests").
+"""
+
+from __future__ import annotations
+
+import math
+
+
+class TDigest:
+    def __init__(self, delta: int = 100):
+        self.delta = delta
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids: list[list[float]] = []  # [mean, weight], sorted by mean
+        self._buffer: list[list[float]] = []
+
+    def __len__(self) -> int:
+        return int(self.count)
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append([float(value), float(weight)])
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.delta:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """Fold ``other`` into this digest."""
+        if not other.count:
+            return
+        other._compress()
+        self._buffer.extend([m, w] for m, w in other._centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k_limit(self, q: float) -> float:
+        """Largest quantile the centroid starting at ``q`` may grow to (k1 scale)."""
+        k = self.delta / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        k = min(k, self.delta / 4)
+        return (math.sin(k * 2 * math.pi / self.delta) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        items = sorted(self._centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+        total = sum(w for _, w in items)
+
+        out = []
+        cur_mean, cur_w = items[0]
+        done = 0.0
+        limit = self._k_limit(0.0)
+        for mean, w in items[1:]:
+            if (done + cur_w + w) / total <= limit:
+                cur_w += w
+                cur_mean += (mean - cur_mean) * w / cur_w
+            else:
+                out.append([cur_mean, cur_w])
+                done += cur_w
+                limit = self._k_limit(done / total)
+                cur_mean, cur_w = mean, w
+        out.append([cur_mean, cur_w])
+        self._centroids = out
+
+    def quantile(self, q: float) -> float | None:
+        """Estimated value at quantile ``q`` (0..1); None when empty."""
+        self._compress()
+        cs = self._centroids
+        if not cs:
+            return None
+        if len(cs) == 1:
+            return cs[0][0]
+        target = q * self.count
+        # Interpolate between centroid centres; clamp the tails to min/max
+        cum = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, w in cs:
+            center = cum + w / 2
+            if target < center:
+                span = center - prev_center
+                frac = (target - prev_center) / span if span else 0.0
+                return prev_mean + frac * (mean - prev_mean)
+            prev_center, prev_mean = center, mean
+            cum += w
+        span = self.count - prev_center
+        frac = (target - prev_center) / span if span else 1.0
+        return prev_mean + frac * (self.max - prev_mean)
+
+    # ── persistence ─────────────────────────────────────────────────────────
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {
+            "delta": self.delta,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "centroids": self._centroids,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TDigest":
+        d = cls(data.get("delta", 100))
+        d._centroids = [list(c) for c in data.get("centroids", [])]
+        d.count = float(data.get("count", 0))
+        if d.count:
+            d.min, d.max = data["min"], data["max"]
+        return d
@@ -11,7 +11,7 @@ This will:
   - Create carpool ride posts between real Montréal locations
   - Create bookings between users
   - Create trip logs across all transport modes
-  - Create analytics events
+  - Create analytics events, then rebuild the analytics rollups from them
 
 All passwords are: Password123!
 """
@@ -25,8 +25,11 @@ sys.path.insert(0, os.path.dirname(__file__))
 from app import create_app
 from app.extensions import db, bcrypt
 from app.models import User, UserPreferences, RidePost, CarpoolBooking
+from app.models import AnalyticsRollup, BookingTransition, LatencySketch
 from app.models.analytics_event import AnalyticsEvent
 from app.models.trip import Trip
+from app.models.ride_post import reconcile_booking_counters
+from app.services import analytics_rollup, booking_lifecycle
 from datetime import datetime, timedelta
 import json
 
@@ -239,6 +242,9 @@ def seed():
         # Clear existing data
         db.session.query(Trip).delete()
         db.session.query(AnalyticsEvent).delete()
+        db.session.query(AnalyticsRollup).delete()
+        db.session.query(BookingTransition).delete()
+        db.session.query(LatencySketch).delete()
         db.session.query(CarpoolBooking).delete()
         db.session.query(RidePost).delete()
         db.session.query(UserPreferences).delete()
@@ -307,6 +313,7 @@ def seed():
                 chatty=r.get("chatty", True),
                 created_at=datetime.utcnow() - timedelta(hours=2),
             )
+            ride.resolve_coordinates()
             db.session.add(ride)
             rides.append(ride)
 
@@ -321,6 +328,7 @@ def seed():
             {"ride_idx": 2, "passenger_idx": 1, "status": "ACCEPTED", "seats": 1},  # Marc joins Kourosh
             {"ride_idx": 3, "passenger_idx": 3, "status": "PENDING",  "seats": 1},  # Kourosh pending on Sophie
         ]
+        bookings = []
         for b in bookings_data:
             booking = CarpoolBooking(
                 ride_post=rides[b["ride_idx"]],
@@ -330,6 +338,7 @@ def seed():
                 created_at=datetime.utcnow() - timedelta(hours=1),
             )
             db.session.add(booking)
+            bookings.append(booking)
             # Decrement seats for accepted bookings so the ride reflects reality
             if b["status"] == "ACCEPTED":
                 ride = rides[b["ride_idx"]]
@@ -337,10 +346,12 @@ def seed():
                 if ride.seats_available == 0:
                     ride.status = "FULL"
 
+        reconcile_booking_counters()
         db.session.commit()
         print(f"  ✓ Created {len(bookings_data)} bookings")
 
         # Create trip logs
+        trips = []
         for t in TRIPS:
             trip = Trip(
                 user_id=users[t["user_idx"]].id,
@@ -350,6 +361,7 @@ def seed():
                 created_at=datetime.utcnow() - timedelta(days=len(TRIPS) - TRIPS.index(t)),
             )
             db.session.add(trip)
+            trips.append(trip)
 
         db.session.commit()
         print(f"  ✓ Created {len(TRIPS)} trip logs")
@@ -364,12 +376,12 @@ def seed():
             ("ride_created",      users[0].id, {"ride_id": rides[0].id}),
             ("ride_created",      users[1].id, {"ride_id": rides[1].id}),
             ("ride_created",      users[3].id, {"ride_id": rides[2].id}),
-            ("booking_created",   users[3].id, {"ride_id": rides[0].id}),
-            ("booking_approved",  users[0].id, {"ride_id": rides[0].id}),
-            ("booking_created",   users[2].id, {"ride_id": rides[1].id}),
-            ("booking_approved",  users[1].id, {"ride_id": rides[1].id}),
-            ("trip_logged",       users[0].id, {"mode": "bike", "distance_km": 4.2}),
-            ("trip_logged",       users[3].id, {"mode": "transit", "distance_km": 9.2}),
+            ("booking_created",   users[3].id, {"ride_id": rides[0].id, "booking_id": bookings[0].id}),
+            ("booking_approved",  users[0].id, {"ride_id": rides[0].id, "booking_id": bookings[0].id}),
+            ("booking_created",   users[2].id, {"ride_id": rides[1].id, "booking_id": bookings[2].id}),
+            ("booking_approved",  users[1].id, {"ride_id": rides[1].id, "booking_id": bookings[2].id}),
+            ("trip_logged",       users[0].id, {"trip_id": trips[0].id, "mode": "bike", "distance_km": 4.2}),
+            ("trip_logged",       users[3].id, {"trip_id": trips[11].id, "mode": "transit", "distance_km": 9.2}),
         ]
         for i, (evt_type, uid, meta) in enumerate(events):
             evt = AnalyticsEvent(
@@ -383,6 +395,11 @@ def seed():
         db.session.commit()
         print(f"  ✓ Created {len(events)} analytics events")
 
+        # Dashboards read booking_transitions and analytics_rollups, not the raw tables
+        booking_lifecycle.backfill()
+        written = analytics_rollup.rebuild()
+        print(f"  ✓ Rebuilt analytics rollups ({written} buckets)")
+
         print("\n✅ Seed complete!")
         print("\n📋 Test accounts (all passwords: Password123!):")
         for u in USERS:
@@ -0,0 +1,62 @@
+import os
+
+os.environ.setdefault("FLASK_ENV", "testing")
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db as _db
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    with app.app_context():
+        _db.drop_all()
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture()
+def db(app):
+    return _db
+
+
+@pytest.fixture()
+def make_user(db):
+    from app.models import User
+
+    counter = iter(range(1, 10_000))
+
+    def make(**kw):
+        n = next(counter)
+        user = User(full_name=kw.pop("full_name", f"User {n}"),
+                    email=kw.pop("email", f"user{n}@example.com"),
+                    password_hash="x", **kw)
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    return make
+
+
+@pytest.fixture()
+def make_ride(db, make_user):
+    from app.models import RidePost
+
+    def make(creator=None, **kw):
+        ride = RidePost(creator_user_id=(creator or make_user()).id,
+                        departure=kw.pop("departure", "Berri-UQAM"),
+                        destination=kw.pop("destination", "Jean-Talon"),
+                        departure_datetime=kw.pop("departure_datetime",
+                                                  datetime.utcnow() + timedelta(days=1)),
+                        **kw)
+        db.session.add(ride)
+        db.session.flush()
+        return ride
+
+    return make
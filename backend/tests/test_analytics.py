@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+from app.models import AnalyticsEvent, AnalyticsRollup, CarpoolBooking
+from app.models.booking_transition import BookingTransition
+from app.models.trip import Trip
+from app.services import analytics_rollup as rollups
+from app.services import booking_lifecycle, event_archive
+from app.services.event_bus import EventBus
+from app.services.latency_stats import LatencyStats
+
+
+def _rollup_rows(db):
+    return {
+        (r.granularity, r.metric, r.bucket_start, r.dimension): r.value
+        for r in db.session.query(AnalyticsRollup).all()
+        if r.value
+    }
+
+
+def test_rollups_are_written_after_commit(db, make_user):
+    user = make_user()
+    EventBus.publish("user_registered", user_id=user.id)
+    assert rollups.total("users_registered") == 0
+
+    db.session.commit()
+    assert rollups.total("users_registered") == 1
+    assert rollups.totals("events") == {"user_registered": 1}
+
+
+def test_rolled_back_events_are_not_counted(db, make_user):
+    user = make_user()
+    EventBus.publish("user_registered", user_id=user.id)
+    db.session.rollback()
+
+    db.session.commit()
+    assert _rollup_rows(db) == {}
+
+
+def test_event_deltas_cancel_out_for_deleted_trip():
+    meta = {"trip_id": 1, "mode": "bike", "origin_geohash": "f25dvk",
+            "destination_geohash": "f25dyq"}
+    net = {}
+    for event_type in ("trip_logged", "trip_deleted"):
+        for metric, dimension, delta in rollups.event_deltas(event_type, meta):
+            if metric != "events":
+                net[(metric, dimension)] = net.get((metric, dimension), 0) + delta
+    assert net and set(net.values()) == {0}
+
+
+def test_rebuild_matches_live_rollups(db, make_user, make_ride):
+    driver, passenger = make_user(), make_user()
+    for user in (driver, passenger):
+        EventBus.publish("user_registered", user_id=user.id)
+    db.session.commit()
+
+    ride = make_ride(creator=driver)
+    EventBus.publish("ride_created", user_id=driver.id, metadata={
+        "ride_id": ride.id, "departure_geohash": "f25dvk", "destination_geohash": "f25dyq"})
+    db.session.commit()
+
+    booking = CarpoolBooking(ride_post_id=ride.id, passenger_user_id=passenger.id)
+    db.session.add(booking)
+    db.session.flush()
+    EventBus.publish("booking_created", user_id=passenger.id,
+                     metadata={"booking_id": booking.id, "ride_id": ride.id})
+    db.session.commit()
+
+    booking.set_status("ACCEPTED")
+    EventBus.publish("booking_approved", user_id=driver.id,
+                     metadata={"booking_id": booking.id, "ride_id": ride.id})
+    db.session.commit()
+
+    live = _rollup_rows(db)
+    assert rollups.totals("bookings_status") == {"PENDING": 0, "ACCEPTED": 1}
+
+    rollups.rebuild()
+    assert _rollup_rows(db) == live
+
+
+def test_rebuild_counts_history_from_before_the_event_log(db, make_user, make_ride):
+    make_user()
+    ride = make_ride()
+    db.session.add(CarpoolBooking(ride_post_id=ride.id, passenger_user_id=make_user().id,
+                                  status="ACCEPTED"))
+    db.session.commit()
+
+    rollups.rebuild()
+
+    assert rollups.total("users_registered") == 3
+    assert rollups.total("rides_created") == 1
+    assert rollups.totals("bookings_status") == {"ACCEPTED": 1}
+    assert rollups.total("events") == 0
+
+
+def test_rebuild_skips_deletion_of_a_trip_logged_before_the_event_log(db, make_user):
+    trip = Trip(user_id=make_user().id, mode="bike", distance_km=3.0, origin_geohash="f25dvk")
+    db.session.add(trip)
+    db.session.commit()
+    EventBus.publish("trip_deleted", metadata={"trip_id": trip.id, "mode": "bike",
+                                               "origin_geohash": "f25dvk"})
+    db.session.delete(trip)
+    db.session.commit()
+
+    rollups.rebuild()
+
+    assert rollups.totals("trips") == {}
+    assert rollups.totals("trip_origins") == {}
+    assert rollups.totals("events") == {"trip_deleted": 1}
+
+
+def test_compact_archives_old_months_and_can_rerun(app, db, make_user, tmp_path):
+    app.config["ANALYTICS_ARCHIVE_DIR"] = str(tmp_path)
+    for when in (datetime(2026, 1, 15), datetime(2026, 1, 31, 23), datetime(2026, 3, 2)):
+        EventBus.publish("user_registered", user_id=make_user().id)
+        db.session.commit()
+        AnalyticsEvent.query.order_by(AnalyticsEvent.id.desc()).first().created_at = when
+    db.session.commit()
+    rollups.rebuild()
+    live = _rollup_rows(db)
+
+    now = datetime(2026, 3, 20)
+    assert event_archive.compact(now, months=1) == {"months": ["2026-01", "2026-02"], "archived": 2}
+    assert [e.created_at.month for e in AnalyticsEvent.query] == [3]
+    assert (tmp_path / "analytics_events-2026-01.ndjson.gz").exists()
+    assert event_archive.archived_months() == [datetime(2026, 1, 1)]
+    assert [e["created_at"] for e in event_archive.iter_archived_events()] == \
+        [datetime(2026, 1, 15), datetime(2026, 1, 31, 23)]
+
+    assert event_archive.compact(now, months=1) == {"months": [], "archived": 0}
+    rollups.rebuild()
+    assert _rollup_rows(db) == live
+
+
+def test_expired_pending_request_counts_as_rejected(db, make_user, make_ride):
+    passenger = make_user()
+    ride = make_ride()
+    created = datetime.utcnow() - timedelta(days=2)
+    db.session.add(CarpoolBooking(ride_post_id=ride.id, passenger_user_id=passenger.id,
+                                  created_at=created, status_updated_at=created,
+                                  expires_at=created + timedelta(hours=24)))
+    db.session.commit()
+    rollups.rebuild()
+
+    assert rollups.booking_status_totals() == {"PENDING": 0, "REJECTED": 1}
+    summary = rollups._compute_summary()
+    assert summary["bookings"]["pending"] == 0
+    assert summary["bookings"]["rejected"] == 1
+    assert summary["rides"]["total"] == summary["rides"]["open"] + summary["rides"]["full"]
+
+
+def test_funnel_splits_outcomes(db, make_user, make_ride):
+    driver = make_user()
+    ride = make_ride(creator=driver, seats_available=3)
+    since = datetime.utcnow() - timedelta(hours=1)
+
+    outcomes = [("ACCEPTED", driver.id), ("REJECTED", driver.id), ("REJECTED", None), None]
+    for outcome in outcomes:
+        booking = CarpoolBooking(ride_post_id=ride.id, passenger_user_id=make_user().id)
+        db.session.add(booking)
+        db.session.flush()
+        BookingTransition.record(booking, None, "PENDING", booking.created_at)
+        if outcome:
+            booking.set_status(outcome[0], actor_user_id=outcome[1])
+    db.session.commit()
+
+    funnel = booking_lifecycle.funnel(since, datetime.utcnow() + timedelta(minutes=1))
+    assert funnel["requested"] == 4
+    assert (funnel["accepted"], funnel["rejected"], funnel["expired"]) == (1, 1, 1)
+    assert funnel["still_pending"] == 1
+    assert funnel["acceptance_rate"] == 25.0
+
+
+def test_latency_recorded_only_once_committed(db):
+    LatencyStats._pending.clear()
+    meta = {"booking_id": 1, "ride_id": 1, "waited_sec": 30}
+
+    EventBus.publish("booking_approved", user_id=7, metadata=meta)
+    db.session.rollback()
+    assert LatencyStats._pending == {}
+
+    EventBus.publish("booking_approved", user_id=7, metadata=meta)
+    db.session.commit()
+    assert LatencyStats.flush_committed() == 3
+    assert LatencyStats.summary("driver_response", "driver:7")["count"] == 1
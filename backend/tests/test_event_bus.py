@@ -0,0 +1,79 @@
+import pytest
+
+from app.models import AnalyticsEvent
+from app.services.event_bus import AnalyticsObserver, EventBus
+
+
+class Recorder(AnalyticsObserver):
+    def __init__(self):
+        self.events, self.batches = [], []
+
+    def on_event(self, event_type, user_id=None, metadata=None):
+        self.events.append(event_type)
+
+    def on_batch(self, events):
+        self.batches.append([e.event_type for e in events])
+
+
+@pytest.fixture()
+def recorder():
+    rec = Recorder()
+    EventBus.subscribe(rec)
+    return rec
+
+
+@pytest.fixture()
+def async_bus(app):
+    EventBus.start_async(app, batch_size=3, flush_ms=1000)
+    yield
+    EventBus.stop_async()
+
+
+def test_sync_publish_notifies_inline(db, recorder):
+    EventBus.publish("ride_created", user_id=1)
+    assert recorder.events == ["ride_created"]
+    db.session.commit()
+    assert AnalyticsEvent.query.count() == 1
+
+
+def test_async_writer_delivers_in_batches(db, recorder, async_bus):
+    before = EventBus.stats()["delivered"]
+    for i in range(7):
+        EventBus.publish(f"e{i}")
+    EventBus.stop_async()
+
+    assert recorder.events == []
+    assert recorder.batches == [["e0", "e1", "e2"], ["e3", "e4", "e5"], ["e6"]]
+    assert EventBus.stats()["delivered"] - before == 7
+    assert AnalyticsEvent.query.count() == 7  # bulk-inserted by DBAnalyticsObserver
+
+
+def test_async_events_wait_for_the_publishing_commit(db, make_user, recorder, async_bus):
+    make_user()  # the session now holds uncommitted writes
+    EventBus.publish("rolled_back")
+    db.session.rollback()
+
+    make_user()
+    EventBus.publish("committed")
+    held = db.session.info["pending_events"]  # held in the session, not queued
+    assert [e.event_type for e in held] == ["committed"]
+    db.session.commit()
+    EventBus.stop_async()
+
+    assert recorder.batches == [["committed"]]
+
+
+def test_on_commit_runs_after_commit_and_is_dropped_on_rollback(db, make_user):
+    calls = []
+    make_user()
+    EventBus.on_commit(lambda: calls.append("rolled back"))
+    db.session.rollback()
+
+    make_user()
+    EventBus.on_commit(lambda: calls.append("committed"))
+    assert calls == []
+    db.session.commit()
+    assert calls == ["committed"]
+
+    EventBus.on_commit(lambda: calls.append("no transaction"))  # runs at once
+    assert calls == ["committed", "no transaction"]
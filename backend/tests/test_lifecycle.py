@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app.models import CarpoolBooking, RidePost
+from app.models.notification import NotificationOutbox
+from app.services.lifecycle_sweeper import complete_past_rides, expire_pending_requests
+
+
+def _request(db, ride, passenger, created_at):
+    ride.count_request()
+    ride.count_booking("PENDING", 1)
+    booking = CarpoolBooking(ride_post_id=ride.id, passenger_user_id=passenger.id,
+                             created_at=created_at, status_updated_at=created_at)
+    db.session.add(booking)
+    return booking
+
+
+def test_expire_pending_requests_in_batches(db, make_user, make_ride):
+    ride = make_ride(seats_available=6)
+    now = datetime.utcnow()
+    stale = [_request(db, ride, make_user(), now - timedelta(hours=30 + i)) for i in range(5)]
+    fresh = _request(db, ride, make_user(), now - timedelta(hours=1))
+    db.session.commit()
+
+    assert expire_pending_requests(now, batch_size=2) == 5
+
+    db.session.expire_all()
+    assert {b.status for b in stale} == {"REJECTED"}
+    assert fresh.status == "PENDING"
+    assert ride.pending_count == 1
+    assert expire_pending_requests(now, batch_size=2) == 0
+
+
+def test_complete_past_rides_in_batches(db, make_ride):
+    now = datetime.utcnow()
+    past = [make_ride(departure_datetime=now - timedelta(hours=3 + i)) for i in range(3)]
+    past[0].status = "FULL"
+    upcoming = make_ride(departure_datetime=now + timedelta(hours=1))
+    db.session.commit()
+
+    assert complete_past_rides(now, batch_size=2) == 3
+
+    db.session.expire_all()
+    assert {r.status for r in past} == {"COMPLETED"}
+    assert db.session.get(RidePost, upcoming.id).status == "OPEN"
+
+
+def test_effective_status_in_python_and_sql(db, make_user, make_ride):
+    ride = make_ride(seats_available=3)
+    now = datetime.utcnow()
+    expired = _request(db, ride, make_user(), now - timedelta(hours=25))
+    live = _request(db, ride, make_user(), now - timedelta(hours=1))
+    accepted = _request(db, ride, make_user(), now - timedelta(hours=30))
+    accepted.status = "ACCEPTED"
+    db.session.commit()
+
+    assert expired.expires_at == expired.created_at + timedelta(hours=24)
+    assert (expired.effective_status, live.effective_status, accepted.effective_status) == \
+        ("REJECTED", "PENDING", "ACCEPTED")
+    assert expired.status == "PENDING"  # nothing written on read
+
+    rows = dict(db.session.query(CarpoolBooking.id, CarpoolBooking.effective_status).all())
+    assert rows == {expired.id: "REJECTED", live.id: "PENDING", accepted.id: "ACCEPTED"}
+    rejected = CarpoolBooking.query.filter(CarpoolBooking.effective_status == "REJECTED")
+    assert [b.id for b in rejected] == [expired.id]
+
+
+def test_materialize_expiry_writes_at_expiry_time(db, make_user, make_ride):
+    ride = make_ride()
+    now = datetime.utcnow()
+    expired = _request(db, ride, make_user(), now - timedelta(hours=25))
+    live = _request(db, ride, make_user(), now - timedelta(hours=1))
+    db.session.commit()
+
+    assert expired.materialize_expiry(now) is True
+    assert live.materialize_expiry(now) is False
+    db.session.commit()
+
+    assert expired.status == "REJECTED"
+    assert expired.status_updated_at == expired.expires_at
+    assert ride.pending_count == 1
+    assert expired.materialize_expiry(now) is False
+
+
+def test_only_the_driver_materializes_an_expired_request(app, db, make_user, make_ride):
+    driver, stranger = make_user(), make_user()
+    ride = make_ride(creator=driver)
+    expired = _request(db, ride, make_user(), datetime.utcnow() - timedelta(hours=25))
+    db.session.commit()
+
+    def approve(user):
+        token = create_access_token(identity=str(user.id))
+        return app.test_client().post(f"/api/rides/requests/{expired.id}/approve",
+                                      headers={"Authorization": f"Bearer {token}"})
+
+    assert approve(stranger).status_code == 403
+    db.session.expire_all()
+    assert expired.status == "PENDING"  # nothing written, no email queued
+    assert NotificationOutbox.query.count() == 0
+
+    assert approve(driver).status_code == 400
+    db.session.expire_all()
+    assert expired.status == "REJECTED"
+    assert NotificationOutbox.query.count() == 1
@@ -0,0 +1,114 @@
+import json
+from collections import deque
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.services import live_stream
+from app.services.event_bus import EventBus
+from app.services.live_stream import LiveFeed, stream
+
+
+@pytest.fixture()
+def feed(monkeypatch):
+    """An empty feed holding the last 3 messages."""
+    monkeypatch.setattr(LiveFeed, "_buffer", deque(maxlen=3))
+    monkeypatch.setattr(LiveFeed, "_seq", 0)
+    monkeypatch.setattr(live_stream, "KEEPALIVE_SEC", 0.01)
+    return LiveFeed
+
+
+def _data(line):
+    return json.loads(line.split("data: ", 1)[1])
+
+
+def test_read_after_flags_a_gap(feed):
+    for i in range(5):
+        feed.publish({"n": i})
+
+    items, gap = feed.read_after(0, timeout=0)
+    assert [seq for seq, _ in items] == [3, 4, 5] and gap
+    items, gap = feed.read_after(2, timeout=0)
+    assert [seq for seq, _ in items] == [3, 4, 5] and not gap
+    assert feed.read_after(5, timeout=0) == ([], False)
+
+
+def test_stream_resets_a_client_that_fell_behind(feed):
+    for i in range(5):
+        feed.publish({"n": i})
+
+    lines = stream(last_event_id="1")
+    assert next(lines).startswith("retry:")
+    assert next(lines).startswith("event: reset")
+    sent = [next(lines) for _ in range(3)]
+    assert [line.split("\n")[0] for line in sent] == ["id: 3", "id: 4", "id: 5"]
+    assert _data(sent[0]) == {"n": 2}
+    assert next(lines) == ": keepalive\n\n"
+    lines.close()
+
+
+def test_stream_resumes_without_reset(feed):
+    for i in range(3):
+        feed.publish({"n": i})
+
+    lines = stream(last_event_id="2")
+    next(lines)
+    assert next(lines).startswith("id: 3\nevent: analytics")
+    lines.close()
+
+
+def test_events_reach_the_feed_on_commit(db, make_user, feed):
+    make_user()
+    EventBus.publish("rolled_back")
+    db.session.rollback()
+
+    make_user()
+    EventBus.publish("user_registered", user_id=1)
+    assert feed.current_seq() == 0
+    db.session.commit()
+
+    items, _ = feed.read_after(0, timeout=0)
+    message = json.loads(items[0][1])
+    assert [seq for seq, _ in items] == [1]
+    assert message["event"]["type"] == "user_registered"
+    assert {"metric": "users_registered", "dimension": "", "delta": 1} in message["deltas"]
+
+
+def _bearer(role="admin"):
+    token = create_access_token(identity="1", additional_claims={"role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_stream_token_cookie_opens_the_stream_only(app, feed):
+    client = app.test_client()
+    assert client.post("/api/analytics/stream-token", headers=_bearer("user")).status_code == 403
+    assert client.get("/api/analytics/stream").status_code == 401
+
+    assert client.post("/api/analytics/stream-token", headers=_bearer()).status_code == 200
+    cookie = client.get_cookie("access_token_cookie", path="/api/analytics/stream")
+    assert cookie is not None and cookie.http_only
+
+    res = client.get("/api/analytics/stream", buffered=False)
+    assert res.status_code == 200 and res.mimetype == "text/event-stream"
+    assert LiveFeed.stats()["listeners"] == 1
+    res.close()
+    assert LiveFeed.stats()["listeners"] == 0
+
+    # Useless anywhere else, even as a bearer token
+    stolen = {"Authorization": f"Bearer {cookie.value}"}
+    assert client.get("/api/analytics/summary", headers=stolen).status_code == 400
+
+
+def test_stream_listeners_are_capped(app, feed):
+    app.config["ANALYTICS_STREAM_MAX_LISTENERS"] = 1
+    client = app.test_client()
+
+    first = client.get("/api/analytics/stream", headers=_bearer(), buffered=False)
+    assert first.status_code == 200
+    assert client.get("/api/analytics/stream", headers=_bearer()).status_code == 503
+    first.close()
+
+    again = client.get("/api/analytics/stream", headers=_bearer(), buffered=False)
+    assert again.status_code == 200
+    again.close()
+    assert LiveFeed.stats()["listeners"] == 0
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.matching_service import MatchingService, _columns, score_columns
+
+BERRI = (45.5152, -73.5611)
+JEAN_TALON = (45.5390, -73.6140)
+LONGUEUIL = (45.5250, -73.5210)
+
+
+@pytest.fixture()
+def departure():
+    return (datetime.utcnow() + timedelta(days=1)).replace(microsecond=0)
+
+
+def _ride(make_ride, start, end, when, **kw):
+    return make_ride(departure_lat=start[0], departure_lng=start[1],
+                     destination_lat=end[0], destination_lng=end[1],
+                     departure_datetime=when, **kw)
+
+
+def _cols(rows):
+    # id, creator, departure, seats, dep lat/lng, dest lat/lng, 4 prefs, rating
+    return _columns([(i + 1, 1, *row) for i, row in enumerate(rows)])
+
+
+def test_score_prefers_closer_pickup(departure):
+    cols = _cols([
+        (departure, 1, *BERRI, *JEAN_TALON, False, False, True, True, 4.0),
+        (departure, 1, *LONGUEUIL, *JEAN_TALON, False, False, True, True, 4.0),
+    ])
+    scored = score_columns(cols, origin=BERRI, destination=JEAN_TALON, departure=departure)
+
+    assert scored["gap_to_pickup_km"][0] == pytest.approx(0, abs=1e-6)
+    assert scored["score"][0] > scored["score"][1]
+    assert scored["time_score"][0] == pytest.approx(1.0)
+
+
+def test_missing_inputs_renormalise_weights(departure):
+    cols = _cols([(departure, 1, *BERRI, *JEAN_TALON, False, False, True, True, None)])
+    scored = score_columns(cols)
+
+    # Only the rating part is left; unrated drivers count as NEUTRAL_RATING
+    assert set(k for k in scored if k.endswith("_score")) == {"rating_score"}
+    assert scored["score"][0] == pytest.approx(3.5 / 5 * 100)
+
+
+def test_preference_conflicts(departure):
+    cols = _cols([
+        (departure, 1, *BERRI, *JEAN_TALON, True, False, True, True, 5.0),
+        (departure, 1, *BERRI, *JEAN_TALON, False, True, True, True, 5.0),
+    ])
+    scored = score_columns(cols, preferences={"allow_smoking": False, "allow_pets": True,
+                                              "music_ok": True, "chatty": True})
+    assert np.array_equal(scored["preference_conflicts"], [2, 0])
+
+
+def test_rank_orders_filters_and_matches_score_ride(db, make_user, make_ride, departure):
+    me = make_user()
+    near = _ride(make_ride, BERRI, JEAN_TALON, departure)
+    far = _ride(make_ride, LONGUEUIL, JEAN_TALON, departure + timedelta(hours=2))
+    _ride(make_ride, BERRI, JEAN_TALON, departure, creator=me)  # own ride
+    db.session.commit()
+
+    kw = dict(origin=BERRI, destination=JEAN_TALON, departure=departure)
+    matches = MatchingService.rank(exclude_user_id=me.id, **kw)
+    assert [m["ride_id"] for m in matches] == [near.id, far.id]
+    assert matches[0]["score"] == MatchingService.score_ride(near, **kw)
+
+    nearby = MatchingService.rank(exclude_user_id=me.id, max_pickup_km=1.0, **kw)
+    assert [m["ride_id"] for m in nearby] == [near.id]
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.notification import NotificationOutbox
+from app.services import notifications, push_service
+from app.services.notifications import OutboxDispatcher, queue_email, queue_push
+
+
+@pytest.fixture()
+def sent(monkeypatch):
+    """(recipient, subject) of each email sent, in order."""
+    out = []
+    monkeypatch.setattr(OutboxDispatcher, "_send_email",
+                        classmethod(lambda cls, to, subject, text, html: out.append((to, subject))))
+    return out
+
+
+def _statuses():
+    return [r.status for r in NotificationOutbox.query.order_by(NotificationOutbox.id)]
+
+
+def test_queued_email_commits_and_rolls_back_with_the_caller(db):
+    queue_email("a@example.com", "Hi", "text")
+    db.session.rollback()
+    assert NotificationOutbox.query.count() == 0
+
+    queue_email("a@example.com", "Hi", "text")
+    queue_email(None, "Hi", "text")  # no address: nothing queued
+    db.session.commit()
+    assert _statuses() == ["PENDING"]
+
+
+def test_drain_delivers_each_row_once(app, db, sent):
+    for i in range(3):
+        queue_email(f"u{i}@example.com", "Hi", "text")
+    db.session.commit()
+
+    assert OutboxDispatcher.drain_all(batch_size=2) == 3
+    assert OutboxDispatcher.drain() == 0
+    assert [to for to, _ in sent] == ["u0@example.com", "u1@example.com", "u2@example.com"]
+    assert _statuses() == ["SENT"] * 3
+
+
+def test_concurrent_drain_skips_claimed_rows(app, db, monkeypatch):
+    for i in range(2):
+        queue_email(f"u{i}@example.com", "Hi", "text")
+    db.session.commit()
+
+    sent, other = [], []
+
+    def send(cls, to, subject, text, html):
+        if not other:
+            # A second worker drains while this one holds its claim
+            with app.app_context():
+                other.append(OutboxDispatcher.drain())
+        sent.append(to)
+
+    monkeypatch.setattr(OutboxDispatcher, "_send_email", classmethod(send))
+
+    assert OutboxDispatcher.drain() == 2
+    assert other == [0]
+    assert sent == ["u0@example.com", "u1@example.com"]
+
+
+def test_failed_send_backs_off_then_fails(db, monkeypatch):
+    def boom(cls, to, subject, text, html):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(OutboxDispatcher, "_send_email", classmethod(boom))
+    row = queue_email("a@example.com", "Hi", "text")
+    db.session.commit()
+
+    OutboxDispatcher.drain()
+    assert (row.status, row.attempts) == ("PENDING", 1)
+    assert row.available_at > datetime.utcnow()
+    assert OutboxDispatcher.drain() == 0  # not due yet
+
+    for _ in range(notifications.MAX_ATTEMPTS - 1):
+        row.available_at = datetime.utcnow()
+        db.session.commit()
+        OutboxDispatcher.drain()
+    assert (row.status, row.attempts) == ("FAILED", notifications.MAX_ATTEMPTS)
+
+
+def test_stale_claims_are_released(db, sent):
+    row = queue_email("a@example.com", "Hi", "text")
+    db.session.commit()
+    row.status, row.claim_token = "SENDING", "dead-worker"
+    row.claimed_at = datetime.utcnow() - notifications.CLAIM_TIMEOUT - timedelta(seconds=1)
+    db.session.commit()
+
+    assert OutboxDispatcher.drain() == 1
+    assert sent == [("a@example.com", "Hi")]
+    assert _statuses() == ["SENT"]
+
+
+def test_dead_push_tokens_fail_and_are_pruned(db, make_user, monkeypatch):
+    calls = []
+
+    def send_batch(pushes):
+        calls.append([p[0] for p in pushes])
+        outcomes = {"tok-ok": push_service.PUSH_SENT, "tok-dead": push_service.PUSH_DEAD_TOKEN}
+        return [(outcomes.get(p[0], push_service.PUSH_ERROR), None) for p in pushes]
+
+    monkeypatch.setattr(push_service, "push_enabled", lambda: True)
+    monkeypatch.setattr(push_service, "send_push_batch", send_batch)
+    alive, gone, flaky = (make_user(fcm_token=t) for t in ("tok-ok", "tok-dead", "tok-flaky"))
+    for user in (alive, gone, flaky):
+        queue_push(user.fcm_token, "Title", "Body", user_id=user.id)
+    db.session.commit()
+
+    OutboxDispatcher.drain()
+
+    assert calls == [["tok-ok", "tok-dead", "tok-flaky"]]  # one FCM call
+    assert _statuses() == ["SENT", "FAILED", "PENDING"]
+    db.session.expire_all()
+    assert (alive.fcm_token, gone.fcm_token, flaky.fcm_token) == ("tok-ok", None, "tok-flaky")
+
+
+def test_notifications_for_one_recipient_become_a_digest(db, sent):
+    for subject in ("UrbiX: New ride request", "UrbiX: Request cancelled", "UrbiX: New ride request"):
+        queue_email("driver@example.com", subject, "text")
+    queue_email("other@example.com", "UrbiX: Ride request approved", "text")
+    db.session.commit()
+
+    OutboxDispatcher.drain()
+
+    assert sent == [("driver@example.com", "UrbiX: 3 updates on your rides"),
+                    ("other@example.com", "UrbiX: Ride request approved")]
+    assert _statuses() == ["SENT"] * 4
+
+
+def test_recently_notified_recipient_is_held_until_the_window_ends(app, db, sent):
+    window = timedelta(seconds=app.config["NOTIFICATION_COALESCE_SEC"])
+    assert window
+    queue_email("driver@example.com", "First", "text")
+    db.session.commit()
+    OutboxDispatcher.drain()
+    first = NotificationOutbox.query.one()
+
+    held = queue_email("driver@example.com", "Second", "text")
+    queue_email("other@example.com", "Other", "text")
+    db.session.commit()
+    OutboxDispatcher.drain()
+
+    assert sent == [("driver@example.com", "First"), ("other@example.com", "Other")]
+    assert (held.status, held.claim_token) == ("PENDING", None)
+    assert held.available_at == first.sent_at + window
+
+
+def test_no_holding_without_a_window(app, db, sent):
+    app.config["NOTIFICATION_COALESCE_SEC"] = 0
+    for subject in ("First", "Second"):
+        queue_email("driver@example.com", subject, "text")
+        db.session.commit()
+        OutboxDispatcher.drain()
+
+    assert sent == [("driver@example.com", "First"), ("driver@example.com", "Second")]
+
+
+def test_verification_email_is_queued_with_the_account(app, db):
+    res = app.test_client().post("/api/auth/register", json={
+        "name": "Ada", "email": "ada@example.com", "password": "secret123"})
+    assert res.status_code in (200, 201)
+
+    row = NotificationOutbox.query.one()
+    assert (row.channel, row.recipient, row.status) == ("email", "ada@example.com", "PENDING")
+    assert row.subject == "Verify your UrbiX email address"
@@ -0,0 +1,152 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import CarpoolBooking, RidePost
+from app.models.ride_post import reconcile_booking_counters
+from app.services import ride_search
+from app.utils.pagination import CursorError, decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture()
+def places(db, make_ride):
+    rides = {name: make_ride(departure=name).id
+             for name in ("Côte-des-Neiges", "Cote-Vertu", "Montréal-Nord", "Laval")}
+    db.session.commit()
+    return rides
+
+
+def _search(term):
+    q = ride_search.filter_rides(RidePost.query, departure=term)
+    return {r.departure for r in q.all()}
+
+
+def test_search_index_folds_accents(places):
+    assert ride_search._index_available(RidePost.query.session)
+    assert _search("Côte") == {"Côte-des-Neiges", "Cote-Vertu"}
+    assert _search("cote") == {"Côte-des-Neiges", "Cote-Vertu"}
+    assert _search("montreal") == {"Montréal-Nord"}
+    assert _search("Montréal nord") == {"Montréal-Nord"}
+
+
+def test_search_index_follows_updates_and_deletes(db, places):
+    ride = db.session.get(RidePost, places["Laval"])
+    ride.departure = "Longueuil"
+    db.session.delete(db.session.get(RidePost, places["Cote-Vertu"]))
+    db.session.commit()
+
+    assert _search("laval") == set()
+    assert _search("longueuil") == {"Longueuil"}
+    assert _search("cote") == {"Côte-des-Neiges"}
+
+
+def test_search_fallback_matches_typed_and_folded_words(db, places):
+    ride_search._available[str(db.engine.url)] = (False, time.monotonic())
+    try:
+        assert _search("Côte") == {"Côte-des-Neiges", "Cote-Vertu"}
+        assert _search("Montréal") == {"Montréal-Nord"}
+        assert _search("laval") == {"Laval"}
+    finally:
+        ride_search._available.clear()
+
+
+def test_cursor_round_trip():
+    at = datetime(2026, 5, 1, 8, 30)
+    assert decode_cursor(encode_cursor(at, 42)) == (at, 42)
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_every_row_once(app, db, make_ride):
+    start = datetime(2026, 5, 1, 8, 0)
+    for i in range(5):
+        # Two rides per departure time, so the id breaks ties
+        make_ride(departure_datetime=start + timedelta(hours=i // 2))
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        url = "/?limit=2" + (f"&after={cursor}" if cursor else "")
+        with app.test_request_context(url):
+            rows, cursor = keyset_page(RidePost.query, RidePost.departure_datetime, RidePost.id)
+        seen += [r.id for r in rows]
+        if cursor is None:
+            break
+
+    expected = [r.id for r in RidePost.query.order_by(RidePost.departure_datetime, RidePost.id)]
+    assert seen == expected and len(seen) == 5
+
+
+def test_keyset_pages_descending(app, db, make_ride):
+    start = datetime(2026, 5, 1, 8, 0)
+    ids = [make_ride(departure_datetime=start + timedelta(hours=i)).id for i in range(3)]
+    db.session.commit()
+
+    with app.test_request_context("/?limit=2"):
+        first, cursor = keyset_page(RidePost.query, RidePost.departure_datetime, RidePost.id,
+                                    descending=True)
+    with app.test_request_context(f"/?limit=2&after={cursor}"):
+        rest, cursor = keyset_page(RidePost.query, RidePost.departure_datetime, RidePost.id,
+                                   descending=True)
+
+    assert [r.id for r in first + rest] == ids[::-1]
+    assert cursor is None
+
+
+def test_keyset_without_limit_is_unbounded(app, db, make_ride):
+    for _ in range(3):
+        make_ride()
+    db.session.commit()
+
+    with app.test_request_context("/"):
+        rows, cursor = keyset_page(RidePost.query, RidePost.departure_datetime, RidePost.id,
+                                   default_limit=None)
+    assert len(rows) == 3 and cursor is None
+
+
+def test_counters_from_concurrent_sessions_add_up(db, make_ride):
+    ride_id = make_ride().id
+    db.session.commit()
+
+    other = Session(db.engine)
+    try:
+        mine = db.session.get(RidePost, ride_id)
+        theirs = other.get(RidePost, ride_id)
+        assert mine.requests_count == theirs.requests_count == 0
+
+        mine.count_request()
+        db.session.commit()
+        theirs.count_request()  # still holds the stale value 0
+        other.commit()
+    finally:
+        other.close()
+
+    db.session.expire_all()
+    assert db.session.get(RidePost, ride_id).requests_count == 2
+
+
+def test_counters_stack_within_one_flush(db, make_ride):
+    ride = make_ride()
+    db.session.commit()
+
+    ride.count_request()
+    ride.count_request()
+    ride.count_booking("ACCEPTED", seats=2)
+    db.session.commit()
+
+    assert (ride.requests_count, ride.accepted_count, ride.accepted_seats) == (2, 1, 2)
+
+
+def test_reconcile_fixes_drifted_counters(db, make_user, make_ride):
+    ride = make_ride(seats_available=3)
+    for status, seats in (("PENDING", 1), ("ACCEPTED", 2), ("REJECTED", 1)):
+        db.session.add(CarpoolBooking(ride_post_id=ride.id, passenger_user_id=make_user().id,
+                                      status=status, seats_requested=seats))
+    ride.pending_count, ride.accepted_count, ride.accepted_seats = 5, 0, 0
+    db.session.commit()
+
+    assert reconcile_booking_counters() == 1
+    db.session.commit()
+    assert (ride.pending_count, ride.accepted_count, ride.accepted_seats) == (1, 1, 2)
@@ -0,0 +1,47 @@
+import random
+
+from app.utils import geohash
+from app.utils.tdigest import TDigest
+
+
+def test_tdigest_quantiles_close_to_exact():
+    rng = random.Random(7)
+    values = [rng.expovariate(1 / 300) for _ in range(20_000)]
+    digest = TDigest()
+    for v in values:
+        digest.add(v)
+
+    ordered = sorted(values)
+    assert len(digest) == len(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * len(ordered))]
+        assert abs(digest.quantile(q) - exact) / exact < 0.05
+
+
+def test_tdigest_merge_and_serialization():
+    a, b = TDigest(), TDigest()
+    for i in range(1, 501):
+        a.add(i)
+        b.add(i + 500)
+    a.merge(TDigest.from_dict(b.to_dict()))
+
+    assert len(a) == 1000
+    assert abs(a.quantile(0.5) - 500) < 15
+    assert TDigest().quantile(0.5) is None
+
+
+def test_geohash_bbox_contains_point():
+    lat, lng = 45.5152, -73.5611  # Berri-UQAM
+    for precision in (1, 4, 6, 9):
+        code = geohash.encode(lat, lng, precision)
+        lat_lo, lng_lo, lat_hi, lng_hi = geohash.decode_bbox(code)
+        assert lat_lo <= lat <= lat_hi and lng_lo <= lng <= lng_hi
+
+
+def test_geohash_cells_nest():
+    code = geohash.encode(45.5152, -73.5611, 7)
+    parent = geohash.decode_bbox(code[:5])
+    child = geohash.decode_bbox(code)
+    assert parent[0] <= child[0] and parent[1] <= child[1]
+    assert child[2] <= parent[2] and child[3] <= parent[3]
+    assert geohash.decode_bbox("") == (-90.0, -180.0, 90.0, 180.0)